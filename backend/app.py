@@ -3,9 +3,42 @@ from flask_cors import CORS   # 👈 import CORS
 from routes.questions import questions_bp
 from routes.skills import skills_bp
 from routes.test import test_bp    # ✅ import test blueprint
+from routes.uploads import uploads_bp
+from routes.media import media_bp
+from services.openrouter import client as openrouter_client
+from services.eval_queue import start_workers as start_eval_workers, stop_workers as stop_eval_workers
+from services import eval_cache, test_payload, violations, media_jobs
+from config import db_pool, MIGRATE_ON_START
+from utils.migrate import migrate
 
 
-def create_app():
+def start_background_tasks():
+    """Start this process's background threads (greenlets under gevent)."""
+    # Background workers that grade queued section submissions
+    start_eval_workers()
+    # Keeps /test/start payloads for open test windows in memory
+    test_payload.start_prewarm()
+    # Write-behind buffer for proctoring heartbeats
+    violations.start_flusher()
+    # Probe / thumbnail / waveform / transcode of uploaded recordings
+    media_jobs.start_workers()
+
+
+def stop_background_tasks(timeout=30):
+    """Drain background work on shutdown: flush buffers, stop workers, close connections."""
+    violations.stop_flusher(timeout)
+    media_jobs.stop_workers(timeout)
+    test_payload.stop_prewarm(timeout)
+    stop_eval_workers(timeout)
+    db_pool.closeall()
+
+
+def create_app(start_background=True):
+    """
+    Build the Flask app. Pre-forking servers pass start_background=False
+    and call start_background_tasks() in each worker after the fork, since
+    threads started in the parent don't survive it (see gunicorn.conf.py).
+    """
     app = Flask(__name__)
 
     # ✅ Enable CORS for all routes and all origins
@@ -15,11 +48,36 @@ def create_app():
     app.register_blueprint(questions_bp, url_prefix="/api/v1")
     app.register_blueprint(skills_bp, url_prefix="/api/v1")
     app.register_blueprint(test_bp, url_prefix="/api/v1")   # ✅ register test routes
+    app.register_blueprint(uploads_bp, url_prefix="/api/v1")
+    # Serves the /<UPLOAD_DIR>/... URLs the upload routes return, so no prefix
+    app.register_blueprint(media_bp)
+
+    # Bring the schema up to date before any worker touches the database;
+    # a failure is logged so the app still starts when Postgres is down
+    if MIGRATE_ON_START:
+        try:
+            migrate()
+        except Exception as e:
+            print("🔥 migration error:", e)
+
+    if start_background:
+        start_background_tasks()
 
     @app.route("/")
     def home():
         return {"message": "Backend running"}
 
+    @app.route("/metrics")
+    def metrics():
+        return {
+            "openrouter": openrouter_client.stats(),
+            "evaluation_cache": eval_cache.stats(),
+            "test_payload_cache": test_payload.stats(),
+            "db_pool": db_pool.stats(),
+            "violations": violations.stats(),
+            "media_jobs": media_jobs.stats(),
+        }
+
     return app
 
 
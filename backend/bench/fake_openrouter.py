@@ -0,0 +1,198 @@
+"""
+Offline stand-in for the OpenRouter chat-completions API.
+
+Answers generation prompts for mcq/coding/audio/video (single and batched)
+and evaluation prompts with canned JSON, with configurable latency and
+error rate. GET /stats returns call counters, POST /stats/reset clears them.
+
+    python -m bench.fake_openrouter --port 8765 --latency-ms 800 --error-rate 0.05
+
+Point the backend at it with OPENROUTER_URL=http://127.0.0.1:8765/v1/chat/completions
+(or OPENROUTER_FAKE=true, which uses that URL and dummy credentials).
+"""
+import re
+import json
+import time
+import random
+import argparse
+import threading
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_BATCH_RE = re.compile(r"Generate (\d+) distinct")
+
+
+def _mcq(i):
+    return {
+        "prompt": f"Sample multiple-choice question #{i}?",
+        "options": ["Option A", "Option B", "Option C", "Option D"],
+        "answer": "ABCD"[i % 4],
+    }
+
+
+def _coding(i):
+    return {
+        "prompt": f"Read two integers and print their sum (variant {i}).",
+        "input_spec": "Two integers a and b separated by a space",
+        "output_spec": "A single integer a + b",
+        "examples": [{"input": "1 2", "output": "3"}, {"input": "5 7", "output": "12"}],
+        "hidden_tests": [{"input": "100 -1", "output": "99"}],
+    }
+
+
+def _audio(i):
+    return {
+        "prompt_text": f"Describe a project where you applied this skill (#{i}).",
+        "expected_keywords": ["design", "testing", "performance"],
+        "rubric": "Mentions concrete trade-offs and outcomes.",
+    }
+
+
+def _video(i):
+    return {
+        "prompt_text": f"Walk us through a hard bug you fixed (#{i}).",
+        "expected_keywords": ["root cause", "debugging", "fix", "lessons"],
+        "rubric": "Clear structure, root cause, fix and lessons.",
+        "suggested_time_seconds": 90,
+    }
+
+
+def _evaluation(prompt):
+    if "multiple-choice" in prompt:
+        return {"is_correct": True, "score": 1, "feedback": "Matches the correct option."}
+    return {"score": 7, "feedback": "Reasonable solution; edge cases partially handled."}
+
+
+def build_content(prompt):
+    """Pick a response shape from the prompt text, mirroring llm_client.PROMPTS."""
+    if "evaluator" in prompt:
+        return json.dumps(_evaluation(prompt))
+
+    if "multiple-choice" in prompt:
+        make = _mcq
+    elif "coding question" in prompt:
+        make = _coding
+    elif "suggested_time_seconds" in prompt:
+        make = _video
+    else:
+        make = _audio
+
+    match = _BATCH_RE.search(prompt)
+    if match:
+        return json.dumps([make(i) for i in range(int(match.group(1)))])
+    return json.dumps(make(0))
+
+
+class FakeState:
+    def __init__(self, latency_ms=500, jitter_ms=200, error_rate=0.0, error_status=503):
+        self.latency_ms = latency_ms
+        self.jitter_ms = jitter_ms
+        self.error_rate = error_rate
+        self.error_status = error_status
+        self.lock = threading.Lock()
+        self.reset()
+
+    def reset(self):
+        with self.lock:
+            self.calls = 0
+            self.errors = 0
+            self.in_flight = 0
+            self.max_in_flight = 0
+
+    def snapshot(self):
+        with self.lock:
+            return {
+                "calls": self.calls,
+                "errors": self.errors,
+                "in_flight": self.in_flight,
+                "max_in_flight": self.max_in_flight,
+            }
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body, headers=None):
+            raw = json.dumps(body).encode("utf-8")
+            self.send_response(status)
+            self.send_header("Content-Type", "application/json")
+            self.send_header("Content-Length", str(len(raw)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            self.wfile.write(raw)
+
+        def do_GET(self):
+            if self.path.rstrip("/") == "/stats":
+                return self._send(200, state.snapshot())
+            self._send(404, {"error": "not found"})
+
+        def do_POST(self):
+            length = int(self.headers.get("Content-Length") or 0)
+            body = json.loads(self.rfile.read(length) or b"{}")
+
+            if self.path.rstrip("/") == "/stats/reset":
+                state.reset()
+                return self._send(200, {"status": "reset"})
+
+            with state.lock:
+                state.calls += 1
+                state.in_flight += 1
+                state.max_in_flight = max(state.max_in_flight, state.in_flight)
+            try:
+                delay = max(0.0, random.gauss(state.latency_ms, state.jitter_ms)) / 1000
+                time.sleep(delay)
+
+                if random.random() < state.error_rate:
+                    with state.lock:
+                        state.errors += 1
+                    return self._send(state.error_status, {"error": "injected failure"},
+                                      {"Retry-After": "1"} if state.error_status == 429 else None)
+
+                prompt = " ".join(m.get("content", "") for m in body.get("messages", []))
+                self._send(200, {
+                    "id": f"fake-{random.getrandbits(32):08x}",
+                    "model": body.get("model"),
+                    "choices": [{"index": 0, "message": {"role": "assistant", "content": build_content(prompt)}}],
+                })
+            finally:
+                with state.lock:
+                    state.in_flight -= 1
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(host="127.0.0.1", port=8765, **options):
+    """Start the fake server on a daemon thread. Returns (server, state)."""
+    state = FakeState(**options)
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-openrouter", daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--error-status", type=int, default=503)
+    args = parser.parse_args()
+
+    state = FakeState(args.latency_ms, args.jitter_ms, args.error_rate, args.error_status)
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"Fake OpenRouter listening on http://{args.host}:{args.port}/v1/chat/completions")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
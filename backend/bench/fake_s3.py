@@ -0,0 +1,200 @@
+"""
+Offline stand-in for an S3-compatible object store, enough for S3Store:
+path-style bucket create, object PUT/GET/HEAD/DELETE (GET honours Range),
+and multipart uploads. Objects are kept in memory. GET /_stats returns
+request counters.
+
+    python -m bench.fake_s3 --port 9000
+
+Point the backend at it with
+    STORAGE_BACKEND=s3 S3_BUCKET=recordings S3_ENDPOINT_URL=http://127.0.0.1:9000 \\
+    AWS_ACCESS_KEY_ID=fake AWS_SECRET_ACCESS_KEY=fake S3_REGION=us-east-1
+(a "recordings" bucket exists from the start; add more with --bucket).
+"""
+import re
+import json
+import uuid
+import hashlib
+import argparse
+import threading
+from urllib.parse import urlsplit, parse_qs, unquote
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+_PART_RE = re.compile(r"<PartNumber>(\d+)</PartNumber>")
+_RANGE_RE = re.compile(r"bytes=(\d*)-(\d*)$")
+
+
+class FakeState:
+    def __init__(self):
+        self.lock = threading.Lock()
+        self.buckets = {}
+        self.uploads = {}
+        self.counts = {}
+
+    def count(self, op):
+        with self.lock:
+            self.counts[op] = self.counts.get(op, 0) + 1
+
+
+def _etag(data):
+    return f'"{hashlib.md5(data).hexdigest()}"'
+
+
+def make_handler(state):
+    class Handler(BaseHTTPRequestHandler):
+        protocol_version = "HTTP/1.1"
+
+        def _send(self, status, body=b"", headers=None, content_type="application/xml"):
+            self.send_response(status)
+            self.send_header("Content-Type", content_type)
+            self.send_header("Content-Length", str(len(body)))
+            for k, v in (headers or {}).items():
+                self.send_header(k, v)
+            self.end_headers()
+            if self.command != "HEAD":
+                self.wfile.write(body)
+
+        def _error(self, status, code):
+            self._send(status, f"<Error><Code>{code}</Code></Error>".encode())
+
+        def _parse(self):
+            url = urlsplit(self.path)
+            bucket, _, key = unquote(url.path).lstrip("/").partition("/")
+            return bucket, key, {k: v[0] for k, v in parse_qs(url.query, keep_blank_values=True).items()}
+
+        def _body(self):
+            return self.rfile.read(int(self.headers.get("Content-Length") or 0))
+
+        def _object(self, bucket, key):
+            with state.lock:
+                return state.buckets.get(bucket, {}).get(key)
+
+        def do_HEAD(self):
+            self.do_GET()
+
+        def do_GET(self):
+            bucket, key, query = self._parse()
+            if bucket == "_stats":
+                with state.lock:
+                    body = json.dumps(dict(state.counts)).encode()
+                return self._send(200, body, content_type="application/json")
+            state.count(self.command)
+            obj = self._object(bucket, key)
+            if obj is None:
+                return self._error(404, "NoSuchKey")
+            data, content_type = obj
+            headers = {"ETag": _etag(data), "Accept-Ranges": "bytes"}
+            match = _RANGE_RE.match(self.headers.get("Range") or "")
+            if not match:
+                return self._send(200, data, headers, content_type)
+            start, end = match.groups()
+            if start:
+                start, end = int(start), min(int(end) if end else len(data) - 1, len(data) - 1)
+            else:
+                start, end = max(0, len(data) - int(end)), len(data) - 1
+            if start > end:
+                return self._error(416, "InvalidRange")
+            headers["Content-Range"] = f"bytes {start}-{end}/{len(data)}"
+            self._send(206, data[start:end + 1], headers, content_type)
+
+        def do_PUT(self):
+            bucket, key, query = self._parse()
+            body = self._body()
+            state.count("PUT")
+            with state.lock:
+                if not key:
+                    state.buckets.setdefault(bucket, {})
+                    return self._send(200)
+                if bucket not in state.buckets:
+                    return self._error(404, "NoSuchBucket")
+                if "uploadId" in query:
+                    upload = state.uploads.get(query["uploadId"])
+                    if upload is None:
+                        return self._error(404, "NoSuchUpload")
+                    upload["parts"][int(query["partNumber"])] = body
+                else:
+                    content_type = self.headers.get("Content-Type", "binary/octet-stream")
+                    state.buckets[bucket][key] = (body, content_type)
+            self._send(200, headers={"ETag": _etag(body)})
+
+        def do_POST(self):
+            bucket, key, query = self._parse()
+            body = self._body()
+            state.count("POST")
+            if "uploads" in query:
+                upload_id = uuid.uuid4().hex
+                with state.lock:
+                    if bucket not in state.buckets:
+                        return self._error(404, "NoSuchBucket")
+                    state.uploads[upload_id] = {
+                        "bucket": bucket, "key": key, "parts": {},
+                        "content_type": self.headers.get("Content-Type", "binary/octet-stream"),
+                    }
+                return self._send(200, (
+                    "<InitiateMultipartUploadResult>"
+                    f"<Bucket>{bucket}</Bucket><Key>{key}</Key><UploadId>{upload_id}</UploadId>"
+                    "</InitiateMultipartUploadResult>"
+                ).encode())
+            if "uploadId" in query:
+                with state.lock:
+                    upload = state.uploads.pop(query["uploadId"], None)
+                    if upload is None:
+                        return self._error(404, "NoSuchUpload")
+                    numbers = [int(n) for n in _PART_RE.findall(body.decode())]
+                    data = b"".join(upload["parts"][n] for n in numbers)
+                    state.buckets[bucket][key] = (data, upload["content_type"])
+                return self._send(200, (
+                    "<CompleteMultipartUploadResult>"
+                    f"<Bucket>{bucket}</Bucket><Key>{key}</Key><ETag>{_etag(data)}</ETag>"
+                    "</CompleteMultipartUploadResult>"
+                ).encode())
+            self._error(400, "InvalidRequest")
+
+        def do_DELETE(self):
+            bucket, key, query = self._parse()
+            state.count("DELETE")
+            with state.lock:
+                if "uploadId" in query:
+                    state.uploads.pop(query["uploadId"], None)
+                else:
+                    state.buckets.get(bucket, {}).pop(key, None)
+            self._send(204)
+
+        def log_message(self, *args):
+            pass
+
+    return Handler
+
+
+def start_server(host="127.0.0.1", port=9000, buckets=()):
+    """Start the fake store on a daemon thread. Returns (server, state)."""
+    state = FakeState()
+    for bucket in buckets:
+        state.buckets[bucket] = {}
+    server = ThreadingHTTPServer((host, port), make_handler(state))
+    server.daemon_threads = True
+    threading.Thread(target=server.serve_forever, name="fake-s3", daemon=True).start()
+    return server, state
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--host", default="127.0.0.1")
+    parser.add_argument("--port", type=int, default=9000)
+    parser.add_argument("--bucket", action="append", default=["recordings"])
+    args = parser.parse_args()
+
+    state = FakeState()
+    for bucket in args.bucket:
+        state.buckets[bucket] = {}
+    server = ThreadingHTTPServer((args.host, args.port), make_handler(state))
+    server.daemon_threads = True
+    print(f"Fake S3 listening on http://{args.host}:{args.port} (buckets: {', '.join(args.bucket)})")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+if __name__ == "__main__":
+    main()
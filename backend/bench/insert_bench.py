@@ -0,0 +1,110 @@
+"""
+Benchmark for the finalize-test write path: one INSERT per question versus
+batched multi-row INSERTs (utils.bulk.bulk_insert), at several set sizes.
+Rows go to a TEMP copy of the questions table, so nothing is persisted.
+
+    DATABASE_URL=postgresql://localhost/assessments_bench \\
+        python -m bench.insert_bench --sizes 10,100,1000 --repeat 5
+
+Reports the median time per question set and the speed-up of the bulk path.
+"""
+import os
+import sys
+import json
+import time
+import uuid
+import argparse
+import datetime
+import statistics
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENROUTER_FAKE", "true")
+
+from config import get_db_connection  # noqa: E402
+from utils.bulk import bulk_insert  # noqa: E402
+
+
+def sample_question(i):
+    return {
+        "type": "mcq",
+        "skill": "Python",
+        "difficulty": "medium",
+        "time_limit": 60,
+        "positive_marking": 1,
+        "negative_marking": 0,
+        "content": {
+            "prompt": f"Sample multiple-choice question #{i}?",
+            "options": ["Option A", "Option B", "Option C", "Option D"],
+            "answer": "ABCD"[i % 4],
+        },
+    }
+
+
+def insert_row_by_row(cur, question_set_id, questions, created_at):
+    for q in questions:
+        cur.execute("""
+            INSERT INTO bench_questions (question_set_id, content, created_at)
+            VALUES (%s, %s, %s)
+        """, (question_set_id, json.dumps(q), created_at))
+
+
+def insert_bulk(cur, question_set_id, questions, created_at):
+    bulk_insert(
+        cur, "bench_questions", ("question_set_id", "content", "created_at"),
+        ((question_set_id, json.dumps(q), created_at) for q in questions),
+    )
+
+
+def time_once(conn, fn, questions):
+    question_set_id = str(uuid.uuid4())
+    created_at = datetime.datetime.utcnow()
+    with conn.cursor() as cur:
+        started = time.perf_counter()
+        fn(cur, question_set_id, questions, created_at)
+        conn.commit()
+        elapsed = time.perf_counter() - started
+        cur.execute("TRUNCATE bench_questions")
+    conn.commit()
+    return elapsed
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--sizes", default="10,100,1000")
+    parser.add_argument("--repeat", type=int, default=5)
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    args = parser.parse_args()
+
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            cur.execute("CREATE TEMP TABLE bench_questions (LIKE questions INCLUDING DEFAULTS INCLUDING GENERATED)")
+        conn.commit()
+
+        results = []
+        for size in [int(s) for s in args.sizes.split(",") if s.strip()]:
+            questions = [sample_question(i) for i in range(size)]
+            row = {"questions": size}
+            for name, fn in (("row_by_row", insert_row_by_row), ("bulk", insert_bulk)):
+                time_once(conn, fn, questions)  # warm-up
+                runs = [time_once(conn, fn, questions) for _ in range(args.repeat)]
+                row[f"{name}_ms"] = round(statistics.median(runs) * 1000, 1)
+            row["speedup"] = round(row["row_by_row_ms"] / row["bulk_ms"], 1) if row["bulk_ms"] else None
+            results.append(row)
+    finally:
+        conn.close()
+
+    cols = ["questions", "row_by_row_ms", "bulk_ms", "speedup"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in cols))
+
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
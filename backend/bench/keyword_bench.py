@@ -0,0 +1,65 @@
+"""
+Throughput benchmark for local keyword scoring (services/keywords.py).
+
+Builds --questions questions with --keywords expected keywords each and
+--answers synthetic answers per question of about --words words, then
+scores them the way submit_section does (one score_batch per section of
+--section answers). Reports compile time and answers/sec, cold (fresh
+automatons) and warm (cached).
+
+    python -m bench.keyword_bench --questions 50 --answers 200 --words 150
+"""
+import os
+import sys
+import time
+import random
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENROUTER_FAKE", "true")
+
+from services import keywords  # noqa: E402
+
+VOCABULARY = [w for group in keywords.SYNONYMS for w in group] + [
+    "the", "we", "then", "team", "because", "users", "service", "project", "improved",
+    "built", "migrated", "reduced", "added", "learned", "problem", "approach", "result",
+]
+
+
+def main():
+    parser = argparse.ArgumentParser()
+    parser.add_argument("--questions", type=int, default=50)
+    parser.add_argument("--keywords", type=int, default=6)
+    parser.add_argument("--answers", type=int, default=200)
+    parser.add_argument("--words", type=int, default=150)
+    parser.add_argument("--section", type=int, default=10)
+    args = parser.parse_args()
+
+    rng = random.Random(1)
+    keyword_sets = [rng.sample(VOCABULARY, args.keywords) for _ in range(args.questions)]
+    items = [
+        (kws, " ".join(rng.choice(VOCABULARY) for _ in range(args.words)))
+        for kws in keyword_sets for _ in range(args.answers)
+    ]
+    rng.shuffle(items)
+    sections = [items[i:i + args.section] for i in range(0, len(items), args.section)]
+
+    started = time.perf_counter()
+    for kws in keyword_sets:
+        keywords.KeywordIndex((tuple(kws),))
+    compile_ms = (time.perf_counter() - started) * 1000 / len(keyword_sets)
+    print(f"compile: {compile_ms:.2f} ms per question ({args.keywords} keywords + synonyms)")
+
+    for label in ("cold", "warm"):
+        if label == "cold":
+            keywords._compiled.clear()
+        started = time.perf_counter()
+        passed = sum(ev["is_correct"] for section in sections for ev in keywords.score_batch(section))
+        elapsed = time.perf_counter() - started
+        print(f"{label}: {len(items)} answers in {elapsed:.2f}s = {len(items) / elapsed:,.0f} answers/s "
+              f"({passed} passed)")
+
+
+if __name__ == "__main__":
+    main()
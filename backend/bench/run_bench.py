@@ -0,0 +1,264 @@
+"""
+Load benchmark for question generation, finalization, test start and
+section submission, run against the offline OpenRouter stand-in and a local
+Postgres. Reports p50/p95/p99 latency, throughput and LLM calls per request.
+
+    DATABASE_URL=postgresql://localhost/assessments_bench \\
+        python -m bench.run_bench --requests 50 --concurrency 10 --latency-ms 800
+
+By default the fake LLM server and the Flask app are started in-process;
+pass --llm-url / --base-url to benchmark already running instances.
+Submissions that need the LLM are queued (202), so "submit" measures the
+request path; their LLM calls land on the evaluation workers afterwards.
+"""
+import os
+import sys
+import json
+import time
+import logging
+import uuid
+import argparse
+import threading
+from concurrent.futures import ThreadPoolExecutor
+
+import requests
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from bench.fake_openrouter import start_server as start_fake_llm  # noqa: E402
+
+CODING_ANSWER = "a, b = map(int, input().split())\nprint(a + b)\n"
+
+
+def percentile(sorted_values, pct):
+    if not sorted_values:
+        return 0.0
+    k = max(0, min(len(sorted_values) - 1, int(round(pct / 100 * len(sorted_values) + 0.5)) - 1))
+    return sorted_values[k]
+
+
+def build_generate_payload(skills, per_type):
+    names = ["Python", "SQL", "React", "JavaScript", "Docker", "AWS"]
+    return {
+        "skills": [
+            {
+                "name": names[i % len(names)],
+                "difficulty": "medium",
+                "counts": {"mcq": per_type, "coding": max(1, per_type // 2), "audio": 1, "video": 1},
+            }
+            for i in range(skills)
+        ],
+        "global_settings": {"mcq_options": 4},
+    }
+
+
+def build_finalize_payload(questions):
+    return {
+        "test_title": "Benchmark Assessment",
+        "test_description": "Generated by bench.run_bench",
+        "questions": [dict(q, time_limit=60, positive_marking=1, negative_marking=0) for q in questions],
+    }
+
+
+def build_submit_payload(question_set_id, questions):
+    responses = []
+    for q in questions:
+        qtype = q.get("type")
+        if qtype == "mcq":
+            answer = "A"
+        elif qtype == "coding":
+            answer = CODING_ANSWER
+        else:
+            continue
+        responses.append({
+            "question_id": q.get("id") or q.get("question_id"),
+            "question_type": qtype,
+            "question_text": q.get("question") or "",
+            "correct_answer": q.get("correct_answer") or "N/A",
+            "candidate_answer": answer,
+        })
+    return {
+        "question_set_id": question_set_id,
+        "candidate_id": str(uuid.uuid4()),
+        "section_name": "bench",
+        "responses": responses,
+    }
+
+
+class Bench:
+    def __init__(self, base_url, llm_stats_url, args):
+        self.base_url = base_url.rstrip("/")
+        self.llm_stats_url = llm_stats_url
+        self.args = args
+        self.local = threading.local()
+
+    def session(self):
+        if not hasattr(self.local, "session"):
+            self.local.session = requests.Session()
+        return self.local.session
+
+    def llm_calls(self):
+        if not self.llm_stats_url:
+            return None
+        try:
+            return requests.get(self.llm_stats_url, timeout=5).json().get("calls")
+        except Exception:
+            return None
+
+    def call(self, method, path, **kwargs):
+        resp = self.session().request(method, f"{self.base_url}{path}", timeout=self.args.timeout, **kwargs)
+        if resp.status_code >= 400:
+            raise RuntimeError(f"{method} {path} -> {resp.status_code}: {resp.text[:200]}")
+        return resp
+
+    def run(self, name, fn):
+        latencies = []
+        errors = []
+        lock = threading.Lock()
+
+        def one(_):
+            started = time.perf_counter()
+            try:
+                fn()
+                ok = True
+            except Exception as e:
+                ok = False
+                with lock:
+                    errors.append(str(e))
+            elapsed = time.perf_counter() - started
+            if ok:
+                with lock:
+                    latencies.append(elapsed)
+
+        calls_before = self.llm_calls()
+        wall_started = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=self.args.concurrency) as pool:
+            list(pool.map(one, range(self.args.requests)))
+        wall = time.perf_counter() - wall_started
+        calls_after = self.llm_calls()
+
+        latencies.sort()
+        total = self.args.requests
+        llm_per_request = None
+        if calls_before is not None and calls_after is not None:
+            llm_per_request = round((calls_after - calls_before) / total, 2)
+
+        return {
+            "scenario": name,
+            "requests": total,
+            "errors": len(errors),
+            "p50_ms": round(percentile(latencies, 50) * 1000, 1),
+            "p95_ms": round(percentile(latencies, 95) * 1000, 1),
+            "p99_ms": round(percentile(latencies, 99) * 1000, 1),
+            "throughput_rps": round(len(latencies) / wall, 2) if wall else 0.0,
+            "llm_calls_per_request": llm_per_request,
+            "sample_error": errors[0] if errors else None,
+        }
+
+
+def print_report(results):
+    cols = ["scenario", "requests", "errors", "p50_ms", "p95_ms", "p99_ms", "throughput_rps", "llm_calls_per_request"]
+    widths = {c: max(len(c), *(len(str(r[c])) for r in results)) for c in cols}
+    print("  ".join(c.ljust(widths[c]) for c in cols))
+    for r in results:
+        print("  ".join(str(r[c]).ljust(widths[c]) for c in cols))
+    for r in results:
+        if r["sample_error"]:
+            print(f"\n[{r['scenario']}] sample error: {r['sample_error']}")
+
+
+def start_app():
+    """Import the Flask app (after env is set) and serve it on a free port."""
+    from werkzeug.serving import make_server
+    from app import create_app
+
+    logging.getLogger("werkzeug").setLevel(logging.WARNING)
+
+    server = make_server("127.0.0.1", 0, create_app(), threaded=True)
+    threading.Thread(target=server.serve_forever, name="bench-app", daemon=True).start()
+    return f"http://127.0.0.1:{server.server_port}"
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--scenarios", default="generate,finalize,start,submit")
+    parser.add_argument("--requests", type=int, default=20, help="requests per scenario")
+    parser.add_argument("--concurrency", type=int, default=5)
+    parser.add_argument("--skills", type=int, default=4)
+    parser.add_argument("--per-type", type=int, default=5, help="mcq questions per skill")
+    parser.add_argument("--timeout", type=float, default=300)
+    parser.add_argument("--base-url", help="benchmark a running backend instead of an in-process one")
+    parser.add_argument("--llm-url", help="use a running LLM endpoint instead of the in-process fake")
+    parser.add_argument("--llm-port", type=int, default=8765)
+    parser.add_argument("--latency-ms", type=float, default=500)
+    parser.add_argument("--jitter-ms", type=float, default=200)
+    parser.add_argument("--error-rate", type=float, default=0.0)
+    parser.add_argument("--json", dest="json_path", help="also write results to this file")
+    args = parser.parse_args()
+
+    llm_stats_url = None
+    if args.llm_url:
+        os.environ["OPENROUTER_URL"] = args.llm_url
+        os.environ.setdefault("OPENROUTER_API_KEY", "fake-key")
+        os.environ.setdefault("OPENROUTER_MODEL", "fake-model")
+    else:
+        # Forces dummy credentials, so a real key from .env never leaves the box
+        os.environ["OPENROUTER_FAKE"] = "true"
+        start_fake_llm(port=args.llm_port, latency_ms=args.latency_ms,
+                       jitter_ms=args.jitter_ms, error_rate=args.error_rate)
+        os.environ["OPENROUTER_URL"] = f"http://127.0.0.1:{args.llm_port}/v1/chat/completions"
+        llm_stats_url = f"http://127.0.0.1:{args.llm_port}/stats"
+
+    base_url = args.base_url or start_app()
+    bench = Bench(base_url, llm_stats_url, args)
+
+    generate_payload = build_generate_payload(args.skills, args.per_type)
+
+    # Fixtures for the later scenarios come from one warm-up call each,
+    # made only when a selected scenario needs them
+    fixtures = {}
+
+    def fixture(name):
+        if name not in fixtures:
+            if name == "questions":
+                resp = bench.call("POST", "/api/v1/generate-test", json=generate_payload)
+                fixtures[name] = resp.json()["questions"]
+            elif name == "finalize_payload":
+                fixtures[name] = build_finalize_payload(fixture("questions"))
+            elif name == "question_set_id":
+                resp = bench.call("POST", "/api/v1/finalize-test", json=fixture("finalize_payload"))
+                fixtures[name] = resp.json()["question_set_id"]
+            elif name == "started_questions":
+                resp = bench.call("GET", f"/api/v1/test/start/{fixture('question_set_id')}")
+                fixtures[name] = resp.json()["questions"]
+        return fixtures[name]
+
+    scenarios = {
+        "generate": (lambda: bench.call("POST", "/api/v1/generate-test", json=generate_payload), []),
+        "finalize": (lambda: bench.call("POST", "/api/v1/finalize-test", json=fixture("finalize_payload")),
+                     ["finalize_payload"]),
+        "start": (lambda: bench.call("GET", f"/api/v1/test/start/{fixture('question_set_id')}"),
+                  ["question_set_id"]),
+        "submit": (lambda: bench.call("POST", "/api/v1/test/submit_section",
+                                      json=build_submit_payload(fixture("question_set_id"),
+                                                                fixture("started_questions"))),
+                   ["started_questions"]),
+    }
+
+    results = []
+    for name in [s.strip() for s in args.scenarios.split(",") if s.strip()]:
+        if name not in scenarios:
+            parser.error(f"unknown scenario: {name}")
+        fn, needs = scenarios[name]
+        for dep in needs:
+            fixture(dep)
+        results.append(bench.run(name, fn))
+
+    print_report(results)
+    if args.json_path:
+        with open(args.json_path, "w") as f:
+            json.dump({"args": vars(args), "results": results}, f, indent=2)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,102 @@
+"""
+Round-trip benchmark for the recording blob stores (services/storage.py).
+
+Stores --count random recordings of --size-mb each, stores them again
+(should dedupe to nothing new), reads every blob back and checks its
+digest, then deletes them. --backend s3 runs against bench.fake_s3 in
+process unless --endpoint points at a real S3-compatible server.
+
+    python -m bench.storage_bench --backend local --count 20 --size-mb 8
+    python -m bench.storage_bench --backend s3 --count 20 --size-mb 8
+
+Reports MB/s for each phase and exits non-zero if any check fails.
+"""
+import io
+import os
+import sys
+import time
+import hashlib
+import argparse
+import tempfile
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+os.environ.setdefault("OPENROUTER_FAKE", "true")
+
+from services.storage import LocalStore, S3Store  # noqa: E402
+
+
+def timed(label, total_bytes, fn):
+    started = time.perf_counter()
+    result = fn()
+    elapsed = time.perf_counter() - started
+    print(f"{label:<10} {elapsed:8.3f}s  {total_bytes / elapsed / 1e6 if elapsed else 0:9.1f} MB/s")
+    return result
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("--backend", choices=("local", "s3"), default="local")
+    parser.add_argument("--count", type=int, default=10)
+    parser.add_argument("--size-mb", type=float, default=4)
+    parser.add_argument("--root", help="local store directory (default: a temp dir)")
+    parser.add_argument("--endpoint", help="S3 endpoint (default: in-process bench.fake_s3)")
+    parser.add_argument("--bucket", default="recordings")
+    args = parser.parse_args()
+
+    if args.backend == "local":
+        root = args.root or tempfile.mkdtemp(prefix="blobs-")
+        store = LocalStore(root)
+    else:
+        endpoint = args.endpoint
+        if not endpoint:
+            from bench.fake_s3 import start_server
+            server, _ = start_server(port=0, buckets=[args.bucket])
+            endpoint = f"http://127.0.0.1:{server.server_address[1]}"
+            os.environ.setdefault("AWS_ACCESS_KEY_ID", "fake")
+            os.environ.setdefault("AWS_SECRET_ACCESS_KEY", "fake")
+        store = S3Store(args.bucket, "bench/", endpoint, os.getenv("S3_REGION", "us-east-1"))
+
+    size = int(args.size_mb * 1024 * 1024)
+    payloads = [os.urandom(size) for _ in range(args.count)]
+    expected = [hashlib.sha256(p).hexdigest() for p in payloads]
+    total = size * args.count
+    failures = []
+
+    blobs = timed("put", total, lambda: [store.put_stream(io.BytesIO(p), "video/webm") for p in payloads])
+    if [b.digest for b in blobs] != expected or not all(b.created for b in blobs):
+        failures.append("put returned wrong digests or skipped new content")
+
+    again = timed("put again", total, lambda: [store.put_stream(io.BytesIO(p), "video/webm") for p in payloads])
+    if any(b.created for b in again):
+        failures.append("identical content was stored twice")
+
+    def read_all():
+        digests = []
+        for digest in expected:
+            f = store.open(digest)
+            try:
+                h = hashlib.sha256()
+                for buf in iter(lambda: f.read(1024 * 1024), b""):
+                    h.update(buf)
+                digests.append(h.hexdigest())
+            finally:
+                f.close()
+        return digests
+
+    if timed("read", total, read_all) != expected:
+        failures.append("read-back content doesn't match")
+
+    for digest in expected:
+        store.delete(digest)
+    if any(store.exists(d) for d in expected):
+        failures.append("deleted blobs still exist")
+
+    print(f"backend={store.name} count={args.count} size={size} url={store.url(expected[0])}")
+    for failure in failures:
+        print("FAIL:", failure)
+    sys.exit(1 if failures else 0)
+
+
+if __name__ == "__main__":
+    main()
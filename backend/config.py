@@ -1,16 +1,178 @@
 import os
+from urllib.parse import urlparse
 from dotenv import load_dotenv
 import psycopg2
+import psycopg2.extras
+from utils.db_pool import ConnectionPool
 
 load_dotenv()
 
+# Let psycopg2 pass uuid.UUID values (and UUID arrays) as query parameters
+psycopg2.extras.register_uuid()
+
 DATABASE_URL = os.getenv("DATABASE_URL")
-OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
-OPENROUTER_URL = os.getenv("OPENROUTER_URL")
-OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL")
+
+# OPENROUTER_FAKE=true points the LLM client at bench/fake_openrouter.py with
+# dummy credentials, so the app can run and be load-tested offline. Real
+# values from .env are ignored then: only a local OPENROUTER_URL is honoured
+OPENROUTER_FAKE = os.getenv("OPENROUTER_FAKE", "false").lower() == "true"
+if OPENROUTER_FAKE:
+    OPENROUTER_API_KEY = "fake-key"
+    OPENROUTER_MODEL = "fake-model"
+    OPENROUTER_URL = os.getenv("OPENROUTER_URL") or ""
+    if urlparse(OPENROUTER_URL).hostname not in ("127.0.0.1", "localhost", "::1"):
+        OPENROUTER_URL = "http://127.0.0.1:8765/v1/chat/completions"
+else:
+    OPENROUTER_API_KEY = os.getenv("OPENROUTER_API_KEY")
+    OPENROUTER_URL = os.getenv("OPENROUTER_URL")
+    OPENROUTER_MODEL = os.getenv("OPENROUTER_MODEL")
+
+# Max number of LLM calls generate_questions keeps in flight at once
+GENERATION_CONCURRENCY = int(os.getenv("GENERATION_CONCURRENCY", "8"))
+# Max questions requested from the LLM in a single batched completion
+GENERATION_BATCH_SIZE = int(os.getenv("GENERATION_BATCH_SIZE", "10"))
+
+# Question bank: pre-generated questions served before falling back to the LLM
+QUESTION_BANK_ENABLED = os.getenv("QUESTION_BANK_ENABLED", "true").lower() == "true"
+QUESTION_BANK_MIN_STOCK = int(os.getenv("QUESTION_BANK_MIN_STOCK", "20"))
+QUESTION_BANK_MAX_USES = int(os.getenv("QUESTION_BANK_MAX_USES", "50"))
+QUESTION_BANK_TTL_DAYS = int(os.getenv("QUESTION_BANK_TTL_DAYS", "30"))
+QUESTION_BANK_REFILL_WORKERS = int(os.getenv("QUESTION_BANK_REFILL_WORKERS", "2"))
+
+# Background evaluation of submitted sections (0 workers = evaluate inline)
+EVAL_WORKERS = int(os.getenv("EVAL_WORKERS", "2"))
+EVAL_CONCURRENCY = int(os.getenv("EVAL_CONCURRENCY", "8"))
+EVAL_POLL_SECONDS = float(os.getenv("EVAL_POLL_SECONDS", "2"))
+EVAL_STALE_SECONDS = int(os.getenv("EVAL_STALE_SECONDS", "600"))
+EVAL_MAX_ATTEMPTS = int(os.getenv("EVAL_MAX_ATTEMPTS", "3"))
+
+# Evaluation cache: in-process LRU entries and shared (Postgres) tier TTL
+EVAL_CACHE_SIZE = int(os.getenv("EVAL_CACHE_SIZE", "10000"))
+EVAL_CACHE_TTL_HOURS = int(os.getenv("EVAL_CACHE_TTL_HOURS", "168"))
+
+# /test/start payloads: in-process LRU size and background pre-warm of sets
+# whose test window is open (0 seconds disables the pre-warm thread)
+TEST_PAYLOAD_CACHE_SIZE = int(os.getenv("TEST_PAYLOAD_CACHE_SIZE", "256"))
+TEST_PAYLOAD_PREWARM_SECONDS = float(os.getenv("TEST_PAYLOAD_PREWARM_SECONDS", "60"))
+TEST_PAYLOAD_PREWARM_LIMIT = int(os.getenv("TEST_PAYLOAD_PREWARM_LIMIT", "100"))
+# Cached payloads are re-checked against the stored ETag at most this often,
+# so an edit made through one worker reaches every other worker's cache
+TEST_PAYLOAD_REVALIDATE_SECONDS = float(os.getenv("TEST_PAYLOAD_REVALIDATE_SECONDS", "5"))
+
+# Audio/video answers are scored locally by expected-keyword coverage
+# (services/keywords.py); an answer passes at this share of keywords.
+# KEYWORD_SYNONYMS_FILE adds synonym groups: a JSON list of word lists
+KEYWORD_PASS_RATIO = float(os.getenv("KEYWORD_PASS_RATIO", "0.5"))
+KEYWORD_SYNONYMS_FILE = os.getenv("KEYWORD_SYNONYMS_FILE", "")
+
+# Local execution of coding answers against examples / hidden tests
+CODE_RUNNER_CONCURRENCY = int(os.getenv("CODE_RUNNER_CONCURRENCY", str(os.cpu_count() or 2)))
+CODE_RUNNER_CPU_SECONDS = int(os.getenv("CODE_RUNNER_CPU_SECONDS", "2"))
+CODE_RUNNER_MEMORY_MB = int(os.getenv("CODE_RUNNER_MEMORY_MB", "256"))
+CODE_RUNNER_WALL_SECONDS = float(os.getenv("CODE_RUNNER_WALL_SECONDS", "5"))
+# RLIMIT_NPROC for candidate programs; it counts every process of the user,
+# so the default 0 simply forbids starting processes (and threads)
+CODE_RUNNER_MAX_PROCESSES = int(os.getenv("CODE_RUNNER_MAX_PROCESSES", "0"))
+# OS-level isolation every candidate program runs under. "auto" uses bwrap
+# (no network, read-only system dirs, only the work dir writable) or else
+# unshare (no network, own PID namespace); any other value is the command
+# prefix itself, with {workdir} substituted. Without a working sandbox coding
+# answers are not executed unless CODE_RUNNER_ALLOW_UNSANDBOXED=true (dev only)
+CODE_RUNNER_SANDBOX_CMD = os.getenv("CODE_RUNNER_SANDBOX_CMD", "auto")
+CODE_RUNNER_ALLOW_UNSANDBOXED = os.getenv("CODE_RUNNER_ALLOW_UNSANDBOXED", "false").lower() == "true"
+# Ask the LLM for qualitative feedback on top of the local test results
+CODE_RUNNER_LLM_FEEDBACK = os.getenv("CODE_RUNNER_LLM_FEEDBACK", "false").lower() == "true"
+
+# Shared OpenRouter HTTP client: keep-alive pool sized to the LLM worker threads
+OPENROUTER_POOL_SIZE = int(os.getenv(
+    "OPENROUTER_POOL_SIZE", str(GENERATION_CONCURRENCY + QUESTION_BANK_REFILL_WORKERS + EVAL_CONCURRENCY)
+))
+OPENROUTER_MAX_RETRIES = int(os.getenv("OPENROUTER_MAX_RETRIES", "3"))
+OPENROUTER_BACKOFF_BASE = float(os.getenv("OPENROUTER_BACKOFF_BASE", "0.5"))
+OPENROUTER_BACKOFF_MAX = float(os.getenv("OPENROUTER_BACKOFF_MAX", "20"))
+OPENROUTER_CONNECT_TIMEOUT = float(os.getenv("OPENROUTER_CONNECT_TIMEOUT", "5"))
+OPENROUTER_READ_TIMEOUT = float(os.getenv("OPENROUTER_READ_TIMEOUT", "60"))
+
+# Postgres connection pool shared by request handlers and background workers
+DB_POOL_MIN = int(os.getenv("DB_POOL_MIN", "1"))
+DB_POOL_MAX = int(os.getenv("DB_POOL_MAX", "20"))
+DB_POOL_TIMEOUT = float(os.getenv("DB_POOL_TIMEOUT", "10"))
+# Idle connections older than this are pinged with SELECT 1 before reuse
+DB_POOL_CHECK_AFTER = float(os.getenv("DB_POOL_CHECK_AFTER", "30"))
+# Proctoring counters from /test/save_violations are buffered per attempt and
+# written in batched upserts every VIOLATIONS_FLUSH_SECONDS, or sooner once
+# VIOLATIONS_FLUSH_SIZE attempts are pending
+VIOLATIONS_WRITE_BEHIND = os.getenv("VIOLATIONS_WRITE_BEHIND", "true").lower() == "true"
+VIOLATIONS_FLUSH_SECONDS = float(os.getenv("VIOLATIONS_FLUSH_SECONDS", "2"))
+VIOLATIONS_FLUSH_SIZE = int(os.getenv("VIOLATIONS_FLUSH_SIZE", "500"))
+
+# Recordings from /upload_audio, /upload_video and resumable uploads
+UPLOAD_DIR = os.getenv("UPLOAD_DIR", "recordings")
+# Resumable uploads: advertised chunk size, largest chunk accepted, the read
+# buffer chunks are streamed to disk with, and when abandoned uploads expire
+UPLOAD_CHUNK_BYTES = int(os.getenv("UPLOAD_CHUNK_BYTES", str(4 * 1024 * 1024)))
+UPLOAD_MAX_CHUNK_BYTES = int(os.getenv("UPLOAD_MAX_CHUNK_BYTES", str(16 * 1024 * 1024)))
+UPLOAD_BUFFER_BYTES = int(os.getenv("UPLOAD_BUFFER_BYTES", str(64 * 1024)))
+UPLOAD_MAX_BYTES = int(os.getenv("UPLOAD_MAX_BYTES", str(4 * 1024 * 1024 * 1024)))
+UPLOAD_SESSION_TTL_HOURS = int(os.getenv("UPLOAD_SESSION_TTL_HOURS", "48"))
+# Where recording bytes are kept: "local" (UPLOAD_DIR/blobs) or "s3" (any
+# S3-compatible store; credentials come from the usual AWS_* variables)
+STORAGE_BACKEND = os.getenv("STORAGE_BACKEND", "local").lower()
+S3_BUCKET = os.getenv("S3_BUCKET")
+S3_PREFIX = os.getenv("S3_PREFIX", "recordings/")
+S3_ENDPOINT_URL = os.getenv("S3_ENDPOINT_URL") or None
+S3_REGION = os.getenv("S3_REGION") or None
+# Serving /<UPLOAD_DIR>/... : browser cache lifetime for legacy flat files
+# (blobs are immutable and cached for a year), and how long the redirect
+# to a presigned S3 URL stays valid
+MEDIA_CACHE_SECONDS = int(os.getenv("MEDIA_CACHE_SECONDS", "3600"))
+MEDIA_PRESIGN_SECONDS = int(os.getenv("MEDIA_PRESIGN_SECONDS", "900"))
+# Hand file transfers to the front proxy instead of sending them from Python:
+# "x-accel-redirect" (nginx; MEDIA_ACCEL_PREFIX is an internal location
+# aliased to UPLOAD_DIR) or "x-sendfile" (Apache/lighttpd)
+MEDIA_OFFLOAD = os.getenv("MEDIA_OFFLOAD", "").lower()
+MEDIA_ACCEL_PREFIX = os.getenv("MEDIA_ACCEL_PREFIX", "/protected-recordings/")
+# Background post-processing of uploaded recordings (0 workers disables it).
+# MEDIA_PROCESSORS picks from probe, thumbnail, waveform and transcode;
+# processors whose tool (FFMPEG_BIN / FFPROBE_BIN) isn't installed are skipped
+MEDIA_WORKERS = int(os.getenv("MEDIA_WORKERS", "1"))
+MEDIA_PROCESSORS = os.getenv("MEDIA_PROCESSORS", "probe,thumbnail,waveform")
+MEDIA_POLL_SECONDS = float(os.getenv("MEDIA_POLL_SECONDS", "5"))
+MEDIA_STALE_SECONDS = int(os.getenv("MEDIA_STALE_SECONDS", "1800"))
+MEDIA_MAX_ATTEMPTS = int(os.getenv("MEDIA_MAX_ATTEMPTS", "3"))
+# Failed jobs are retried after MEDIA_RETRY_SECONDS, doubling each attempt
+MEDIA_RETRY_SECONDS = float(os.getenv("MEDIA_RETRY_SECONDS", "30"))
+MEDIA_TOOL_TIMEOUT = float(os.getenv("MEDIA_TOOL_TIMEOUT", "900"))
+MEDIA_WAVEFORM_POINTS = int(os.getenv("MEDIA_WAVEFORM_POINTS", "1000"))
+FFMPEG_BIN = os.getenv("FFMPEG_BIN", "ffmpeg")
+FFPROBE_BIN = os.getenv("FFPROBE_BIN", "ffprobe")
+
+# Apply pending migrations (backend/migrations) when the app starts
+MIGRATE_ON_START = os.getenv("MIGRATE_ON_START", "true").lower() == "true"
+
+# Rows per multi-row INSERT statement on bulk write paths
+BULK_INSERT_PAGE_SIZE = int(os.getenv("BULK_INSERT_PAGE_SIZE", "1000"))
 
 if not OPENROUTER_API_KEY or not OPENROUTER_URL or not OPENROUTER_MODEL:
     raise ValueError("Please set OPENROUTER_API_KEY, OPENROUTER_URL, and OPENROUTER_MODEL in .env")
 
+db_pool = ConnectionPool(
+    DATABASE_URL,
+    minconn=DB_POOL_MIN,
+    maxconn=DB_POOL_MAX,
+    timeout=DB_POOL_TIMEOUT,
+    check_after=DB_POOL_CHECK_AFTER,
+)
+
+
+def db_connection():
+    """
+    Borrow a pooled connection: `with db_connection() as conn:`. Rolls back
+    on error and returns the connection to the pool on exit.
+    """
+    return db_pool.connection()
+
+
 def get_db_connection():
-    return psycopg2.connect(DATABASE_URL)
\ No newline at end of file
+    """Unpooled connection for one-off scripts; the caller closes it."""
+    return psycopg2.connect(DATABASE_URL)
@@ -0,0 +1,74 @@
+"""
+Production serving config:  gunicorn -c gunicorn.conf.py wsgi:app
+
+Concurrency model
+-----------------
+* WEB_CONCURRENCY worker processes (default: CPU count), forked from a
+  master that has already built the app (preload_app) and applied
+  migrations once.
+* SERVER_WORKER_CLASS=gevent (default): each worker is a single OS thread
+  running up to WORKER_CONNECTIONS requests as greenlets. The stdlib is
+  monkey-patched below, before the app is imported, and psycogreen makes
+  psycopg2 yield while waiting on Postgres, so a request blocked on an
+  OpenRouter call or a query costs one greenlet, not a thread. The app's
+  ThreadPoolExecutors, locks and background "threads" become greenlets
+  too, so one process can keep hundreds of LLM calls in flight.
+* SERVER_WORKER_CLASS=gthread: fallback without gevent. Each worker runs
+  SERVER_THREADS OS threads, and LLM-bound requests hold one each.
+* Shared resources per worker: one OpenRouter keep-alive pool
+  (OPENROUTER_POOL_SIZE) and one Postgres pool (DB_POOL_MAX). Both block
+  cooperatively when exhausted. Under gevent, OpenRouter and LLM fan-out
+  defaults are raised to match WORKER_CONNECTIONS. The database pool stays
+  small: requests and evaluation workers only hold a connection for their
+  queries, never across a code run or an LLM call.
+* Recordings (routes/media.py) are handed to gunicorn as wsgi.file_wrapper
+  bodies. The gthread worker sends them with sendfile(); gevent's sockets
+  copy in userspace instead, so behind nginx set
+  MEDIA_OFFLOAD=x-accel-redirect and let the proxy send the bytes.
+* Background work (evaluation workers, payload pre-warm, violations
+  flusher, media post-processing) starts in each worker after the fork
+  (post_fork).
+* Shutdown: on SIGTERM gunicorn stops accepting connections and gives
+  in-flight requests GRACEFUL_TIMEOUT seconds. worker_exit then flushes
+  buffered violations, stops the background workers and closes pooled
+  connections. Evaluation and media jobs cut off mid-flight are
+  re-claimed by another worker after EVAL_STALE_SECONDS /
+  MEDIA_STALE_SECONDS.
+
+Needs gunicorn, plus gevent and psycogreen for the gevent worker class.
+"""
+import os
+import multiprocessing
+
+bind = os.getenv("BIND", "0.0.0.0:5000")
+workers = int(os.getenv("WEB_CONCURRENCY", str(multiprocessing.cpu_count())))
+worker_class = os.getenv("SERVER_WORKER_CLASS", "gevent")
+worker_connections = int(os.getenv("WORKER_CONNECTIONS", "500"))
+threads = int(os.getenv("SERVER_THREADS", "16"))
+preload_app = True
+timeout = int(os.getenv("WORKER_TIMEOUT", "120"))
+graceful_timeout = int(os.getenv("GRACEFUL_TIMEOUT", "60"))
+keepalive = int(os.getenv("KEEPALIVE", "5"))
+accesslog = os.getenv("ACCESS_LOG", "-")
+
+if worker_class == "gevent":
+    # Must run before the app (and requests / psycopg2) is imported
+    from gevent import monkey
+    monkey.patch_all()
+    from psycogreen.gevent import patch_psycopg
+    patch_psycopg()
+
+    # Size the LLM side for many concurrent greenlets unless set explicitly
+    os.environ.setdefault("OPENROUTER_POOL_SIZE", str(worker_connections))
+    os.environ.setdefault("GENERATION_CONCURRENCY", "32")
+    os.environ.setdefault("EVAL_CONCURRENCY", "64")
+
+
+def post_fork(server, worker):
+    from app import start_background_tasks
+    start_background_tasks()
+
+
+def worker_exit(server, worker):
+    from app import stop_background_tasks
+    stop_background_tasks(timeout=graceful_timeout)
@@ -0,0 +1,58 @@
+-- Tables owned by the backend services (question bank, evaluation queue,
+-- evaluation cache, /test/start payloads). IF NOT EXISTS keeps this safe on
+-- databases where the services already created them lazily.
+
+CREATE TABLE IF NOT EXISTS question_bank (
+    id UUID PRIMARY KEY,
+    skill TEXT NOT NULL,
+    difficulty TEXT NOT NULL,
+    qtype TEXT NOT NULL,
+    mcq_options INTEGER NOT NULL,
+    content JSONB NOT NULL,
+    usage_count INTEGER NOT NULL DEFAULT 0,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    last_used_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS question_bank_lookup_idx
+    ON question_bank (skill, difficulty, qtype, mcq_options, usage_count);
+
+CREATE TABLE IF NOT EXISTS evaluation_jobs (
+    id UUID PRIMARY KEY,
+    candidate_id UUID NOT NULL,
+    question_set_id UUID NOT NULL,
+    section_name TEXT,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS evaluation_jobs_claim_idx
+    ON evaluation_jobs (status, created_at);
+
+CREATE TABLE IF NOT EXISTS evaluation_job_items (
+    job_id UUID NOT NULL REFERENCES evaluation_jobs (id) ON DELETE CASCADE,
+    idx INTEGER NOT NULL,
+    question_id TEXT,
+    response JSONB NOT NULL,
+    status TEXT NOT NULL DEFAULT 'pending',
+    evaluation JSONB,
+    PRIMARY KEY (job_id, idx)
+);
+
+CREATE TABLE IF NOT EXISTS evaluation_cache (
+    key TEXT PRIMARY KEY,
+    evaluation JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    expires_at TIMESTAMPTZ NOT NULL
+);
+CREATE INDEX IF NOT EXISTS evaluation_cache_expires_idx
+    ON evaluation_cache (expires_at);
+
+CREATE TABLE IF NOT EXISTS test_payloads (
+    question_set_id UUID PRIMARY KEY,
+    body TEXT NOT NULL,
+    etag TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
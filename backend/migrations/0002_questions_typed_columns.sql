@@ -0,0 +1,28 @@
+-- Promote the hot fields of questions.content to typed columns. They are
+-- STORED generated columns, so every insert path keeps them in sync without
+-- application changes. Numeric fields tolerate numbers sent as strings and
+-- are NULL when absent or malformed, so bad payloads never fail an insert.
+-- Adding stored columns rewrites the table once; run during a quiet window.
+
+ALTER TABLE questions
+    ADD COLUMN IF NOT EXISTS qtype TEXT
+        GENERATED ALWAYS AS (content::jsonb ->> 'type') STORED,
+    ADD COLUMN IF NOT EXISTS skill TEXT
+        GENERATED ALWAYS AS (content::jsonb ->> 'skill') STORED,
+    ADD COLUMN IF NOT EXISTS difficulty TEXT
+        GENERATED ALWAYS AS (content::jsonb ->> 'difficulty') STORED,
+    ADD COLUMN IF NOT EXISTS time_limit NUMERIC
+        GENERATED ALWAYS AS (
+            CASE WHEN (content::jsonb ->> 'time_limit') ~ '^\s*-?\d+(\.\d+)?\s*$'
+                 THEN (content::jsonb ->> 'time_limit')::numeric END
+        ) STORED,
+    ADD COLUMN IF NOT EXISTS positive_marking NUMERIC
+        GENERATED ALWAYS AS (
+            CASE WHEN (content::jsonb ->> 'positive_marking') ~ '^\s*-?\d+(\.\d+)?\s*$'
+                 THEN (content::jsonb ->> 'positive_marking')::numeric END
+        ) STORED,
+    ADD COLUMN IF NOT EXISTS negative_marking NUMERIC
+        GENERATED ALWAYS AS (
+            CASE WHEN (content::jsonb ->> 'negative_marking') ~ '^\s*-?\d+(\.\d+)?\s*$'
+                 THEN (content::jsonb ->> 'negative_marking')::numeric END
+        ) STORED;
@@ -0,0 +1,16 @@
+-- migrate: no-transaction
+-- Indexes for question lookups by set and filtering by skill / difficulty.
+-- Built CONCURRENTLY so writes to questions are not blocked; that cannot
+-- run inside a transaction, hence the marker above.
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS questions_question_set_id_idx
+    ON questions (question_set_id);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS questions_skill_difficulty_idx
+    ON questions (skill, difficulty);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS questions_difficulty_idx
+    ON questions (difficulty);
+
+CREATE INDEX CONCURRENTLY IF NOT EXISTS questions_qtype_idx
+    ON questions (qtype);
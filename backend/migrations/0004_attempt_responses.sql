@@ -0,0 +1,46 @@
+-- Append-only storage for evaluated responses and interview QA entries.
+-- Each section submission / upload inserts its own rows instead of
+-- rewriting the ever-growing test_attempts.results_data / qa_data arrays.
+-- Those columns are no longer written (see 0009); readers of the old arrays
+-- have to move to the attempt_arrays view below.
+
+CREATE TABLE IF NOT EXISTS attempt_responses (
+    id BIGSERIAL PRIMARY KEY,
+    candidate_id UUID NOT NULL,
+    question_set_id UUID NOT NULL,
+    question_id TEXT,
+    section_name TEXT,
+    result JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS attempt_responses_attempt_idx
+    ON attempt_responses (candidate_id, question_set_id, id);
+
+CREATE TABLE IF NOT EXISTS attempt_qa (
+    id BIGSERIAL PRIMARY KEY,
+    candidate_id UUID NOT NULL,
+    question_set_id UUID NOT NULL,
+    source TEXT NOT NULL,
+    entry JSONB NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+CREATE INDEX IF NOT EXISTS attempt_qa_attempt_idx
+    ON attempt_qa (candidate_id, question_set_id, id);
+
+-- Compatibility read path: the arrays as test_attempts used to hold them,
+-- legacy JSONB values first, then the append-only rows in insert order
+CREATE OR REPLACE VIEW attempt_arrays AS
+SELECT
+    ta.candidate_id,
+    ta.question_set_id,
+    COALESCE(ta.results_data, '[]'::jsonb) || COALESCE((
+        SELECT jsonb_agg(r.result ORDER BY r.id)
+        FROM attempt_responses r
+        WHERE r.candidate_id = ta.candidate_id AND r.question_set_id = ta.question_set_id
+    ), '[]'::jsonb) AS results_data,
+    COALESCE(ta.qa_data, '[]'::jsonb) || COALESCE((
+        SELECT jsonb_agg(q.entry ORDER BY q.id)
+        FROM attempt_qa q
+        WHERE q.candidate_id = ta.candidate_id AND q.question_set_id = ta.question_set_id
+    ), '[]'::jsonb) AS qa_data
+FROM test_attempts ta;
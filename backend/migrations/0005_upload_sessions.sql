@@ -0,0 +1,19 @@
+-- Resumable chunked uploads. Bytes live in UPLOAD_DIR/.partial/<id>.part
+-- until the upload is completed; only metadata is kept here.
+
+CREATE TABLE IF NOT EXISTS upload_sessions (
+    id UUID PRIMARY KEY,
+    kind TEXT NOT NULL,
+    candidate_id UUID NOT NULL,
+    question_set_id UUID NOT NULL,
+    filename TEXT NOT NULL,
+    final_name TEXT NOT NULL,
+    total_size BIGINT,
+    qa_data JSONB NOT NULL DEFAULT '[]'::jsonb,
+    status TEXT NOT NULL DEFAULT 'open',
+    url TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    completed_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS upload_sessions_open_idx
+    ON upload_sessions (created_at) WHERE status = 'open';
@@ -0,0 +1,27 @@
+-- Content-addressed recording storage. Blobs are keyed by the sha256 of
+-- their bytes (stored under <prefix>/ab/cd/<digest>), so identical uploads
+-- share one copy; recordings maps each attempt question to its blob.
+
+CREATE TABLE IF NOT EXISTS recording_blobs (
+    digest TEXT PRIMARY KEY,
+    size BIGINT NOT NULL,
+    content_type TEXT NOT NULL,
+    backend TEXT NOT NULL,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+);
+
+-- question is '' for recordings uploaded without QA entries
+CREATE TABLE IF NOT EXISTS recordings (
+    candidate_id UUID NOT NULL,
+    question_set_id UUID NOT NULL,
+    question TEXT NOT NULL DEFAULT '',
+    kind TEXT NOT NULL,
+    digest TEXT NOT NULL REFERENCES recording_blobs (digest),
+    filename TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    PRIMARY KEY (candidate_id, question_set_id, question, kind)
+);
+CREATE INDEX IF NOT EXISTS recordings_digest_idx ON recordings (digest);
+
+-- Completed resumable uploads now land in blob storage under their digest
+ALTER TABLE upload_sessions DROP COLUMN IF EXISTS final_name;
@@ -0,0 +1,23 @@
+-- Post-processing of uploaded recordings (services/media_jobs.py). One job
+-- per blob, so identical uploads are processed once. Results (probe data
+-- and derived artifact URLs) land in recording_blobs.media and next to
+-- test_attempts.audio_url / video_url.
+
+CREATE TABLE IF NOT EXISTS media_jobs (
+    digest TEXT PRIMARY KEY REFERENCES recording_blobs (digest),
+    kind TEXT NOT NULL,
+    status TEXT NOT NULL DEFAULT 'queued',
+    attempts INTEGER NOT NULL DEFAULT 0,
+    error TEXT,
+    created_at TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    run_after TIMESTAMPTZ NOT NULL DEFAULT NOW(),
+    claimed_at TIMESTAMPTZ,
+    finished_at TIMESTAMPTZ
+);
+CREATE INDEX IF NOT EXISTS media_jobs_claim_idx
+    ON media_jobs (status, run_after);
+
+ALTER TABLE recording_blobs ADD COLUMN IF NOT EXISTS media JSONB;
+
+ALTER TABLE test_attempts ADD COLUMN IF NOT EXISTS audio_media JSONB;
+ALTER TABLE test_attempts ADD COLUMN IF NOT EXISTS video_media JSONB;
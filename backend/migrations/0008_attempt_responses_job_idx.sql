@@ -0,0 +1,8 @@
+-- Rows written by the evaluation queue carry their job and item index, so a
+-- job finished twice (a stale re-claim racing a slow worker) can't append
+-- its results twice. Inline submissions leave both NULL.
+
+ALTER TABLE attempt_responses ADD COLUMN IF NOT EXISTS job_id UUID;
+ALTER TABLE attempt_responses ADD COLUMN IF NOT EXISTS job_idx INTEGER;
+CREATE UNIQUE INDEX IF NOT EXISTS attempt_responses_job_item_idx
+    ON attempt_responses (job_id, job_idx);
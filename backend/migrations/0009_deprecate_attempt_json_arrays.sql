@@ -0,0 +1,12 @@
+-- test_attempts.results_data / qa_data are frozen: since 0004 new responses
+-- and QA entries only go to attempt_responses / attempt_qa, and the arrays
+-- keep whatever was written before that. Anything that still reads them
+-- directly sees no new attempts and must read attempt_arrays instead (as
+-- /test/attempt and grading's QA lookup do). The columns stay for the view.
+
+COMMENT ON COLUMN test_attempts.results_data IS
+    'Deprecated: frozen since migration 0004, read attempt_arrays.results_data';
+COMMENT ON COLUMN test_attempts.qa_data IS
+    'Deprecated: frozen since migration 0004, read attempt_arrays.qa_data';
+COMMENT ON VIEW attempt_arrays IS
+    'Legacy test_attempts arrays followed by attempt_responses / attempt_qa rows';
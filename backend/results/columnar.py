@@ -0,0 +1,115 @@
+"""
+Arrow IPC and Parquet encoding for result exports. pyarrow is optional:
+without it AVAILABLE is False and the routes reject columnar formats.
+"""
+import json
+import uuid
+import decimal
+import datetime
+from sqlalchemy import types as sqltypes
+
+try:
+    import pyarrow as pa
+    import pyarrow.parquet as pq
+    AVAILABLE = True
+except ImportError:  # pragma: no cover - depends on the deployment
+    pa = pq = None
+    AVAILABLE = False
+
+FORMATS = {
+    "arrow": ("application/vnd.apache.arrow.stream", "arrows"),
+    "parquet": ("application/vnd.apache.parquet", "parquet"),
+}
+
+
+def arrow_type(sql_type):
+    """Map a reflected SQLAlchemy column type to an Arrow type (string by default)."""
+    if isinstance(sql_type, sqltypes.Boolean):
+        return pa.bool_()
+    if isinstance(sql_type, sqltypes.Integer):
+        return pa.int64()
+    if isinstance(sql_type, (sqltypes.Float, sqltypes.Numeric)):
+        return pa.float64()
+    if isinstance(sql_type, sqltypes.DateTime):
+        return pa.timestamp("us", tz="UTC") if getattr(sql_type, "timezone", False) else pa.timestamp("us")
+    if isinstance(sql_type, sqltypes.Date):
+        return pa.date32()
+    return pa.string()
+
+
+def schema_for(columns, types):
+    return pa.schema([pa.field(c, arrow_type(types[c])) for c in columns])
+
+
+def _cell(value, arrow_t):
+    if value is None:
+        return None
+    if pa.types.is_string(arrow_t):
+        if isinstance(value, (dict, list)):
+            return json.dumps(value, default=str)
+        if isinstance(value, (uuid.UUID, datetime.time, datetime.timedelta, bytes)):
+            return str(value)
+        return value if isinstance(value, str) else str(value)
+    if pa.types.is_floating(arrow_t) and isinstance(value, decimal.Decimal):
+        return float(value)
+    return value
+
+
+def record_batch(schema, rows):
+    """Build one RecordBatch column by column from a list of row tuples."""
+    arrays = []
+    for i, field in enumerate(schema):
+        values = [_cell(row[i], field.type) for row in rows]
+        try:
+            arrays.append(pa.array(values, type=field.type))
+        except (pa.ArrowInvalid, pa.ArrowTypeError):
+            # Driver handed back text for a typed column; let Arrow parse it
+            text_values = [None if v is None else str(v) for v in values]
+            arrays.append(pa.array(text_values, type=pa.string()).cast(field.type))
+    return pa.RecordBatch.from_arrays(arrays, schema=schema)
+
+
+class _ChunkSink:
+    """Write-only file object that hands back whatever was written since the last drain."""
+
+    def __init__(self):
+        self.chunks = []
+        self.closed = False
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def close(self):
+        self.closed = True
+
+    def drain(self):
+        out = b"".join(self.chunks)
+        self.chunks = []
+        return out
+
+
+def encode(fmt, batches, types):
+    """
+    Encode stream_batches output (column names, then row batches) as an
+    Arrow IPC stream or Parquet file, yielding bytes after every batch.
+    Each batch becomes one Arrow record batch / Parquet row group.
+    """
+    columns = next(batches)
+    schema = schema_for(columns, types)
+    sink = _ChunkSink()
+    if fmt == "parquet":
+        writer = pq.ParquetWriter(pa.PythonFile(sink, mode="w"), schema, compression="zstd")
+    else:
+        writer = pa.ipc.new_stream(pa.PythonFile(sink, mode="w"), schema)
+
+    for rows in batches:
+        writer.write_batch(record_batch(schema, rows))
+        chunk = sink.drain()
+        if chunk:
+            yield chunk
+    writer.close()
+    yield sink.drain()
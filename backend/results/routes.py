@@ -1,9 +1,16 @@
-from flask import Blueprint, request, jsonify, current_app, Response
-from sqlalchemy import text
-import csv, io
+from flask import Blueprint, request, jsonify, current_app, Response, stream_with_context
+from sqlalchemy import text, inspect
+import csv, io, json, base64, os
+import columnar
 
 bp = Blueprint("api_generated", __name__)
 
+# Reflected columns and keyset sort key per table, filled on first use
+_table_info = {}
+
+# Rows fetched per round trip from the server-side cursor during exports
+EXPORT_BATCH_SIZE = int(os.getenv("RESULTS_EXPORT_BATCH_SIZE", "5000"))
+
 def get_engine():
     engine = current_app.config.get("DB_ENGINE")
     if engine is None:
@@ -24,57 +31,212 @@ def paginate_params():
     offset = (page - 1) * per_page
     return page, per_page, offset
 
-@bp.route("/results", methods=["GET"])
-def get_results():
-    engine = get_engine()
-    page, per_page, offset = paginate_params()
-    export = request.args.get("export", "").lower() == "csv"
+def table_info(conn, table):
+    """
+    Columns of a public table and the key it is paged on: the first column
+    (what ORDER BY 1 sorted on) followed by any primary-key columns as a
+    tiebreaker, so the order is total and keyset pages never skip rows.
+    """
+    if table not in _table_info:
+        insp = inspect(conn)
+        reflected = insp.get_columns(table, schema="public")
+        columns = [c["name"] for c in reflected]
+        pk = insp.get_pk_constraint(table, schema="public").get("constrained_columns") or []
+        key = [columns[0]] + [c for c in pk if c != columns[0]]
+        _table_info[table] = {
+            "columns": columns,
+            "types": {c["name"]: c["type"] for c in reflected},
+            "key": key,
+        }
+    return _table_info[table]
 
+def filter_params(info):
+    """Turn filter__<column>=value args into WHERE clauses on known columns."""
     where = []
     params = {}
     for k, v in request.args.items():
         if k.startswith("filter__"):
             col = k.split("filter__",1)[1]
-            where.append(f'"{col}" = :{col}')
-            params[col] = v
+            if col not in info["columns"]:
+                raise ValueError(f"Unknown filter column: {col}")
+            name = f"f{len(params)}"
+            where.append(f'"{col}" = :{name}')
+            params[name] = v
+    return where, params
+
+def field_params(info):
+    """Columns requested with ?fields=a,b (all columns when absent)."""
+    raw = request.args.get("fields")
+    if not raw:
+        return list(info["columns"])
+    fields = []
+    for col in (c.strip() for c in raw.split(",")):
+        if not col or col in fields:
+            continue
+        if col not in info["columns"]:
+            raise ValueError(f"Unknown field: {col}")
+        fields.append(col)
+    if not fields:
+        raise ValueError("fields is empty")
+    return fields
+
+def select_list(columns):
+    return ", ".join(f'"{c}"' for c in columns)
 
-    where_sql = ("WHERE " + " AND ".join(where)) if where else ""
-    sql = text(f'SELECT * FROM "public"."results" {where} ORDER BY 1 DESC LIMIT :limit OFFSET :offset'.replace("{where}", where_sql))
-    params.update({"limit": per_page, "offset": offset})
+def encode_cursor(row, key):
+    raw = json.dumps({"k": key, "v": [row[c] for c in key]}, default=str)
+    return base64.urlsafe_b64encode(raw.encode("utf-8")).decode("ascii").rstrip("=")
+
+def decode_cursor(token, key):
     try:
-        with engine.connect() as conn:
-            rows = conn.execute(sql, params).mappings().all()
-            data = [dict(r) for r in rows]
-            if export:
-                if not data:
-                    return jsonify({"data": []})
-                output = io.StringIO()
-                w = csv.DictWriter(output, fieldnames=list(data[0].keys()))
-                w.writeheader()
-                w.writerows(data)
-                return Response(output.getvalue(), mimetype="text/csv", headers={"Content-Disposition":"attachment;filename=results.csv"})
-            return jsonify({"page": page, "per_page": per_page, "data": data})
-    except Exception as e:
-        return jsonify({"error": str(e)}), 500
+        raw = base64.urlsafe_b64decode(token + "=" * (-len(token) % 4))
+        cursor = json.loads(raw)
+    except Exception:
+        raise ValueError("Invalid cursor")
+    if not isinstance(cursor, dict) or cursor.get("k") != key or len(cursor.get("v") or []) != len(key):
+        raise ValueError("Invalid cursor")
+    return cursor["v"]
 
-@bp.route("/jobs", methods=["GET"])
-def get_jobs():
+def estimated_count(conn, table, where_sql, params):
+    """
+    Row count from planner statistics instead of COUNT(*): pg_class.reltuples
+    for the whole table, or the planner's row estimate when filtered.
+    Returns None when the table has never been analyzed.
+    """
+    if not where_sql:
+        count = conn.execute(
+            text("SELECT reltuples::bigint FROM pg_class WHERE oid = to_regclass(:t)"),
+            {"t": f'"public"."{table}"'},
+        ).scalar()
+        return count if count is not None and count >= 0 else None
+    plan = conn.execute(text(f'EXPLAIN (FORMAT JSON) SELECT 1 FROM "public"."{table}" {where_sql}'), params).scalar()
+    plan = json.loads(plan) if isinstance(plan, str) else plan
+    return int(plan[0]["Plan"]["Plan Rows"])
+
+def stream_batches(engine, sql, params, batch_size=EXPORT_BATCH_SIZE):
+    """
+    Run a query through a named server-side cursor. Yields the column names
+    first, then lists of up to batch_size rows, so memory stays flat
+    however many rows match.
+    """
+    with engine.connect() as conn:
+        result = conn.execution_options(stream_results=True, yield_per=batch_size).execute(sql, params)
+        yield list(result.keys())
+        for rows in result.partitions(batch_size):
+            yield rows
+
+def csv_chunks(batches):
+    """Encode stream_batches output as CSV, one chunk per batch."""
+    output = io.StringIO()
+    w = csv.writer(output)
+    for i, batch in enumerate(batches):
+        if i == 0:
+            w.writerow(batch)
+        else:
+            w.writerows(batch)
+        yield output.getvalue()
+        output.seek(0)
+        output.truncate(0)
+
+def export_response(engine, info, fmt, table, columns, where_sql, params, order_sql, filename):
+    """Stream every matching row as CSV, Arrow IPC or Parquet, ignoring pagination."""
+    sql = text(f'SELECT {select_list(columns)} FROM "public"."{table}" {where_sql} {order_sql}')
+    batches = stream_batches(engine, sql, params)
+    if fmt == "csv":
+        return Response(
+            stream_with_context(csv_chunks(batches)),
+            mimetype="text/csv",
+            headers={"Content-Disposition":f"attachment;filename={filename}.csv"},
+        )
+    mimetype, ext = columnar.FORMATS[fmt]
+    return Response(
+        stream_with_context(columnar.encode(fmt, batches, info["types"])),
+        mimetype=mimetype,
+        headers={"Content-Disposition":f"attachment;filename={filename}.{ext}"},
+    )
+
+def export_format():
+    fmt = request.args.get("export", "").lower()
+    if not fmt:
+        return None
+    if fmt != "csv" and fmt not in columnar.FORMATS:
+        raise ValueError(f"Unsupported export format: {fmt}")
+    if fmt in columnar.FORMATS and not columnar.AVAILABLE:
+        raise ValueError(f"{fmt} export needs pyarrow installed on the server")
+    return fmt
+
+def list_rows(table, filename, filters=True):
+    """
+    Page through a table newest first. ?cursor= (empty for the first page)
+    switches to keyset pagination and returns next_cursor; otherwise
+    page/per_page use OFFSET as before. ?count=estimate adds an estimated
+    total from planner statistics. ?fields=a,b selects only those columns.
+    ?export=csv|arrow|parquet streams all matching rows.
+    """
     engine = get_engine()
     page, per_page, offset = paginate_params()
-    export = request.args.get("export", "").lower() == "csv"
-    sql = text(f'SELECT * FROM "public"."interview" ORDER BY 1 DESC LIMIT :limit OFFSET :offset')
+    token = request.args.get("cursor")
+    keyset = token is not None
+
     try:
+        export = export_format()
         with engine.connect() as conn:
-            rows = conn.execute(sql, {"limit": per_page, "offset": offset}).mappings().all()
-            data = [dict(r) for r in rows]
+            info = table_info(conn, table)
+            key = info["key"]
+            fields = field_params(info)
+            where, params = filter_params(info) if filters else ([], {})
+            filter_sql = ("WHERE " + " AND ".join(where)) if where else ""
+            order_sql = "ORDER BY " + ", ".join(f'"{c}" DESC' for c in key)
             if export:
-                if not data:
-                    return jsonify({"data": []})
-                output = io.StringIO()
-                w = csv.DictWriter(output, fieldnames=list(data[0].keys()))
-                w.writeheader()
-                w.writerows(data)
-                return Response(output.getvalue(), mimetype="text/csv", headers={"Content-Disposition":"attachment;filename=jobs.csv"})
-            return jsonify({"page": page, "per_page": per_page, "data": data})
+                return export_response(engine, info, export, table, fields, filter_sql, params, order_sql, filename)
+
+            if keyset and token:
+                values = decode_cursor(token, key)
+                cols = ", ".join(f'"{c}"' for c in key)
+                marks = ", ".join(f":c{i}" for i in range(len(key)))
+                where.append(f"({cols}) < ({marks})")
+                params.update({f"c{i}": v for i, v in enumerate(values)})
+
+            where_sql = ("WHERE " + " AND ".join(where)) if where else ""
+            # Keyset pages also need the sort key to build next_cursor
+            selected = fields + [c for c in key if keyset and c not in fields]
+            if keyset:
+                # One extra row tells us whether there is a next page
+                sql = text(f'SELECT {select_list(selected)} FROM "public"."{table}" {where_sql} {order_sql} LIMIT :limit')
+                params["limit"] = per_page + 1
+            else:
+                sql = text(f'SELECT {select_list(selected)} FROM "public"."{table}" {where_sql} {order_sql} LIMIT :limit OFFSET :offset')
+                params.update({"limit": per_page, "offset": offset})
+
+            rows = conn.execute(sql, params).mappings().all()
+            data = [dict(r) for r in rows]
+
+            next_cursor = None
+            if keyset and len(data) > per_page:
+                data = data[:per_page]
+                next_cursor = encode_cursor(data[-1], key)
+            if len(selected) > len(fields):
+                data = [{c: row[c] for c in fields} for row in data]
+
+            body = {"per_page": per_page, "data": data}
+            if keyset:
+                body["next_cursor"] = next_cursor
+            else:
+                body["page"] = page
+            if request.args.get("count") == "estimate":
+                body["estimated_total"] = estimated_count(
+                    conn, table, filter_sql, {k: v for k, v in params.items() if k.startswith("f")}
+                )
+            return jsonify(body)
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
     except Exception as e:
         return jsonify({"error": str(e)}), 500
+
+@bp.route("/results", methods=["GET"])
+def get_results():
+    return list_rows("results", "results")
+
+@bp.route("/jobs", methods=["GET"])
+def get_jobs():
+    return list_rows("interview", "jobs", filters=False)
@@ -0,0 +1,126 @@
+from flask import Blueprint, request, jsonify, redirect, Response
+from werkzeug.exceptions import RequestedRangeNotSatisfiable
+from werkzeug.security import safe_join
+from urllib.parse import quote
+from datetime import datetime, timezone
+from config import (
+    UPLOAD_DIR,
+    UPLOAD_BUFFER_BYTES,
+    MEDIA_CACHE_SECONDS,
+    MEDIA_PRESIGN_SECONDS,
+    MEDIA_OFFLOAD,
+    MEDIA_ACCEL_PREFIX,
+)
+from services import storage
+import os
+import stat
+
+media_bp = Blueprint("media", __name__)
+
+# Blob names are their content hash, so a cached copy can never be stale
+_IMMUTABLE = "private, max-age=31536000, immutable"
+
+
+def _read_range(f, length):
+    # Fallback body for servers without wsgi.file_wrapper: never reads past the range
+    try:
+        while length > 0:
+            buf = f.read(min(UPLOAD_BUFFER_BYTES, length))
+            if not buf:
+                break
+            length -= len(buf)
+            yield buf
+    finally:
+        f.close()
+
+
+def _resolve(name):
+    """(filesystem path, content type, etag, cache-control) for a recording URL path, or a redirect URL."""
+    parts = name.split("/")
+    # Dot-prefixed entries are in-progress uploads (.partial, blobs/.tmp)
+    if any(not p or p.startswith(".") for p in parts):
+        return None
+    if parts[0] != "blobs":
+        path = safe_join(UPLOAD_DIR, name)
+        return path and (path, storage.guess_content_type(name), None, f"private, max-age={MEDIA_CACHE_SECONDS}")
+
+    digest = parts[-1]
+    try:
+        if "/".join(parts[1:]) != storage.shard_key(digest):
+            return None
+    except ValueError:
+        return None
+    store = storage.get_store()
+    presigned = store.presigned_url(digest, MEDIA_PRESIGN_SECONDS)
+    if presigned:
+        return presigned
+    return store.path(digest), storage.content_type(digest), digest, _IMMUTABLE
+
+
+# ==============================================
+# Serve Recordings
+# URLs returned by the upload routes: flat legacy files and blobs/ab/cd/<digest>.
+# Supports Range (206), ETag / Last-Modified revalidation, and zero-copy
+# sends: gunicorn hands wsgi.file_wrapper bodies to sendfile(), or with
+# MEDIA_OFFLOAD the front proxy sends the file itself.
+# ==============================================
+@media_bp.route(f"/{UPLOAD_DIR.strip('/')}/<path:name>", methods=["GET", "HEAD"])
+def serve_recording(name):
+    resolved = _resolve(name)
+    if resolved is None:
+        return jsonify({"error": "Recording not found"}), 404
+    if isinstance(resolved, str):
+        response = redirect(resolved, 302)
+        response.headers["Cache-Control"] = "no-store"
+        return response
+
+    path, content_type, etag, cache_control = resolved
+    try:
+        st = os.stat(path)
+    except FileNotFoundError:
+        return jsonify({"error": "Recording not found"}), 404
+    if not stat.S_ISREG(st.st_mode):
+        return jsonify({"error": "Recording not found"}), 404
+
+    response = Response(mimetype=content_type)
+    response.set_etag(etag or f"{st.st_mtime_ns:x}-{st.st_size:x}")
+    response.last_modified = datetime.fromtimestamp(int(st.st_mtime), timezone.utc)
+    response.headers["Cache-Control"] = cache_control
+    response.headers["Accept-Ranges"] = "bytes"
+
+    # The proxy does its own Range and conditional handling on the file
+    if MEDIA_OFFLOAD == "x-accel-redirect":
+        relative = os.path.relpath(path, UPLOAD_DIR).replace(os.sep, "/")
+        response.headers["X-Accel-Redirect"] = quote(MEDIA_ACCEL_PREFIX.rstrip("/") + "/" + relative)
+        return response
+    if MEDIA_OFFLOAD == "x-sendfile":
+        response.headers["X-Sendfile"] = os.path.abspath(path)
+        return response
+
+    environ = request.environ
+    # werkzeug can't build multipart/byteranges and would answer 416; a
+    # server may ignore Range instead, so multi-range requests get the file
+    if request.range is not None and len(request.range.ranges) > 1:
+        environ = {k: v for k, v in environ.items() if k != "HTTP_RANGE"}
+    try:
+        response.make_conditional(environ, accept_ranges=True, complete_length=st.st_size)
+    except RequestedRangeNotSatisfiable as e:
+        return e.get_response()
+    if response.status_code == 304:
+        return response
+
+    if response.status_code == 206:
+        start, stop = response.content_range.start, response.content_range.stop
+    else:
+        start, stop = 0, st.st_size
+    response.content_length = stop - start
+    if request.method == "HEAD":
+        return response
+
+    f = open(path, "rb")
+    f.seek(start)
+    wrapper = request.environ.get("wsgi.file_wrapper")
+    # gunicorn sends exactly Content-Length bytes from the current offset
+    response.response = wrapper(f, UPLOAD_BUFFER_BYTES) if wrapper else _read_range(f, stop - start)
+    response.direct_passthrough = True
+    return response
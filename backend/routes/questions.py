@@ -1,13 +1,18 @@
 # File: routes/questions.py
 # Backend route handlers for question generation and finalization
 
-from flask import Blueprint, request, jsonify
-from services.generator import generate_questions
+from flask import Blueprint, request, jsonify, Response, stream_with_context
+from services.generator import generate_questions, iter_questions, count_questions
 import traceback
-from config import get_db_connection
+import time
+from config import db_connection
 from utils.ids import gen_uuid 
+from utils.validators import question_error
+from utils.bulk import bulk_insert
+from services import test_payload
 import datetime
 import json
+import uuid
 
 questions_bp = Blueprint("questions", __name__)
 
@@ -19,6 +24,10 @@ def generate_test():
     if not data or "skills" not in data:
         return jsonify({"error": "Invalid request, missing skills"}), 400
 
+    stream_format = _stream_format()
+    if stream_format:
+        return _stream_generate_test(data, stream_format)
+
     try:
         questions = generate_questions(data)
         # Return questions array wrapped in response object
@@ -34,28 +43,90 @@ def generate_test():
             "message": str(e)
         }), 500
 
+def _stream_format():
+    """Pick a streaming format from ?stream= or the Accept header, if any."""
+    requested = (request.args.get("stream") or "").lower()
+    if requested in ("ndjson", "sse"):
+        return requested
+    accept = request.headers.get("Accept", "")
+    if "text/event-stream" in accept:
+        return "sse"
+    if "application/x-ndjson" in accept:
+        return "ndjson"
+    return None
+
+
+def _stream_generate_test(data, stream_format):
+    """
+    Streams questions as they are generated. Events, in order:
+    start (total), then question + progress per question, then summary.
+    """
+    def encode(event):
+        if stream_format == "sse":
+            return f"event: {event['event']}\ndata: {json.dumps(event)}\n\n"
+        return json.dumps(event) + "\n"
+
+    def events():
+        started = time.monotonic()
+        total = count_questions(data)
+        completed = 0
+        failed = 0
+        yield encode({"event": "start", "total": total})
+
+        try:
+            for index, question in iter_questions(data):
+                completed += 1
+                if question.get("status") == "failed":
+                    failed += 1
+                yield encode({"event": "question", "index": index, "question": question})
+                yield encode({"event": "progress", "completed": completed, "total": total})
+        except Exception as e:
+            print("Error streaming test:", str(e))
+            traceback.print_exc()
+            yield encode({"event": "error", "message": str(e)})
+
+        yield encode({
+            "event": "summary",
+            "status": "success" if completed == total else "error",
+            "total": total,
+            "completed": completed,
+            "failed": failed,
+            "elapsed_seconds": round(time.monotonic() - started, 3),
+        })
+
+    mimetype = "text/event-stream" if stream_format == "sse" else "application/x-ndjson"
+    return Response(
+        stream_with_context(events()),
+        mimetype=mimetype,
+        headers={"Cache-Control": "no-cache", "X-Accel-Buffering": "no"},
+    )
+
 @questions_bp.route("/question-set/<question_set_id>/questions", methods=["GET"])
 def get_questions(question_set_id):
-    conn = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        cur.execute("SELECT content FROM questions WHERE question_set_id = %s", (question_set_id,))
-        rows = cur.fetchall()
-        questions = [
-            r[0] if isinstance(r[0], dict) else json.loads(r[0])
-            for r in rows
-        ]
-        return jsonify({
-            "status": "success",
-            "question_set_id": question_set_id,
-            "questions": questions
-        }), 200
+        with db_connection() as conn, conn.cursor() as cur:
+            # Optional filters use the typed columns from migration 0002
+            where = ["question_set_id = %s"]
+            params = [question_set_id]
+            for arg, column in (("type", "qtype"), ("skill", "skill"), ("difficulty", "difficulty")):
+                value = request.args.get(arg)
+                if value:
+                    where.append(f"{column} = %s")
+                    params.append(value)
+            cur.execute(f"SELECT content FROM questions WHERE {' AND '.join(where)}", params)
+            rows = cur.fetchall()
+            questions = [
+                r[0] if isinstance(r[0], dict) else json.loads(r[0])
+                for r in rows
+            ]
+            return jsonify({
+                "status": "success",
+                "question_set_id": question_set_id,
+                "questions": questions
+            }), 200
     except Exception as e:
         print(e)
         return jsonify({"status": "error", "message": str(e)}), 500
-    finally:
-        if conn: conn.close()
 
 def convert_ampm_to_24h(time_str):
     if not time_str:
@@ -117,142 +188,117 @@ def finalize_test():
         print("\nFirst question structure:")
         print(json.dumps(questions[0], indent=2))
 
-    conn = None
+    # Validate every question before touching the database
+    errors = [err for err in (question_error(i, q) for i, q in enumerate(questions, 1)) if err]
+    if errors:
+        print(f"ERROR: {len(errors)} invalid question(s), first: {errors[0]}")
+        return jsonify({
+            "status": "error",
+            "message": errors[0],
+            "errors": errors,
+            "error": "Validation failed"
+        }), 400
+
     try:
         print("\nAttempting to connect to database...")
-        conn = get_db_connection()
-        cur = conn.cursor()
-        print("✓ Database connection successful")
+        with db_connection() as conn, conn.cursor() as cur:
+            print("✓ Database connection successful")
 
-        # Generate unique question_set_id
-        question_set_id = gen_uuid()
-        print(f"Generated question_set_id: {question_set_id}")
+            # Generate unique question_set_id
+            question_set_id = gen_uuid()
+            print(f"Generated question_set_id: {question_set_id}")
         
-        # Calculate total duration
-        total_duration = sum(q.get("time_limit", 60) for q in questions)
-        print(f"Calculated total duration: {total_duration} seconds")
+            # Calculate total duration
+            total_duration = sum(q.get("time_limit", 60) for q in questions)
+            print(f"Calculated total duration: {total_duration} seconds")
 
-        # Set timestamps
-        created_at = datetime.datetime.utcnow()
+            # Set timestamps
+            created_at = datetime.datetime.utcnow()
 
-        # ✅ Use user selected end date/time if provided
-        exam_date = data.get("examDate")
-        start_time = data.get("startTime")
+            # ✅ Use user selected end date/time if provided
+            exam_date = data.get("examDate")
+            start_time = data.get("startTime")
 
-        end_date = data.get("endDate")
-        end_time = data.get("endTime")
+            end_date = data.get("endDate")
+            end_time = data.get("endTime")
 
-        print(f"Received exam date: {exam_date}, start time: {start_time}")
-        print(f"Received end date: {end_date}, end time: {end_time}")
+            print(f"Received exam date: {exam_date}, start time: {start_time}")
+            print(f"Received end date: {end_date}, end time: {end_time}")
 
-        # ✅ Build expiry_time correctly
-        if end_date and end_time:
-            end_time_24 = convert_ampm_to_24h(end_time)
-            if end_time_24:
-                expiry_time = datetime.datetime.fromisoformat(f"{end_date}T{end_time_24}:00")
+            # ✅ Build expiry_time correctly
+            if end_date and end_time:
+                end_time_24 = convert_ampm_to_24h(end_time)
+                if end_time_24:
+                    expiry_time = datetime.datetime.fromisoformat(f"{end_date}T{end_time_24}:00")
+                else:
+                    expiry_time = created_at + datetime.timedelta(hours=48)
             else:
+                # fallback to 48 hours if not provided
                 expiry_time = created_at + datetime.timedelta(hours=48)
-        else:
-            # fallback to 48 hours if not provided
-            expiry_time = created_at + datetime.timedelta(hours=48)
         
-        print("Parsed times:")
-        print("end_time_24:", end_time_24 if end_date else None)
-        print(f"Created at: {created_at}")
-        print(f"Expires at (final): {expiry_time}")
+            print("Parsed times:")
+            print("end_time_24:", end_time_24 if end_date else None)
+            print(f"Created at: {created_at}")
+            print(f"Expires at (final): {expiry_time}")
 
-        # Insert into question_set table
-        print("\nInserting into question_set table...")
-        try:
-            # Try with title and description columns
-            cur.execute("""
-                INSERT INTO question_set (id, job_id, title, description, duration, created_at, expiry_time)
-                VALUES (%s, %s, %s, %s, %s, %s, %s)
-            """, (question_set_id, job_id, test_title, test_description, total_duration, created_at, expiry_time))
-            print("✓ question_set inserted with title and description")
-        except Exception as col_error:
-            print(f"Warning: Could not insert with title/description: {col_error}")
-            print("Attempting fallback insert without title/description...")
-            conn.rollback()
-            cur.execute("""
-                INSERT INTO question_set (id, job_id, duration, created_at, expiry_time)
-                VALUES (%s, %s, %s, %s, %s)
-            """, (question_set_id, job_id, total_duration, created_at, expiry_time))
-            print("✓ question_set inserted (basic format)")
-
-        # Insert questions
-        print(f"\nProcessing {len(questions)} questions...")
-        for i, q in enumerate(questions, 1):
-            print(f"\n--- Processing question {i}/{len(questions)} ---")
-            
-            # Validate question structure
-            required_fields = ['type', 'skill', 'difficulty', 'content']
-            missing_fields = [field for field in required_fields if field not in q]
-            
-            if missing_fields:
-                error_msg = f"Question {i} missing required fields: {missing_fields}"
-                print(f"ERROR: {error_msg}")
-                print(f"Question data: {json.dumps(q, indent=2)}")
-                raise ValueError(error_msg)
-            
-            # Validate content is a dict
-            if not isinstance(q['content'], dict):
-                error_msg = f"Question {i} content must be a dictionary, got {type(q['content'])}"
-                print(f"ERROR: {error_msg}")
-                raise ValueError(error_msg)
-            
-            print(f"  Type: {q['type']}")
-            print(f"  Skill: {q['skill']}")
-            print(f"  Difficulty: {q['difficulty']}")
-            print(f"  Content keys: {list(q['content'].keys())}")
-            
-            # Get or generate question_id
-            question_id = q.get("question_id", gen_uuid())
-            print(f"  Question ID: {question_id}")
-            
+            # Insert into question_set table
+            print("\nInserting into question_set table...")
             try:
+                # Try with title and description columns
+                cur.execute("""
+                    INSERT INTO question_set (id, job_id, title, description, duration, created_at, expiry_time)
+                    VALUES (%s, %s, %s, %s, %s, %s, %s)
+                """, (question_set_id, job_id, test_title, test_description, total_duration, created_at, expiry_time))
+                print("✓ question_set inserted with title and description")
+            except Exception as col_error:
+                print(f"Warning: Could not insert with title/description: {col_error}")
+                print("Attempting fallback insert without title/description...")
+                conn.rollback()
                 cur.execute("""
-                    INSERT INTO questions (
-                        question_set_id, content, created_at
-                    )
-                    VALUES (%s, %s, %s)
-                """, (
-                    str(question_set_id),
-                    json.dumps(q),
-                    created_at
-                ))
-                print(f"  ✓ Question {i} inserted successfully")
-            except Exception as insert_error:
-                print(f"  ERROR inserting question {i}: {str(insert_error)}")
-                print(f"  Question data: {json.dumps(q, indent=2)}")
-                raise
-
-        print("\n" + "-"*50)
-        print("Committing transaction...")
-        conn.commit()
-        cur.close()
-        print("✓ Transaction committed successfully")
-
-        print(f"\n{'='*50}")
-        print(f"✓✓✓ SUCCESS ✓✓✓")
-        print(f"Test '{test_title}' finalized")
-        print(f"Question Set ID: {question_set_id}")
-        print(f"Questions stored: {len(questions)}")
-        print("="*50 + "\n")
+                    INSERT INTO question_set (id, job_id, duration, created_at, expiry_time)
+                    VALUES (%s, %s, %s, %s, %s)
+                """, (question_set_id, job_id, total_duration, created_at, expiry_time))
+                print("✓ question_set inserted (basic format)")
 
-        return jsonify({
-            "status": "success",
-            "question_set_id": question_set_id,
-            "test_title": test_title,
-            "expiry_time": expiry_time.isoformat(),
-            "message": f"Test '{test_title}' finalized and stored successfully"
-        }), 201
+            # Insert all questions in batched multi-row statements
+            # Ids are assigned here so the candidate payload can be built
+            # without reading the rows back
+            print(f"\nInserting {len(questions)} questions...")
+            rows = [(uuid.uuid4(), q) for q in questions]
+            inserted = bulk_insert(
+                cur, "questions", ("id", "question_set_id", "content", "created_at"),
+                ((qid, str(question_set_id), json.dumps(q), created_at) for qid, q in rows),
+            )
+            print(f"✓ {inserted} questions inserted")
+
+            # Serialize the /test/start payload once, in the same transaction
+            test_payload.store(cur, question_set_id, rows)
+            print("✓ Candidate payload stored")
+
+            print("\n" + "-"*50)
+            print("Committing transaction...")
+            conn.commit()
+            cur.close()
+            print("✓ Transaction committed successfully")
+
+            print(f"\n{'='*50}")
+            print(f"✓✓✓ SUCCESS ✓✓✓")
+            print(f"Test '{test_title}' finalized")
+            print(f"Question Set ID: {question_set_id}")
+            print(f"Questions stored: {len(questions)}")
+            print("="*50 + "\n")
+
+            return jsonify({
+                "status": "success",
+                "question_set_id": question_set_id,
+                "test_title": test_title,
+                "expiry_time": expiry_time.isoformat(),
+                "message": f"Test '{test_title}' finalized and stored successfully"
+            }), 201
 
     except ValueError as ve:
         # Validation errors
         print(f"\n❌ VALIDATION ERROR: {str(ve)}")
-        if conn:
-            conn.rollback()
         return jsonify({
             "status": "error", 
             "message": str(ve),
@@ -264,11 +310,8 @@ def finalize_test():
         print(f"\n❌ ERROR: {str(e)}")
         print("Full traceback:")
         traceback.print_exc()
-        
-        if conn:
-            print("Rolling back transaction...")
-            conn.rollback()
-            
+        print("Transaction rolled back")
+
         return jsonify({
             "status": "error", 
             "message": str(e),
@@ -276,7 +319,4 @@ def finalize_test():
         }), 500
 
     finally:
-        if conn:
-            print("Closing database connection...")
-            conn.close()
         print("="*50 + "\n")
\ No newline at end of file
@@ -1,15 +1,19 @@
-from flask import Blueprint, request, jsonify
-from config import get_db_connection
-from services.llm_client import evaluate_answer
+from flask import Blueprint, request, jsonify, Response
+from config import db_connection, EVAL_WORKERS, UPLOAD_DIR
+from utils.bulk import bulk_insert
+from services import test_payload, violations, storage, media_jobs
+from services.grading import load_questions, grade_objective, grade_keywords, needs_qa, attach_test_cases
+from services.eval_queue import (
+    needs_llm, evaluate_response, build_result, enqueue, notify_workers, job_status
+)
+from services.attempts import append_results, append_qa, load_arrays, load_qa
 import os
 import psycopg2
 import secrets
 import json
 import uuid
-from datetime import datetime
 from werkzeug.utils import secure_filename
 
-UPLOAD_DIR = os.getenv("UPLOAD_DIR", "recordings")
 os.makedirs(UPLOAD_DIR, exist_ok=True)
 
 test_bp = Blueprint("test", __name__)
@@ -19,57 +23,19 @@ test_bp = Blueprint("test", __name__)
 # ==============================================
 @test_bp.route("/test/start/<question_set_id>", methods=["GET"])
 def start_test(question_set_id):
-    conn = None
-    cursor = None
     try:
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            SELECT id, content
-            FROM questions
-            WHERE question_set_id = %s
-        """, (uuid.UUID(question_set_id),))
-        rows = cursor.fetchall()
-
-        questions_list = []
-
-        for qid, raw in rows:
-            # qid may be UUID object
-            qid_str = str(qid)
-            raw_json = json.loads(raw) if isinstance(raw, str) else raw
-            inner = raw_json.get("content", {})
-
-            questions_list.append({
-                "id": qid_str,
-                "question_id": qid_str,
-                "type": raw_json.get("type"),
-                "skill": raw_json.get("skill"),
-                "difficulty": raw_json.get("difficulty"),
-                "time_limit": raw_json.get("time_limit"),
-                "positive_marking": raw_json.get("positive_marking"),
-                "negative_marking": raw_json.get("negative_marking"),
-                "question": inner.get("question"),
-                "options": inner.get("options"),
-                "correct_answer": inner.get("correct_answer"),
-                "prompt_text": inner.get("prompt_text"),
-                "media_url": inner.get("media_url"),
-                "rubric": inner.get("rubric"),
-                "suggested_time_seconds": inner.get("suggested_time_seconds"),
-            })
-
-        return jsonify({
-            "question_set_id": question_set_id,
-            "questions": questions_list
-        }), 200
-
+        body, etag = test_payload.get(question_set_id)
+    except ValueError:
+        return jsonify({"error": "Invalid question_set_id"}), 400
     except Exception as e:
         print("🔥 start_test error:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
+    # Payloads are immutable per ETag: revalidate, and answer 304 on a match
+    response = Response(body, mimetype="application/json")
+    response.set_etag(etag)
+    response.headers["Cache-Control"] = "private, no-cache"
+    return response.make_conditional(request)
 
 # ==============================================
 # Save Violations
@@ -87,49 +53,22 @@ def save_violations():
     if not candidate_id or not question_set_id:
         return jsonify({"error": "candidate_id and question_set_id required"}), 400
 
-    conn = None
-    cur = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            INSERT INTO test_attempts (
-                candidate_id, question_set_id,
-                tab_switches, inactivities, face_not_visible
-            )
-            VALUES (%s, %s, %s, %s, %s)
-            ON CONFLICT (candidate_id, question_set_id)
-            DO UPDATE SET
-                tab_switches = EXCLUDED.tab_switches,
-                inactivities = EXCLUDED.inactivities,
-                face_not_visible = EXCLUDED.face_not_visible;
-        """, (
-            uuid.UUID(candidate_id),
-            uuid.UUID(question_set_id),
-            tab_switches,
-            inactivities,
-            face_not_visible
-        ))
-
-        conn.commit()
+        # Buffered and flushed in batches by services/violations.py
+        violations.record(candidate_id, question_set_id, tab_switches, inactivities, face_not_visible)
         return jsonify({"message": "Violations updated"}), 200
 
+    except (TypeError, ValueError) as e:
+        return jsonify({"error": f"Invalid violation report: {e}"}), 400
     except Exception as e:
         print("🔥 ERROR saving violations:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
-
 # ==============================================
 # Upload Audio
 # ==============================================
 @test_bp.route("/upload_audio", methods=["POST"])
 def upload_audio():
-    conn = None
-    cur = None
     try:
         if "audio" not in request.files:
             return jsonify({"error": "audio file required"}), 400
@@ -147,50 +86,32 @@ def upload_audio():
         except Exception:
             qa_data = []
 
-        ext = os.path.splitext(audio_file.filename)[1] or ".webm"
-        ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        safe = secure_filename(f"{candidate_id}_{ts}{ext}")
-        save_path = os.path.join(UPLOAD_DIR, safe)
-        audio_file.save(save_path)
-        audio_url = f"/{UPLOAD_DIR}/{safe}"
-
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            INSERT INTO test_attempts (
-                candidate_id, question_set_id, audio_url, qa_data
-            ) VALUES (%s, %s, %s, %s)
-            ON CONFLICT (candidate_id, question_set_id)
-            DO UPDATE SET
-                audio_url = COALESCE(EXCLUDED.audio_url, test_attempts.audio_url),
-                qa_data = COALESCE(test_attempts.qa_data, '[]'::jsonb) || COALESCE(EXCLUDED.qa_data, '[]'::jsonb);
-        """, (
-            uuid.UUID(candidate_id),
-            uuid.UUID(question_set_id),
-            audio_url,
-            json.dumps(qa_data)
-        ))
-
-        conn.commit()
-
-        return jsonify({"status": "success", "audio_url": audio_url}), 200
+        # Hashed while streamed into content-addressed storage (services/storage.py)
+        store = storage.get_store()
+        content_type = audio_file.mimetype or storage.guess_content_type(audio_file.filename, "audio/webm")
+        blob = store.put_stream(audio_file.stream, content_type)
+        audio_url = store.url(blob.digest)
+
+        with db_connection() as conn, conn.cursor() as cur:
+            append_qa(cur, candidate_id, question_set_id, "audio", qa_data,
+                      media_column="audio_url", media_url=audio_url)
+            storage.index(cur, blob, candidate_id, question_set_id, "audio", qa_data,
+                          secure_filename(audio_file.filename))
+            media_jobs.enqueue(cur, blob, "audio", candidate_id, question_set_id)
+            conn.commit()
+            media_jobs.notify_workers()
+
+            return jsonify({"status": "success", "audio_url": audio_url}), 200
 
     except Exception as e:
         print("🔥 upload_audio error:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
-
 # ==============================================
 # Upload Video
 # ==============================================
 @test_bp.route("/upload_video", methods=["POST"])
 def upload_video():
-    conn = None
-    cur = None
     try:
         if "file" not in request.files:
             return jsonify({"error": "video file required"}), 400
@@ -208,43 +129,26 @@ def upload_video():
         except Exception:
             qa_data = []
 
-        safe = secure_filename(video_file.filename)
-        ts = datetime.utcnow().strftime("%Y%m%d%H%M%S")
-        final_name = f"{candidate_id}_{ts}_{safe}"
-        save_path = os.path.join(UPLOAD_DIR, final_name)
-        video_file.save(save_path)
-        video_url = f"/{UPLOAD_DIR}/{final_name}"
-
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            INSERT INTO test_attempts (
-                candidate_id, question_set_id, video_url, qa_data
-            ) VALUES (%s, %s, %s, %s)
-            ON CONFLICT (candidate_id, question_set_id)
-            DO UPDATE SET
-                video_url = COALESCE(EXCLUDED.video_url, test_attempts.video_url),
-                qa_data = COALESCE(test_attempts.qa_data, '[]'::jsonb) || COALESCE(EXCLUDED.qa_data, '[]'::jsonb);
-        """, (
-            uuid.UUID(candidate_id),
-            uuid.UUID(question_set_id),
-            video_url,
-            json.dumps(qa_data)
-        ))
-
-        conn.commit()
-
-        return jsonify({"status": "success", "video_url": video_url}), 200
+        store = storage.get_store()
+        content_type = video_file.mimetype or storage.guess_content_type(video_file.filename, "video/webm")
+        blob = store.put_stream(video_file.stream, content_type)
+        video_url = store.url(blob.digest)
+
+        with db_connection() as conn, conn.cursor() as cur:
+            append_qa(cur, candidate_id, question_set_id, "video", qa_data,
+                      media_column="video_url", media_url=video_url)
+            storage.index(cur, blob, candidate_id, question_set_id, "video", qa_data,
+                          secure_filename(video_file.filename))
+            media_jobs.enqueue(cur, blob, "video", candidate_id, question_set_id)
+            conn.commit()
+            media_jobs.notify_workers()
+
+            return jsonify({"status": "success", "video_url": video_url}), 200
 
     except Exception as e:
         print("🔥 upload_video error:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
-
 # ==============================================
 # Submit Section
 # ==============================================
@@ -260,62 +164,40 @@ def submit_section():
     if not candidate_id or not question_set_id:
         return jsonify({"error": "candidate_id and question_set_id required"}), 400
 
-    conn = None
-    cursor = None
     try:
-        results_out = []
-
-        for r in responses:
-            qid = r.get("question_id")
-            qtype = r.get("question_type")
-            qtext = r.get("question_text")
-            correct = r.get("correct_answer")
-            answer = r.get("candidate_answer")
-
-            if qtype in ["mcq", "coding"]:
-                try:
-                    evaluation = evaluate_answer(
-                        question_type=qtype,
-                        question_text=qtext,
-                        correct_answer=correct,
-                        candidate_answer=answer,
-                    )
-                except Exception:
-                    evaluation = {"score": 0, "feedback": "Evaluation failed", "is_correct": False}
-            else:
-                evaluation = {"score": None, "feedback": "Not evaluated", "is_correct": False}
-
-            results_out.append({
-                "question_id": qid,
-                "candidate_answer": answer,
-                "correct_answer": correct,
-                "section_name": section_name,
-                "score": evaluation.get("score"),
-                "is_correct": evaluation.get("is_correct"),
-                "feedback": evaluation.get("feedback")
-            })
-
-        conn = get_db_connection()
-        cursor = conn.cursor()
-
-        cursor.execute("""
-            INSERT INTO test_attempts (
-                candidate_id, question_set_id, results_data
-            )
-            VALUES (%s, %s, %s)
-            ON CONFLICT (candidate_id, question_set_id)
-            DO UPDATE SET
-                results_data = COALESCE(test_attempts.results_data, '[]'::jsonb) || EXCLUDED.results_data,
-                video_url = COALESCE(EXCLUDED.video_url, test_attempts.video_url),
-                audio_url = COALESCE(EXCLUDED.audio_url, test_attempts.audio_url),
-                qa_data = COALESCE(test_attempts.qa_data, '[]'::jsonb);
-        """, (
-            uuid.UUID(candidate_id),
-            uuid.UUID(question_set_id),
-            json.dumps(results_out)
-        ))
-
-        conn.commit()
+        # Read what grading needs, then give the connection back: local code
+        # runs and LLM calls below must not hold a pooled connection
+        with db_connection() as conn, conn.cursor() as cursor:
+            stored = load_questions(cursor, [r.get("question_id") for r in responses])
+            qa_entries = load_qa(cursor, candidate_id, question_set_id) if needs_qa(responses, stored) else ()
+            conn.commit()
+
+        # Objective types are scored locally in one pass against stored questions,
+        # audio/video get preliminary keyword scores from their answers / transcripts
+        graded = grade_objective(responses, stored)
+        graded.update(grade_keywords(responses, stored, qa_entries))
+        attach_test_cases(responses, stored)
+        for i, r in enumerate(responses):
+            if i not in graded and (not needs_llm(r) or EVAL_WORKERS <= 0):
+                graded[i] = evaluate_response(r)
+
+        # Anything left needs the LLM: persist the raw responses and let the
+        # evaluation workers pick the job up
+        if len(graded) < len(responses):
+            with db_connection() as conn:
+                job_id = enqueue(conn, candidate_id, question_set_id, section_name, responses, graded)
+                conn.commit()
+            notify_workers()
+            return jsonify({
+                "message": "Section queued for evaluation",
+                "job_id": job_id,
+                "status": "queued"
+            }), 202
+
+        results_out = [build_result(r, graded[i], section_name) for i, r in enumerate(responses)]
+        with db_connection() as conn, conn.cursor() as cursor:
+            append_results(cursor, candidate_id, question_set_id, results_out)
+            conn.commit()
 
         return jsonify({"message": "Section stored", "evaluations": results_out}), 200
 
@@ -323,9 +205,44 @@ def submit_section():
         print("🔥 submit_section error:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cursor: cursor.close()
-        if conn: conn.close()
+# ==============================================
+# Evaluation Status
+# ==============================================
+@test_bp.route("/test/evaluation/<job_id>", methods=["GET"])
+def evaluation_status(job_id):
+    try:
+        status = job_status(job_id)
+        if status is None:
+            return jsonify({"error": "job not found"}), 404
+        return jsonify(status), 200
+
+    except ValueError:
+        return jsonify({"error": "invalid job_id"}), 400
+
+    except Exception as e:
+        print("🔥 evaluation_status error:", e)
+        return jsonify({"error": str(e)}), 500
+
+# ==============================================
+# Attempt Responses (aggregated view)
+# ==============================================
+@test_bp.route("/test/attempt/<question_set_id>/<candidate_id>", methods=["GET"])
+def get_attempt_responses(question_set_id, candidate_id):
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            arrays = load_arrays(cur, candidate_id, question_set_id)
+            if arrays is None:
+                return jsonify({"error": "Attempt not found"}), 404
+            recordings = storage.find(cur, candidate_id, question_set_id)
+        return jsonify({
+            "candidate_id": candidate_id, "question_set_id": question_set_id,
+            **arrays, "recordings": recordings,
+        }), 200
+    except ValueError:
+        return jsonify({"error": "Invalid candidate_id or question_set_id"}), 400
+    except Exception as e:
+        print("🔥 get_attempt_responses error:", e)
+        return jsonify({"error": str(e)}), 500
 
 # ==============================================
 # Save Full Test Details (role, skills, exp, schedule)
@@ -347,49 +264,41 @@ def save_test_details():
     test_start = data.get("test_start")  # expect ISO8601 or postgres-parsable
     test_end = data.get("test_end")
 
-    conn = None
-    cur = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        cur.execute("""
-            INSERT INTO candidate_test_details (
-                candidate_id, question_set_id,
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                INSERT INTO candidate_test_details (
+                    candidate_id, question_set_id,
+                    role_title, skills, experience,
+                    work_arrangement, location, annual_compensation,
+                    test_start, test_end
+                )
+                VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
+                ON CONFLICT (candidate_id, question_set_id)
+                DO UPDATE SET
+                    role_title = EXCLUDED.role_title,
+                    skills = EXCLUDED.skills,
+                    experience = EXCLUDED.experience,
+                    work_arrangement = EXCLUDED.work_arrangement,
+                    location = EXCLUDED.location,
+                    annual_compensation = EXCLUDED.annual_compensation,
+                    test_start = EXCLUDED.test_start,
+                    test_end = EXCLUDED.test_end;
+            """, (
+                uuid.UUID(candidate_id),
+                uuid.UUID(question_set_id),
                 role_title, skills, experience,
                 work_arrangement, location, annual_compensation,
                 test_start, test_end
-            )
-            VALUES (%s, %s, %s, %s, %s, %s, %s, %s, %s)
-            ON CONFLICT (candidate_id, question_set_id)
-            DO UPDATE SET
-                role_title = EXCLUDED.role_title,
-                skills = EXCLUDED.skills,
-                experience = EXCLUDED.experience,
-                work_arrangement = EXCLUDED.work_arrangement,
-                location = EXCLUDED.location,
-                annual_compensation = EXCLUDED.annual_compensation,
-                test_start = EXCLUDED.test_start,
-                test_end = EXCLUDED.test_end;
-        """, (
-            uuid.UUID(candidate_id),
-            uuid.UUID(question_set_id),
-            role_title, skills, experience,
-            work_arrangement, location, annual_compensation,
-            test_start, test_end
-        ))
-
-        conn.commit()
-        return jsonify({"message": "Test details saved successfully", "candidate_id": candidate_id, "question_set_id": question_set_id}), 200
+            ))
+
+            conn.commit()
+            return jsonify({"message": "Test details saved successfully", "candidate_id": candidate_id, "question_set_id": question_set_id}), 200
 
     except Exception as e:
         print("🔥 save_details error:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
-
 # ==============================================
 # Save Generated Questions
 # ==============================================
@@ -403,47 +312,39 @@ def save_generated_questions():
     if not isinstance(questions, list):
         return jsonify({"error": "questions must be a list"}), 400
 
-    conn = None
-    cur = None
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-
-        for q in questions:
-            qid = uuid.uuid4()
-            # ensure content is stored under a consistent shape
-            content = q.get("content") if isinstance(q, dict) else q
-            # allow top-level fields like type/skill to be at root
-            entry = {
-                "type": q.get("type"),
-                "skill": q.get("skill"),
-                "difficulty": q.get("difficulty"),
-                "time_limit": q.get("time_limit"),
-                "positive_marking": q.get("positive_marking"),
-                "negative_marking": q.get("negative_marking"),
-                "content": content
-            }
-
-            cur.execute("""
-                INSERT INTO questions (id, question_set_id, content)
-                VALUES (%s, %s, %s)
-            """, (
-                qid,
-                uuid.UUID(question_set_id),
-                json.dumps(entry)
-            ))
+        question_set_id = uuid.UUID(str(question_set_id))
+    except ValueError:
+        return jsonify({"error": "Invalid question_set_id"}), 400
+
+    # Build every row up front so a bad entry fails before any database work
+    rows = []
+    for i, q in enumerate(questions, 1):
+        if not isinstance(q, dict):
+            return jsonify({"error": f"Question {i} must be an object"}), 400
+        # allow top-level fields like type/skill to be at root
+        entry = {
+            "type": q.get("type"),
+            "skill": q.get("skill"),
+            "difficulty": q.get("difficulty"),
+            "time_limit": q.get("time_limit"),
+            "positive_marking": q.get("positive_marking"),
+            "negative_marking": q.get("negative_marking"),
+            "content": q.get("content")
+        }
+        rows.append((uuid.uuid4(), question_set_id, json.dumps(entry)))
 
-        conn.commit()
-        return jsonify({"message": "Questions saved successfully", "question_set_id": question_set_id}), 200
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            bulk_insert(cur, "questions", ("id", "question_set_id", "content"), rows)
+            test_payload.rebuild(cur, question_set_id)
+            conn.commit()
+            return jsonify({"message": "Questions saved successfully", "question_set_id": str(question_set_id)}), 200
 
     except Exception as e:
         print("🔥 Error saving questions:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if cur: cur.close()
-        if conn: conn.close()
-
 # ==============================================
 # Optional: Create session - returns candidate_id & question_set_id
 # ==============================================
@@ -454,22 +355,18 @@ def create_session():
     question_set_id = data.get("question_set_id") or str(uuid.uuid4())
 
     try:
-        conn = get_db_connection()
-        cur = conn.cursor()
-        # create a placeholder row in test_attempts so ON CONFLICT works later
-        cur.execute("""
-            INSERT INTO test_attempts (candidate_id, question_set_id)
-            VALUES (%s, %s)
-            ON CONFLICT (candidate_id, question_set_id) DO NOTHING
-        """, (uuid.UUID(candidate_id), uuid.UUID(question_set_id)))
-        conn.commit()
-
-        return jsonify({"candidate_id": candidate_id, "question_set_id": question_set_id}), 200
+        with db_connection() as conn, conn.cursor() as cur:
+            # create a placeholder row in test_attempts so ON CONFLICT works later
+            cur.execute("""
+                INSERT INTO test_attempts (candidate_id, question_set_id)
+                VALUES (%s, %s)
+                ON CONFLICT (candidate_id, question_set_id) DO NOTHING
+            """, (uuid.UUID(candidate_id), uuid.UUID(question_set_id)))
+            conn.commit()
+
+            return jsonify({"candidate_id": candidate_id, "question_set_id": question_set_id}), 200
 
     except Exception as e:
         print("🔥 create_session error:", e)
         return jsonify({"error": str(e)}), 500
 
-    finally:
-        if 'cur' in locals(): cur.close()
-        if 'conn' in locals(): conn.close()
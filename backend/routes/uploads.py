@@ -0,0 +1,99 @@
+from flask import Blueprint, request, jsonify
+from services import uploads
+from services.uploads import UploadConflict
+
+uploads_bp = Blueprint("uploads", __name__)
+
+
+def _conflict(e):
+    return jsonify({"error": str(e), "received": e.received}), 409
+
+
+# ==============================================
+# Resumable uploads
+#   POST /uploads                 -> open an upload, returns upload_id + chunk_size
+#   GET  /uploads/<id>            -> bytes received so far (where to resume)
+#   PUT  /uploads/<id>            -> one chunk at Upload-Offset (optional Upload-Checksum)
+#   POST /uploads/<id>/complete   -> finalize and record on the attempt
+# ==============================================
+@uploads_bp.route("/uploads", methods=["POST"])
+def create_upload():
+    data = request.get_json() or {}
+    if not data.get("candidate_id") or not data.get("question_set_id"):
+        return jsonify({"error": "candidate_id and question_set_id required"}), 400
+
+    try:
+        info = uploads.create(
+            data.get("kind"),
+            data.get("candidate_id"),
+            data.get("question_set_id"),
+            data.get("filename"),
+            size=data.get("size"),
+            qa_data=data.get("qa_data"),
+        )
+        return jsonify(info), 201
+    except (ValueError, TypeError) as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("🔥 create_upload error:", e)
+        return jsonify({"error": str(e)}), 500
+
+
+@uploads_bp.route("/uploads/<upload_id>", methods=["GET", "HEAD"])
+def upload_status(upload_id):
+    try:
+        info = uploads.get(upload_id)
+    except ValueError:
+        return jsonify({"error": "Invalid upload_id"}), 400
+    except Exception as e:
+        print("🔥 upload_status error:", e)
+        return jsonify({"error": str(e)}), 500
+
+    if info is None:
+        return jsonify({"error": "Upload not found"}), 404
+    response = jsonify(info)
+    response.headers["Upload-Offset"] = str(info["received"])
+    response.headers["Cache-Control"] = "no-store"
+    return response
+
+
+@uploads_bp.route("/uploads/<upload_id>", methods=["PUT", "PATCH"])
+def upload_chunk(upload_id):
+    try:
+        offset = int(request.headers.get("Upload-Offset", request.args.get("offset", 0)))
+        checksum = uploads.parse_checksum(request.headers.get("Upload-Checksum"))
+        # Read from the raw stream so the chunk never sits in memory whole
+        received = uploads.write_chunk(upload_id, offset, request.stream, request.content_length, checksum)
+    except UploadConflict as e:
+        return _conflict(e)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("🔥 upload_chunk error:", e)
+        return jsonify({"error": str(e)}), 500
+
+    response = jsonify({"upload_id": upload_id, "received": received})
+    response.headers["Upload-Offset"] = str(received)
+    return response
+
+
+@uploads_bp.route("/uploads/<upload_id>/complete", methods=["POST"])
+def complete_upload(upload_id):
+    data = request.get_json(silent=True) or {}
+    try:
+        checksum = uploads.parse_checksum(
+            request.headers.get("Upload-Checksum") or data.get("checksum")
+        )
+        info = uploads.complete(upload_id, checksum)
+        return jsonify(info), 200
+    except UploadConflict as e:
+        return _conflict(e)
+    except LookupError as e:
+        return jsonify({"error": str(e)}), 404
+    except ValueError as e:
+        return jsonify({"error": str(e)}), 400
+    except Exception as e:
+        print("🔥 complete_upload error:", e)
+        return jsonify({"error": str(e)}), 500
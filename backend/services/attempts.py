@@ -0,0 +1,94 @@
+import json
+import uuid
+from utils.bulk import bulk_insert
+
+
+def _ensure_attempt(cur, candidate_id, question_set_id):
+    # The test_attempts row anchors the attempt; an existing row is left untouched
+    cur.execute("""
+        INSERT INTO test_attempts (candidate_id, question_set_id)
+        VALUES (%s, %s)
+        ON CONFLICT (candidate_id, question_set_id) DO NOTHING
+    """, (candidate_id, question_set_id))
+
+
+def append_results(cur, candidate_id, question_set_id, results_out, job_id=None):
+    """
+    Store a section's evaluated responses as rows in attempt_responses.
+    Cost depends only on the section size, not on how long the attempt is.
+    Rows from an evaluation job are keyed by (job_id, index), so writing the
+    same job's results again is a no-op.
+    """
+    candidate_id = uuid.UUID(str(candidate_id))
+    question_set_id = uuid.UUID(str(question_set_id))
+    _ensure_attempt(cur, candidate_id, question_set_id)
+    bulk_insert(
+        cur,
+        "attempt_responses",
+        ("candidate_id", "question_set_id", "question_id", "section_name", "result", "job_id", "job_idx"),
+        (
+            (candidate_id, question_set_id,
+             None if r.get("question_id") is None else str(r.get("question_id")),
+             r.get("section_name"), json.dumps(r),
+             job_id, None if job_id is None else i)
+            for i, r in enumerate(results_out)
+        ),
+        on_conflict="ON CONFLICT (job_id, job_idx) DO NOTHING" if job_id is not None else "",
+    )
+
+
+def append_qa(cur, candidate_id, question_set_id, source, qa_data, media_column=None, media_url=None):
+    """
+    Store interview QA entries from an audio/video upload as rows in
+    attempt_qa, and record the media URL on the attempt when given.
+    """
+    candidate_id = uuid.UUID(str(candidate_id))
+    question_set_id = uuid.UUID(str(question_set_id))
+    if media_column:
+        cur.execute(f"""
+            INSERT INTO test_attempts (candidate_id, question_set_id, {media_column})
+            VALUES (%s, %s, %s)
+            ON CONFLICT (candidate_id, question_set_id)
+            DO UPDATE SET {media_column} = COALESCE(EXCLUDED.{media_column}, test_attempts.{media_column})
+        """, (candidate_id, question_set_id, media_url))
+    else:
+        _ensure_attempt(cur, candidate_id, question_set_id)
+
+    entries = qa_data if isinstance(qa_data, list) else [qa_data]
+    bulk_insert(
+        cur,
+        "attempt_qa",
+        ("candidate_id", "question_set_id", "source", "entry"),
+        ((candidate_id, question_set_id, source, json.dumps(e)) for e in entries if e is not None),
+    )
+
+
+def load_arrays(cur, candidate_id, question_set_id):
+    """
+    Aggregated results_data / qa_data for an attempt, in the shape the
+    JSONB columns used to hold. The columns themselves are frozen (migration
+    0009), so this is the only complete read. Returns None when the attempt
+    doesn't exist.
+    """
+    cur.execute("""
+        SELECT results_data, qa_data FROM attempt_arrays
+        WHERE candidate_id = %s AND question_set_id = %s
+    """, (uuid.UUID(str(candidate_id)), uuid.UUID(str(question_set_id))))
+    row = cur.fetchone()
+    if row is None:
+        return None
+    results_data, qa_data = (v if not isinstance(v, str) else json.loads(v) for v in row)
+    return {"results_data": results_data or [], "qa_data": qa_data or []}
+
+
+def load_qa(cur, candidate_id, question_set_id):
+    """An attempt's interview QA entries (oldest first), or [] when there are none."""
+    cur.execute("""
+        SELECT qa_data FROM attempt_arrays
+        WHERE candidate_id = %s AND question_set_id = %s
+    """, (uuid.UUID(str(candidate_id)), uuid.UUID(str(question_set_id))))
+    row = cur.fetchone()
+    qa_data = row[0] if row else None
+    if isinstance(qa_data, str):
+        qa_data = json.loads(qa_data)
+    return qa_data or []
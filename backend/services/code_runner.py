@@ -0,0 +1,244 @@
+import os
+import sys
+import json
+import time
+import shlex
+import shutil
+import signal
+import tempfile
+import subprocess
+import threading
+from config import (
+    CODE_RUNNER_CONCURRENCY,
+    CODE_RUNNER_CPU_SECONDS,
+    CODE_RUNNER_MEMORY_MB,
+    CODE_RUNNER_WALL_SECONDS,
+    CODE_RUNNER_MAX_PROCESSES,
+    CODE_RUNNER_SANDBOX_CMD,
+    CODE_RUNNER_ALLOW_UNSANDBOXED,
+)
+
+SUPPORTED_LANGUAGES = {"python"}
+
+# Caps how many candidate programs run at once across the whole process
+_slots = threading.BoundedSemaphore(CODE_RUNNER_CONCURRENCY)
+
+# Isolation candidates for CODE_RUNNER_SANDBOX_CMD=auto, tried in order
+_SANDBOXES = (
+    "bwrap --unshare-all --die-with-parent --new-session --ro-bind /usr /usr"
+    " --ro-bind-try /lib /lib --ro-bind-try /lib64 /lib64 --ro-bind-try /bin /bin"
+    " --ro-bind-try {prefix} {prefix} --proc /proc --dev /dev --tmpfs /tmp"
+    " --bind {workdir} {workdir} --chdir {workdir}",
+    "unshare --net --pid --fork --kill-child --mount-proc --map-root-user",
+)
+
+
+class SandboxUnavailable(RuntimeError):
+    """No working OS-level sandbox, so candidate code must not be run."""
+
+
+# Runs before candidate code: applies CPU/memory/file/process limits, hides
+# the socket modules (the real network barrier is the sandbox), then execs
+# main.py as __main__.
+_PRELUDE = """
+import sys
+try:
+    import resource
+    resource.setrlimit(resource.RLIMIT_CPU, ({cpu}, {cpu} + 1))
+    resource.setrlimit(resource.RLIMIT_AS, ({memory}, {memory}))
+    resource.setrlimit(resource.RLIMIT_FSIZE, (1048576, 1048576))
+    resource.setrlimit(resource.RLIMIT_CORE, (0, 0))
+    resource.setrlimit(resource.RLIMIT_NPROC, ({nproc}, {nproc}))
+except ImportError:
+    pass
+import os, signal
+# Exit with a plain status on the CPU limit: not every sandbox passes a
+# child's death-by-signal through (unshare turns SIGXCPU into exit 1)
+signal.signal(signal.SIGXCPU, lambda *_, _exit=os._exit, _code=128 + signal.SIGXCPU: _exit(_code))
+del os, signal
+for _name in ("socket", "_socket", "ssl", "_ssl"):
+    sys.modules[_name] = None
+del _name
+with open("main.py") as _f:
+    _src = _f.read()
+sys.argv = ["main.py"]
+exec(compile(_src, "main.py", "exec"), {{"__name__": "__main__"}})
+""".format(cpu=CODE_RUNNER_CPU_SECONDS, memory=CODE_RUNNER_MEMORY_MB * 1024 * 1024,
+           nproc=CODE_RUNNER_MAX_PROCESSES)
+
+_sandbox = None
+_sandbox_lock = threading.Lock()
+
+
+def _sandbox_cmd(template, workdir):
+    prefix = os.path.realpath(sys.base_prefix)
+    return [part.format(workdir=workdir, prefix=prefix) for part in shlex.split(template)]
+
+
+def _probe(template):
+    """True when `template` can actually start an interpreter here."""
+    if not shutil.which(shlex.split(template)[0]):
+        return False
+    with tempfile.TemporaryDirectory(prefix="coderun-probe-") as workdir:
+        try:
+            proc = subprocess.run(
+                _sandbox_cmd(template, workdir) + [sys.executable, "-I", "-S", "-c", "pass"],
+                cwd=workdir, capture_output=True, timeout=10,
+            )
+        except (OSError, subprocess.TimeoutExpired):
+            return False
+    return proc.returncode == 0
+
+
+def sandbox():
+    """
+    The sandbox command template candidate code runs under, resolved once
+    per process. "" means unsandboxed (only when explicitly allowed); raises
+    SandboxUnavailable otherwise.
+    """
+    global _sandbox
+    with _sandbox_lock:
+        if _sandbox is None:
+            setting = CODE_RUNNER_SANDBOX_CMD.strip()
+            options = _SANDBOXES if setting.lower() == "auto" else ((setting,) if setting else ())
+            _sandbox = next((t for t in options if _probe(t)), "")
+            if _sandbox:
+                print("Code runner sandbox:", shlex.split(_sandbox)[0])
+            elif CODE_RUNNER_ALLOW_UNSANDBOXED:
+                print("⚠️ Code runner has no working sandbox; running candidate code unsandboxed")
+            else:
+                print("🔥 Code runner has no working sandbox; coding answers won't be executed")
+    if not _sandbox and not CODE_RUNNER_ALLOW_UNSANDBOXED:
+        raise SandboxUnavailable("no working sandbox for candidate code (see CODE_RUNNER_SANDBOX_CMD)")
+    return _sandbox
+
+
+def _kill_group(proc):
+    # The candidate runs in its own session: take down everything it started
+    try:
+        os.killpg(proc.pid, signal.SIGKILL)
+    except (ProcessLookupError, PermissionError):
+        pass
+
+
+def _as_text(value):
+    if value is None:
+        return ""
+    if isinstance(value, str):
+        return value
+    return json.dumps(value)
+
+
+def _normalize_output(text):
+    return "\n".join(line.rstrip() for line in str(text).strip().splitlines())
+
+
+def extract_cases(content):
+    """
+    Collect runnable {input, output} cases from a coding question's
+    examples and hidden_tests. Entries without an expected output are skipped.
+    """
+    cases = []
+    for source in ("examples", "hidden_tests"):
+        for ex in (content or {}).get(source) or []:
+            if not isinstance(ex, dict):
+                continue
+            expected = ex.get("output", ex.get("expected_output"))
+            if expected is None:
+                continue
+            cases.append({
+                "input": _as_text(ex.get("input")),
+                "output": _as_text(expected),
+                "hidden": source == "hidden_tests",
+            })
+    return cases
+
+
+def _run_case(workdir, case, template):
+    cmd = _sandbox_cmd(template, workdir) + [sys.executable, "-I", "-S", "-c", _PRELUDE]
+    started = time.monotonic()
+    proc = subprocess.Popen(
+        cmd,
+        stdin=subprocess.PIPE,
+        stdout=subprocess.PIPE,
+        stderr=subprocess.PIPE,
+        text=True,
+        cwd=workdir,
+        env={"PATH": "/usr/bin:/bin", "PYTHONHASHSEED": "0"},
+        start_new_session=True,
+    )
+    try:
+        stdout, stderr = proc.communicate(case["input"], timeout=CODE_RUNNER_WALL_SECONDS)
+    except subprocess.TimeoutExpired:
+        _kill_group(proc)
+        proc.communicate()
+        return {
+            "passed": False,
+            "time_ms": round((time.monotonic() - started) * 1000, 1),
+            "error": "Time limit exceeded",
+        }
+    finally:
+        # Also reaps anything left running in the group after a normal exit
+        _kill_group(proc)
+
+    elapsed = round((time.monotonic() - started) * 1000, 1)
+    if proc.returncode == 128 + signal.SIGXCPU:
+        return {"passed": False, "time_ms": elapsed, "error": "CPU time limit exceeded"}
+    if proc.returncode < 0:
+        return {"passed": False, "time_ms": elapsed, "error": "Killed: resource limit exceeded"}
+    if proc.returncode != 0:
+        stderr = stderr.strip().splitlines()
+        return {
+            "passed": False,
+            "time_ms": elapsed,
+            "error": stderr[-1] if stderr else f"Exited with code {proc.returncode}",
+        }
+
+    passed = _normalize_output(stdout) == _normalize_output(case["output"])
+    return {"passed": passed, "time_ms": elapsed, "error": None if passed else "Wrong answer"}
+
+
+def run_tests(code, cases, language="python"):
+    """
+    Run candidate code against each case in a fresh, sandboxed and
+    resource-limited subprocess. Returns pass counts, per-case results and
+    timings. Raises SandboxUnavailable when there is no sandbox to run in.
+    """
+    language = (language or "python").lower()
+    if language not in SUPPORTED_LANGUAGES:
+        raise ValueError(f"Unsupported language for local execution: {language}")
+    template = sandbox()
+
+    results = []
+    with _slots, tempfile.TemporaryDirectory(prefix="coderun-") as workdir:
+        with open(os.path.join(workdir, "main.py"), "w") as f:
+            f.write(code or "")
+
+        for case in cases:
+            result = _run_case(workdir, case, template)
+            result["hidden"] = case.get("hidden", False)
+            if not result["hidden"]:
+                result["input"] = case["input"]
+            results.append(result)
+
+    passed = sum(1 for r in results if r["passed"])
+    return {
+        "passed": passed,
+        "total": len(results),
+        "total_time_ms": round(sum(r["time_ms"] for r in results), 1),
+        "max_time_ms": max((r["time_ms"] for r in results), default=0),
+        "results": results,
+    }
+
+
+def grade_coding(code, cases, language="python", max_score=10):
+    """Turn run_tests output into an evaluation dict for submit_section."""
+    run = run_tests(code, cases, language)
+    total = run["total"]
+    score = round(max_score * run["passed"] / total, 2) if total else 0
+    return {
+        "score": score,
+        "is_correct": total > 0 and run["passed"] == total,
+        "feedback": f"Passed {run['passed']}/{total} test cases",
+        "execution": run,
+    }
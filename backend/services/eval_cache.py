@@ -0,0 +1,155 @@
+import json
+import hashlib
+import threading
+from collections import OrderedDict
+from config import (
+    db_connection,
+    OPENROUTER_MODEL,
+    EVAL_CACHE_SIZE,
+    EVAL_CACHE_TTL_HOURS,
+)
+from services.llm_client import evaluate_answer
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {"memory_hits": 0, "db_hits": 0, "misses": 0, "stores": 0, "db_errors": 0}
+
+# Only these keys are worth keeping; anything else is LLM noise
+_CACHED_KEYS = ("score", "feedback", "is_correct")
+# Sweep expired shared-tier rows once every this many stores
+_EVICT_EVERY = 500
+
+
+def _normalize(text):
+    return " ".join(str(text or "").split())
+
+
+def _normalize_code(text):
+    # Indentation and line breaks are part of a program (and of its
+    # evaluation), so only line endings and trailing blanks are folded
+    return str(text or "").replace("\r\n", "\n").replace("\r", "\n").rstrip()
+
+
+def cache_key(question_type, question_text, correct_answer, candidate_answer, model=OPENROUTER_MODEL):
+    if question_type == "coding":
+        answer = _normalize_code(candidate_answer)
+    else:
+        answer = _normalize(candidate_answer)
+    if question_type == "mcq":
+        answer = answer.lower()
+    raw = json.dumps([
+        question_type,
+        _normalize(question_text),
+        correct_answer,
+        answer,
+        model,
+    ])
+    return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+
+def _count(key):
+    with _lock:
+        _stats[key] += 1
+
+
+def _remember(key, evaluation):
+    with _lock:
+        _memory[key] = evaluation
+        _memory.move_to_end(key)
+        while len(_memory) > EVAL_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _db_get(key):
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    SELECT evaluation FROM evaluation_cache
+                    WHERE key = %s AND expires_at > NOW()
+                """, (key,))
+                row = cur.fetchone()
+            return (row[0] if isinstance(row[0], dict) else json.loads(row[0])) if row else None
+    except Exception as e:
+        print("Evaluation cache read failed:", e)
+        _count("db_errors")
+        return None
+
+
+def _db_put(key, evaluation):
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    INSERT INTO evaluation_cache (key, evaluation, expires_at)
+                    VALUES (%s, %s, NOW() + make_interval(hours => %s))
+                    ON CONFLICT (key) DO UPDATE SET
+                        evaluation = EXCLUDED.evaluation,
+                        created_at = NOW(),
+                        expires_at = EXCLUDED.expires_at
+                """, (key, json.dumps(evaluation), EVAL_CACHE_TTL_HOURS))
+            conn.commit()
+    except Exception as e:
+        print("Evaluation cache write failed:", e)
+        _count("db_errors")
+
+
+def evict_expired():
+    """Delete expired shared-tier entries. Returns the number removed."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("DELETE FROM evaluation_cache WHERE expires_at <= NOW()")
+            removed = cur.rowcount
+        conn.commit()
+        return removed
+
+
+def cached_evaluate(question_type, question_text, correct_answer, candidate_answer):
+    """
+    evaluate_answer behind an in-process LRU and a shared Postgres tier.
+    Only well-formed evaluations are cached; errors propagate uncached.
+    """
+    key = cache_key(question_type, question_text, correct_answer, candidate_answer)
+
+    with _lock:
+        hit = _memory.get(key)
+        if hit is not None:
+            _memory.move_to_end(key)
+            _stats["memory_hits"] += 1
+            return dict(hit)
+
+    hit = _db_get(key)
+    if hit is not None:
+        _count("db_hits")
+        _remember(key, hit)
+        return dict(hit)
+
+    _count("misses")
+    evaluation = evaluate_answer(
+        question_type=question_type,
+        question_text=question_text,
+        correct_answer=correct_answer,
+        candidate_answer=candidate_answer,
+    )
+
+    if isinstance(evaluation, dict) and "score" in evaluation:
+        entry = {k: evaluation.get(k) for k in _CACHED_KEYS}
+        _remember(key, entry)
+        _db_put(key, entry)
+        _count("stores")
+        if _stats["stores"] % _EVICT_EVERY == 0:
+            try:
+                evict_expired()
+            except Exception as e:
+                print("Evaluation cache eviction failed:", e)
+        return dict(entry)
+
+    return evaluation
+
+
+def stats():
+    with _lock:
+        out = dict(_stats, memory_entries=len(_memory), memory_capacity=EVAL_CACHE_SIZE)
+    lookups = out["memory_hits"] + out["db_hits"] + out["misses"]
+    out["hit_rate"] = round((out["memory_hits"] + out["db_hits"]) / lookups, 4) if lookups else 0.0
+    return out
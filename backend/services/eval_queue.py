@@ -0,0 +1,307 @@
+import json
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    db_connection,
+    EVAL_WORKERS,
+    EVAL_CONCURRENCY,
+    EVAL_POLL_SECONDS,
+    EVAL_STALE_SECONDS,
+    EVAL_MAX_ATTEMPTS,
+    CODE_RUNNER_LLM_FEEDBACK,
+)
+from services.eval_cache import cached_evaluate
+from services.code_runner import grade_coding, SUPPORTED_LANGUAGES
+from services.attempts import append_results
+from utils.bulk import bulk_insert
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_workers = []
+_eval_pool = None
+
+
+def needs_llm(r):
+    return r.get("question_type") == "coding"
+
+
+def evaluate_response(r):
+    """Evaluate one response that is not objectively gradable in grading.py."""
+    qtype = r.get("question_type")
+    if not needs_llm(r):
+        return {"score": None, "feedback": "Not evaluated", "is_correct": False}
+
+    # Coding answers with runnable test cases are executed locally; the LLM
+    # is only consulted for optional qualitative feedback
+    language = (r.get("language") or "python").lower()
+    if r.get("test_cases") and language in SUPPORTED_LANGUAGES:
+        try:
+            evaluation = grade_coding(r.get("candidate_answer"), r["test_cases"], language)
+        except Exception as e:
+            print("Local code execution failed, falling back to LLM:", e)
+        else:
+            if CODE_RUNNER_LLM_FEEDBACK:
+                try:
+                    review = cached_evaluate(
+                        question_type=qtype,
+                        question_text=r.get("question_text"),
+                        correct_answer=r.get("correct_answer"),
+                        candidate_answer=r.get("candidate_answer"),
+                    )
+                    evaluation["llm_feedback"] = review.get("feedback")
+                except Exception:
+                    pass
+            return evaluation
+
+    try:
+        return cached_evaluate(
+            question_type=qtype,
+            question_text=r.get("question_text"),
+            correct_answer=r.get("correct_answer"),
+            candidate_answer=r.get("candidate_answer"),
+        )
+    except Exception:
+        return {"score": 0, "feedback": "Evaluation failed", "is_correct": False}
+
+
+def build_result(r, evaluation, section_name):
+    result = {
+        "question_id": r.get("question_id"),
+        "candidate_answer": r.get("candidate_answer"),
+        "correct_answer": evaluation.get("correct_answer", r.get("correct_answer")),
+        "section_name": section_name,
+        "score": evaluation.get("score"),
+        "is_correct": evaluation.get("is_correct"),
+        "feedback": evaluation.get("feedback")
+    }
+    if evaluation.get("execution"):
+        result["execution"] = evaluation["execution"]
+    if evaluation.get("llm_feedback"):
+        result["llm_feedback"] = evaluation["llm_feedback"]
+    if evaluation.get("keywords"):
+        result["keywords"] = evaluation["keywords"]
+        result["preliminary"] = evaluation.get("preliminary", True)
+    if evaluation.get("pending"):
+        result["pending"] = True
+    return result
+
+
+def enqueue(conn, candidate_id, question_set_id, section_name, responses, graded):
+    """
+    Persist a section's raw responses as a queued job. Responses already in
+    `graded` are stored as done; the rest wait for a worker. Runs inside the
+    caller's transaction. Returns the job id.
+    """
+    job_id = uuid.uuid4()
+
+    with conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO evaluation_jobs (id, candidate_id, question_set_id, section_name)
+            VALUES (%s, %s, %s, %s)
+        """, (job_id, uuid.UUID(candidate_id), uuid.UUID(question_set_id), section_name))
+
+        bulk_insert(
+            cur,
+            "evaluation_job_items",
+            ("job_id", "idx", "question_id", "response", "status", "evaluation"),
+            (
+                (job_id, i, r.get("question_id"), json.dumps(r),
+                 "done" if graded.get(i) is not None else "pending",
+                 json.dumps(graded[i]) if graded.get(i) is not None else None)
+                for i, r in enumerate(responses)
+            ),
+        )
+
+    return str(job_id)
+
+
+def notify_workers():
+    """Wake an idle local worker after a job has been committed."""
+    _wakeup.set()
+
+
+def _claim(conn):
+    """
+    Claim the oldest queued job, or a running one whose worker went quiet
+    for EVAL_STALE_SECONDS. Stale jobs that already used up their attempts
+    are failed instead of being retried forever.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE evaluation_jobs
+            SET status = 'failed', finished_at = NOW(),
+                error = COALESCE(error, 'Worker stopped responding')
+            WHERE status = 'running'
+              AND claimed_at < NOW() - make_interval(secs => %s)
+              AND attempts >= %s
+        """, (EVAL_STALE_SECONDS, EVAL_MAX_ATTEMPTS))
+        cur.execute("""
+            UPDATE evaluation_jobs
+            SET status = 'running', claimed_at = NOW(), attempts = attempts + 1
+            WHERE id = (
+                SELECT id FROM evaluation_jobs
+                WHERE status = 'queued'
+                   OR (status = 'running' AND claimed_at < NOW() - make_interval(secs => %s)
+                       AND attempts < %s)
+                ORDER BY created_at
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING id, candidate_id, question_set_id, section_name, attempts
+        """, (EVAL_STALE_SECONDS, EVAL_MAX_ATTEMPTS))
+        row = cur.fetchone()
+    conn.commit()
+    return row
+
+
+def _process(job):
+    """
+    Evaluate a claimed job's pending items and store its results. A pooled
+    connection is taken only for each read or write, never while the code
+    runner or the LLM is working.
+    """
+    job_id, candidate_id, question_set_id, section_name, attempts = job
+
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT idx, response, status, evaluation
+                FROM evaluation_job_items WHERE job_id = %s ORDER BY idx
+            """, (job_id,))
+            items = [
+                (idx, r if isinstance(r, dict) else json.loads(r), status,
+                 ev if isinstance(ev, dict) or ev is None else json.loads(ev))
+                for idx, r, status, ev in cur.fetchall()
+            ]
+        conn.commit()
+
+    pending = [(idx, r) for idx, r, status, _ in items if status != "done"]
+    futures = [(idx, _eval_pool.submit(evaluate_response, r)) for idx, r in pending]
+
+    evaluations = {idx: ev for idx, _, status, ev in items if status == "done"}
+    for idx, future in futures:
+        evaluation = future.result()
+        evaluations[idx] = evaluation
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("""
+                    UPDATE evaluation_job_items SET status = 'done', evaluation = %s
+                    WHERE job_id = %s AND idx = %s AND status <> 'done'
+                """, (json.dumps(evaluation), job_id, idx))
+            conn.commit()
+
+    results_out = [build_result(r, evaluations[idx], section_name) for idx, r, _, _ in items]
+
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            # Only the current claim may finish the job: if it was re-claimed
+            # after going stale, the newer attempt owns it
+            cur.execute("""
+                UPDATE evaluation_jobs SET status = 'done', finished_at = NOW(), error = NULL
+                WHERE id = %s AND status = 'running' AND attempts = %s
+            """, (job_id, attempts))
+            if cur.rowcount == 0:
+                conn.rollback()
+                print(f"Evaluation job {job_id} was re-claimed; dropping attempt {attempts}")
+                return
+            append_results(cur, candidate_id, question_set_id, results_out, job_id=job_id)
+        conn.commit()
+
+
+def _fail(conn, job, error):
+    job_id, attempts = job[0], job[4]
+    conn.rollback()
+    status = "failed" if attempts >= EVAL_MAX_ATTEMPTS else "queued"
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE evaluation_jobs SET status = %s, error = %s
+            WHERE id = %s AND status = 'running' AND attempts = %s
+        """, (status, str(error), job_id, attempts))
+    conn.commit()
+
+
+def _worker_loop():
+    while not _stop.is_set():
+        try:
+            # The connection is only held to claim and to record results;
+            # evaluating (code runs, LLM calls) happens without one
+            with db_connection() as conn:
+                job = _claim(conn)
+            if job is None:
+                _wakeup.wait(EVAL_POLL_SECONDS)
+                _wakeup.clear()
+                continue
+            try:
+                _process(job)
+            except Exception as e:
+                print("🔥 evaluation worker error:", e)
+                with db_connection() as conn:
+                    _fail(conn, job, e)
+                _stop.wait(EVAL_POLL_SECONDS)
+        except Exception as e:
+            print("🔥 evaluation worker error:", e)
+            _stop.wait(EVAL_POLL_SECONDS)
+
+
+def start_workers(n=EVAL_WORKERS):
+    """Start the background evaluation workers once per process."""
+    global _eval_pool
+    if _workers or n <= 0:
+        return
+    _eval_pool = ThreadPoolExecutor(max_workers=EVAL_CONCURRENCY)
+    for i in range(n):
+        t = threading.Thread(target=_worker_loop, name=f"eval-worker-{i}", daemon=True)
+        t.start()
+        _workers.append(t)
+
+
+def stop_workers(timeout=None):
+    _stop.set()
+    _wakeup.set()
+    for t in _workers:
+        t.join(timeout)
+    if _eval_pool:
+        _eval_pool.shutdown(wait=False)
+
+
+def job_status(job_id):
+    """Return the job with per-response status, or None if it doesn't exist."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT status, section_name, error, created_at, finished_at
+                FROM evaluation_jobs WHERE id = %s
+            """, (uuid.UUID(job_id),))
+            job = cur.fetchone()
+            if job is None:
+                return None
+
+            cur.execute("""
+                SELECT idx, question_id, status, evaluation
+                FROM evaluation_job_items WHERE job_id = %s ORDER BY idx
+            """, (uuid.UUID(job_id),))
+            items = cur.fetchall()
+
+    status, section_name, error, created_at, finished_at = job
+    responses = []
+    for idx, qid, item_status, ev in items:
+        ev = ev if isinstance(ev, dict) or ev is None else json.loads(ev)
+        ev = ev or {}
+        responses.append({
+            "question_id": qid,
+            "status": item_status,
+            "score": ev.get("score"),
+            "is_correct": ev.get("is_correct"),
+            "feedback": ev.get("feedback"),
+        })
+
+    return {
+        "job_id": job_id,
+        "status": status,
+        "section_name": section_name,
+        "error": error,
+        "created_at": created_at.isoformat() if created_at else None,
+        "finished_at": finished_at.isoformat() if finished_at else None,
+        "responses": responses,
+    }
@@ -1,48 +1,170 @@
 import uuid
-from services.llm_client import generate_question
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from config import GENERATION_CONCURRENCY, GENERATION_BATCH_SIZE, QUESTION_BANK_ENABLED
+from services.llm_client import generate_question_batch
+from services import question_bank
 
-def generate_questions(payload):
+
+def _build_slots(payload):
     """
-    Orchestrates question generation for each skill and type.
+    Expands the payload into one (skill, difficulty, qtype) slot per question,
+    in the same order the questions are returned.
     """
-    all_questions = []
-    skills = payload.get("skills", [])
-    global_settings = payload.get("global_settings", {"mcq_options": 4})
-
-    for skill in skills:
+    slots = []
+    for skill in payload.get("skills", []):
         name = skill.get("name")
         difficulty = skill.get("difficulty", "medium")
         counts = skill.get("counts", {})
 
         for qtype, num in counts.items():
             for _ in range(num):
+                slots.append((name, difficulty, qtype))
+    return slots
+
+
+def _static_question(name, qtype):
+    if qtype == "audio":
+        return {
+            "prompt_text": f"Describe a situation where you used {name} effectively.",
+            "type": "audio"
+        }
+    return {
+        "prompt_text": f"Record a short video explaining a {name}-related challenge you solved.",
+        "type": "video"
+    }
+
+
+def _group_slots(slots):
+    """Groups LLM-backed slot indices by (skill, difficulty, qtype)."""
+    groups = {}
+    for i, key in enumerate(slots):
+        if key[2] in ("audio", "video"):
+            continue
+        groups.setdefault(key, []).append(i)
+    return groups
+
+
+def _serve_from_bank(groups, options, contents):
+    """
+    Fills `contents` from the question bank and returns the slot indices per
+    group that still need a live LLM call. Bank errors fall back to the LLM.
+    """
+    remaining = {}
+    for (name, difficulty, qtype), indices in groups.items():
+        served = []
+        try:
+            served = question_bank.take(name, difficulty, qtype, options, len(indices))
+            question_bank.schedule_refill(name, difficulty, qtype, options)
+        except Exception as e:
+            print(f"Question bank unavailable for {name}/{difficulty}/{qtype}:", e)
+
+        for i, content in zip(indices, served):
+            contents[i] = content
+        if len(served) < len(indices):
+            remaining[(name, difficulty, qtype)] = indices[len(served):]
+    return remaining
+
+
+def _build_batches(groups):
+    """Splits each group into chunks of at most GENERATION_BATCH_SIZE slot indices."""
+    size = max(1, GENERATION_BATCH_SIZE)
+    batches = []
+    for key, indices in groups.items():
+        for start in range(0, len(indices), size):
+            batches.append((key, indices[start:start + size]))
+    return batches
+
+
+def _make_item(question_id, slot, content=None, error=None):
+    name, difficulty, qtype = slot
+    item = {
+        "question_id": question_id,
+        "skill": name,
+        "type": qtype,
+        "difficulty": difficulty,
+    }
+
+    if error is not None:
+        item["content"] = {"question": None}
+        item["status"] = "failed"
+        item["error"] = error
+    elif content is not None:
+        item["content"] = content
+    else:
+        item["content"] = _static_question(name, qtype)
+    return item
 
-                if qtype == "audio":
-                    q_data = {
-                        "prompt_text": f"Describe a situation where you used {name} effectively.",
-                        "type": "audio"
-                    }
-
-                elif qtype == "video":
-                    q_data = {
-                        "prompt_text": f"Record a short video explaining a {name}-related challenge you solved.",
-                        "type": "video"
-                    }
-
-                else:
-                    q_data = generate_question(
-                        skill=name,
-                        difficulty=difficulty,
-                        qtype=qtype,
-                        options=global_settings.get("mcq_options", 4),
-                    )
-
-                all_questions.append({
-                    "question_id": str(uuid.uuid4()),
-                    "skill": name,
-                    "type": qtype,
-                    "difficulty": difficulty,
-                    "content": q_data
-                })
-
-    return all_questions
+
+def count_questions(payload):
+    return len(_build_slots(payload))
+
+
+def iter_questions(payload):
+    """
+    Yields (index, question) pairs as soon as each question is ready.
+    Static audio/video prompts come first, then question-bank hits, then
+    LLM batches in completion order. `index` is the question's position in
+    payload order, and question_ids are assigned in that order up front.
+    """
+    global_settings = payload.get("global_settings", {"mcq_options": 4})
+    options = global_settings.get("mcq_options", 4)
+    slots = _build_slots(payload)
+    question_ids = [str(uuid.uuid4()) for _ in slots]
+    groups = _group_slots(slots)
+
+    llm_indices = {i for indices in groups.values() for i in indices}
+    for i, slot in enumerate(slots):
+        if i not in llm_indices:
+            yield i, _make_item(question_ids[i], slot)
+
+    if QUESTION_BANK_ENABLED:
+        contents = {}
+        groups = _serve_from_bank(groups, options, contents)
+        for i in sorted(contents):
+            yield i, _make_item(question_ids[i], slots[i], content=contents[i])
+
+    batches = _build_batches(groups)
+    if not batches:
+        return
+
+    workers = max(1, min(GENERATION_CONCURRENCY, len(batches)))
+    with ThreadPoolExecutor(max_workers=workers) as pool:
+        futures = {
+            pool.submit(
+                generate_question_batch,
+                skill=name,
+                difficulty=difficulty,
+                qtype=qtype,
+                count=len(indices),
+                options=options,
+            ): indices
+            for (name, difficulty, qtype), indices in batches
+        }
+
+        for future in as_completed(futures):
+            indices = futures[future]
+            try:
+                items = future.result()
+            except Exception as e:
+                print(f"Question generation failed for {slots[indices[0]]}:", e)
+                items, error = [], str(e)
+            else:
+                error = "LLM returned fewer questions than requested"
+
+            for i, content in zip(indices, items):
+                yield i, _make_item(question_ids[i], slots[i], content=content)
+            for i in indices[len(items):]:
+                yield i, _make_item(question_ids[i], slots[i], error=error)
+
+
+def generate_questions(payload):
+    """
+    Orchestrates question generation for each skill and type.
+    Questions are served from the question bank first when enabled. Remaining
+    slots sharing (skill, difficulty, qtype) are requested together through
+    one batched LLM call per chunk; chunks run concurrently (capped by
+    GENERATION_CONCURRENCY). The output keeps payload order and a failed
+    call only marks its own items as failed.
+    """
+    ready = dict(iter_questions(payload))
+    return [ready[i] for i in sorted(ready)]
@@ -0,0 +1,188 @@
+import json
+import uuid
+from services.code_runner import extract_cases
+from services import keywords
+
+
+def _answer_text(value):
+    if value is None or isinstance(value, bool):
+        return ""
+    return str(value).strip()
+
+
+def _choice_index(value, options):
+    """
+    Resolve an MCQ answer to a 0-based option index. The option text wins
+    (the frontend sends it); a single letter ("B") is read as a label only
+    when no option matches. Bare digits are never treated as indexes.
+    """
+    text = _answer_text(value)
+    if not text:
+        return None
+
+    for i, opt in enumerate(options or []):
+        if str(opt).strip().lower() == text.lower():
+            return i
+    if len(text) == 1 and text.isalpha():
+        index = ord(text.upper()) - ord("A")
+        if not options or index < len(options):
+            return index
+    return None
+
+
+def _marking(question, key, default):
+    try:
+        value = question.get(key)
+        return float(value) if value is not None else default
+    except (TypeError, ValueError):
+        return default
+
+
+def load_questions(cur, question_ids):
+    """
+    Fetch stored questions for a section in one query.
+    Returns {question_id (str): question entry dict}.
+    """
+    ids = []
+    for qid in question_ids:
+        try:
+            ids.append(uuid.UUID(str(qid)))
+        except (TypeError, ValueError):
+            continue
+    if not ids:
+        return {}
+
+    cur.execute("SELECT id, content FROM questions WHERE id = ANY(%s)", (ids,))
+    return {
+        str(qid): raw if isinstance(raw, dict) else json.loads(raw)
+        for qid, raw in cur.fetchall()
+    }
+
+
+def attach_test_cases(responses, questions):
+    """
+    Copy runnable examples/hidden tests from stored coding questions onto
+    their responses so evaluation can execute them without another lookup.
+    """
+    for r in responses:
+        if r.get("question_type") != "coding":
+            continue
+        question = questions.get(str(r.get("question_id"))) or {}
+        cases = extract_cases(question.get("content"))
+        if cases:
+            r["test_cases"] = cases
+
+
+def grade_mcq(response, question):
+    """
+    Score one MCQ response against the stored question, falling back to the
+    correct_answer sent by the client when the question is not stored.
+    """
+    question = question or {}
+    inner = question.get("content") or {}
+    options = inner.get("options") or []
+
+    correct = inner.get("correct_answer")
+    if correct is None:
+        correct = inner.get("answer", response.get("correct_answer"))
+
+    answer_text = _answer_text(response.get("candidate_answer"))
+    answer = _choice_index(answer_text, options)
+    expected = _choice_index(correct, options)
+    positive = _marking(question, "positive_marking", 1.0)
+    negative = _marking(question, "negative_marking", 0.0)
+
+    if answer is None or expected is None:
+        # Not resolvable to an option: compare the texts themselves
+        right = answer_text.lower() == _answer_text(correct).lower()
+    else:
+        right = answer == expected
+
+    if not answer_text:
+        result = {"score": 0, "is_correct": False, "feedback": "Not answered"}
+    elif not _answer_text(correct):
+        result = {"score": 0, "is_correct": False, "feedback": "No correct answer on record"}
+    elif right:
+        result = {"score": positive, "is_correct": True, "feedback": "Correct"}
+    else:
+        result = {"score": -abs(negative), "is_correct": False, "feedback": "Incorrect"}
+
+    result["correct_answer"] = correct
+    return result
+
+
+# Audio/video answers are scored by expected-keyword coverage (grade_keywords)
+KEYWORD_TYPES = ("audio", "video")
+
+
+def _keywords(question):
+    inner = (question or {}).get("content") or {}
+    found = inner.get("expected_keywords") or []
+    if isinstance(found, str):
+        found = found.split(",")
+    return [str(k).strip() for k in found if str(k).strip()]
+
+
+def _normalize(text):
+    return " ".join(str(text or "").lower().split())
+
+
+def needs_qa(responses, questions):
+    """True when a keyword-scored response has no typed answer and must be looked up in qa_data."""
+    return any(
+        r.get("question_type") in KEYWORD_TYPES
+        and not str(r.get("candidate_answer") or "").strip()
+        and _keywords(questions.get(str(r.get("question_id"))))
+        for r in responses
+    )
+
+
+def grade_keywords(responses, questions, qa_entries=()):
+    """
+    Preliminary scores for audio/video responses by expected-keyword
+    coverage, all scored in one batch. The answer is the typed
+    candidate_answer, or else the qa_data entry (answer or transcript) for
+    the same question text. Responses with no answer text yet are left
+    unscored ("Not evaluated", pending). Returns {index in responses: evaluation}.
+    """
+    qa_answers = {}
+    for entry in qa_entries:
+        if isinstance(entry, dict) and entry.get("question"):
+            answer = entry.get("answer") or entry.get("transcript")
+            if answer:
+                qa_answers[_normalize(entry["question"])] = answer
+
+    indexes, items = [], []
+    for i, r in enumerate(responses):
+        if r.get("question_type") not in KEYWORD_TYPES:
+            continue
+        question = questions.get(str(r.get("question_id")))
+        text = r.get("candidate_answer")
+        if not str(text or "").strip():
+            inner = (question or {}).get("content") or {}
+            text = qa_answers.get(_normalize(inner.get("question") or r.get("question_text")))
+        indexes.append(i)
+        items.append((_keywords(question), text))
+
+    if not items:
+        return {}
+    return dict(zip(indexes, keywords.score_batch(items)))
+
+
+# Question types that can be scored without an LLM
+GRADERS = {
+    "mcq": grade_mcq,
+}
+
+
+def grade_objective(responses, questions):
+    """
+    Grade every objectively gradable response of a section in one pass.
+    Returns {index in responses: evaluation}; other types are left out.
+    """
+    graded = {}
+    for i, r in enumerate(responses):
+        grader = GRADERS.get(r.get("question_type"))
+        if grader:
+            graded[i] = grader(r, questions.get(str(r.get("question_id"))))
+    return graded
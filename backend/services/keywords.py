@@ -0,0 +1,283 @@
+"""
+Keyword scoring for spoken / typed interview answers.
+
+Answers and expected keywords go through the same tokenizer and light
+suffix-stripping stemmer, so "deployed", "deploying" and "deployments"
+all match "deployment" and "APIs" matches "API". Each keyword is expanded
+with its synonym group (built-in groups plus KEYWORD_SYNONYMS_FILE); the
+groups hold true equivalents only, and each distinct phrase in an answer
+counts toward at most one keyword. The alternatives for every
+question in a batch are compiled into one word-level Aho-Corasick
+automaton, so each answer is scanned once no matter how many keywords
+there are. Compiled automatons are cached per keyword set.
+"""
+import re
+import json
+import threading
+from functools import lru_cache
+from collections import OrderedDict, deque
+from config import KEYWORD_PASS_RATIO, KEYWORD_SYNONYMS_FILE
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+[+#]*")
+# "APIs", "GPUs": fold acronym plurals before case is lost
+_ACRONYM_PLURAL_RE = re.compile(r"\b([A-Z][A-Z0-9]+)s\b")
+
+# Plurals are folded first, then the first matching suffix rule is applied
+# up to twice while the stem keeps >= 3 letters
+_PLURALS = (("sses", "ss"), ("ies", "y"), ("s", ""))
+_SUFFIXES = (
+    ("ational", "ate"), ("ization", "ize"), ("isation", "ize"), ("fulness", "ful"),
+    ("iveness", "ive"), ("ousness", "ous"), ("ability", "able"), ("ibility", "ible"),
+    ("ingly", ""), ("ment", ""), ("ness", ""), ("edly", ""), ("able", ""), ("ible", ""),
+    ("ing", ""), ("ied", "y"), ("ed", ""), ("ly", ""),
+)
+# Singulars like "status", "analysis" and "class" keep their s; shorter
+# words ("gpus", "apis") are plurals
+_KEEP_S = ("ss", "us", "is")
+_KEEP_S_MIN_LENGTH = 5
+
+# Interview vocabulary that candidates commonly say differently. Every word
+# in a group is interchangeable, so only list real equivalents (spellings,
+# abbreviations), not related ideas: "fast" is not "performance"
+SYNONYMS = [
+    ["test", "testing", "qa", "quality assurance"],
+    ["performance", "performant"],
+    ["scalability", "scalable", "scale", "scaling"],
+    ["database", "db", "datastore", "data store"],
+    ["cache", "caching", "memoization", "memoize"],
+    ["bug", "defect"],
+    ["deployment", "deploy", "rollout"],
+    ["monitoring", "observability"],
+    ["authentication", "authn"],
+    ["authorization", "authz"],
+    ["collaboration", "teamwork"],
+    ["trade off", "tradeoff"],
+    ["concurrency", "concurrent"],
+    ["multithreading", "multi threading", "multithreaded"],
+    ["ci", "continuous integration"],
+    ["ci cd", "cicd"],
+    ["kubernetes", "k8s"],
+    ["javascript", "js"],
+    ["postgresql", "postgres"],
+    ["machine learning", "ml"],
+    ["object oriented programming", "oop"],
+]
+
+
+@lru_cache(maxsize=65536)
+def stem(word):
+    """Conservative English suffix stripping; only has to be consistent on both sides."""
+    if len(word) <= 3 or not word.isalpha():
+        return word
+    if not word.endswith(_KEEP_S) or len(word) < _KEEP_S_MIN_LENGTH:
+        for suffix, replacement in _PLURALS:
+            if word.endswith(suffix):
+                word = word[:-len(suffix)] + replacement
+                break
+    for _ in range(2):
+        for suffix, replacement in _SUFFIXES:
+            if word.endswith(suffix) and len(word) - len(suffix) + len(replacement) >= 3:
+                word = word[:-len(suffix)] + replacement
+                break
+        else:
+            break
+    if word.endswith("e") and len(word) > 3:
+        word = word[:-1]
+    # running -> runn -> run, stopped -> stopp -> stop
+    if len(word) > 3 and word[-1] == word[-2] and word[-1] not in "aeiouslz":
+        word = word[:-1]
+    return word
+
+
+def tokens(text):
+    text = _ACRONYM_PLURAL_RE.sub(r"\1", str(text or ""))
+    return [stem(t) for t in _TOKEN_RE.findall(text.lower())]
+
+
+@lru_cache(maxsize=16384)
+def _phrase(text):
+    return tuple(tokens(text.replace("-", " ")))
+
+
+def _load_groups():
+    groups = list(SYNONYMS)
+    if KEYWORD_SYNONYMS_FILE:
+        try:
+            with open(KEYWORD_SYNONYMS_FILE) as f:
+                extra = json.load(f)
+            groups.extend(extra.values() if isinstance(extra, dict) else extra)
+        except (OSError, ValueError) as e:
+            print("🔥 keyword synonyms file error:", e)
+    index = {}
+    for group in groups:
+        phrases = {p for p in (_phrase(str(w)) for w in group) if p}
+        for p in phrases:
+            index.setdefault(p, set()).update(phrases)
+    return index
+
+
+_synonyms = _load_groups()
+
+
+def alternatives(keyword):
+    """The stemmed phrases that count as a mention of `keyword`."""
+    phrase = _phrase(keyword)
+    if not phrase:
+        return set()
+    return {phrase} | _synonyms.get(phrase, set())
+
+
+class Matcher:
+    """Aho-Corasick automaton over token sequences; matches only on word boundaries."""
+
+    def __init__(self, patterns):
+        self.goto = [{}]
+        self.fail = [0]
+        self.out = [()]
+        for pid, pattern in enumerate(patterns):
+            state = 0
+            for token in pattern:
+                nxt = self.goto[state].get(token)
+                if nxt is None:
+                    nxt = len(self.goto)
+                    self.goto[state][token] = nxt
+                    self.goto.append({})
+                    self.fail.append(0)
+                    self.out.append(())
+                state = nxt
+            self.out[state] += (pid,)
+
+        queue = deque(self.goto[0].values())
+        while queue:
+            state = queue.popleft()
+            for token, nxt in self.goto[state].items():
+                queue.append(nxt)
+                f = self.fail[state]
+                while f and token not in self.goto[f]:
+                    f = self.fail[f]
+                target = self.goto[f].get(token, 0)
+                # Depth-1 states fall back to the root, not to themselves
+                self.fail[nxt] = target if target != nxt else 0
+                self.out[nxt] += self.out[self.fail[nxt]]
+
+    def scan(self, toks):
+        """Ids of every pattern that occurs in the token list."""
+        goto, fail, out = self.goto, self.fail, self.out
+        found = set()
+        state = 0
+        for token in toks:
+            while state and token not in goto[state]:
+                state = fail[state]
+            state = goto[state].get(token, 0)
+            if out[state]:
+                found.update(out[state])
+        return found
+
+
+def _assign(edges):
+    """
+    Match keywords to distinct answer phrases (maximum bipartite matching),
+    so one phrase never satisfies two keywords. `edges` maps a keyword
+    index to the phrase ids that may satisfy it, preferred ones first.
+    Returns the matched keyword indexes.
+    """
+    owner = {}
+
+    def augment(ki, seen):
+        for pid in edges[ki]:
+            if pid in seen:
+                continue
+            seen.add(pid)
+            if pid not in owner or augment(owner[pid], seen):
+                owner[pid] = ki
+                return True
+        return False
+
+    for ki in edges:
+        augment(ki, set())
+    return set(owner.values())
+
+
+class KeywordIndex:
+    """One automaton over every keyword of a batch of questions."""
+
+    def __init__(self, keyword_sets):
+        self.keyword_sets = keyword_sets
+        pattern_ids = {}
+        # pattern id -> [(question index, keyword index, is the keyword itself)]
+        self.owners = []
+        for qi, keywords in enumerate(keyword_sets):
+            for ki, keyword in enumerate(keywords):
+                own = _phrase(keyword)
+                for alt in alternatives(keyword):
+                    pid = pattern_ids.get(alt)
+                    if pid is None:
+                        pid = pattern_ids[alt] = len(self.owners)
+                        self.owners.append([])
+                    self.owners[pid].append((qi, ki, alt == own))
+        self.matcher = Matcher(list(pattern_ids))
+
+    def matched(self, qi, text):
+        """Indexes of question qi's keywords mentioned in text."""
+        edges = {}
+        for pid in self.matcher.scan(tokens(text)):
+            for q, ki, exact in self.owners[pid]:
+                if q == qi:
+                    edges.setdefault(ki, []).append((not exact, pid))
+        return _assign({ki: [pid for _, pid in sorted(pids)] for ki, pids in edges.items()})
+
+
+_compiled = OrderedDict()
+_lock = threading.Lock()
+_CACHE_SIZE = 256
+
+
+def compile_index(keyword_sets):
+    """Cached KeywordIndex for a tuple of keyword tuples (one per question)."""
+    with _lock:
+        index = _compiled.get(keyword_sets)
+        if index is not None:
+            _compiled.move_to_end(keyword_sets)
+            return index
+    index = KeywordIndex(keyword_sets)
+    with _lock:
+        _compiled[keyword_sets] = index
+        if len(_compiled) > _CACHE_SIZE:
+            _compiled.popitem(last=False)
+    return index
+
+
+def score_batch(items):
+    """
+    Score (keywords, answer text) pairs in one pass. Returns one evaluation
+    per item: score 0-10 by keyword coverage, is_correct when coverage
+    reaches KEYWORD_PASS_RATIO, and the matched / missing keywords. Items
+    without answer text get score None and pending=True.
+    """
+    index = compile_index(tuple(tuple(str(k) for k in keywords) for keywords, _ in items))
+    evaluations = []
+    for qi, (keywords, text) in enumerate(items):
+        keywords = index.keyword_sets[qi]
+        if not keywords:
+            evaluations.append({"score": None, "is_correct": False, "feedback": "No expected keywords on record"})
+            continue
+        if not str(text or "").strip():
+            # The transcript may not have arrived yet (recordings upload
+            # separately), so this is unscored rather than a final 0
+            evaluations.append({"score": None, "is_correct": False, "feedback": "Not evaluated", "pending": True})
+            continue
+        hit = index.matched(qi, text)
+        matched = [k for i, k in enumerate(keywords) if i in hit]
+        missing = [k for i, k in enumerate(keywords) if i not in hit]
+        ratio = len(matched) / len(keywords)
+        feedback = f"Mentioned {len(matched)} of {len(keywords)} expected keywords"
+        if missing:
+            feedback += f"; missing: {', '.join(missing)}"
+        evaluations.append({
+            "score": round(10 * ratio, 1),
+            "is_correct": ratio >= KEYWORD_PASS_RATIO,
+            "feedback": feedback,
+            "keywords": {"matched": matched, "missing": missing},
+            "preliminary": True,
+        })
+    return evaluations
@@ -1,6 +1,6 @@
-import requests
 import json
-from config import OPENROUTER_API_KEY, OPENROUTER_URL, OPENROUTER_MODEL
+from config import OPENROUTER_MODEL
+from services.openrouter import client
 
 PROMPTS = {
     "mcq": (
@@ -10,7 +10,9 @@ PROMPTS = {
     ),
     "coding": (
         "Generate ONE coding question for skill '{skill}' "
-        "with difficulty '{difficulty}'. Return JSON ONLY with keys: prompt, input_spec, output_spec, examples (list)."
+        "with difficulty '{difficulty}'. The solution reads stdin and writes stdout. "
+        "Return JSON ONLY with keys: prompt, input_spec, output_spec, "
+        "examples (list of {{input, output}}), hidden_tests (list of {{input, output}})."
     ),
     "audio": (
         "Generate ONE interview question for skill '{skill}' "
@@ -20,39 +22,41 @@ PROMPTS = {
     "video": (
         "Generate ONE interview question for skill '{skill}' "
         "with difficulty '{difficulty}'. The question should be short and clear. "
-        "Return JSON ONLY with keys: prompt_text, rubric (short), suggested_time_seconds."
+        "Return JSON ONLY with keys: prompt_text, expected_keywords (list), rubric (short), "
+        "suggested_time_seconds."
     ),
 }
 
-def generate_question(skill: str, difficulty: str, qtype: str, options: int = 4):
-    prompt_text = PROMPTS[qtype].format(skill=skill, difficulty=difficulty, options=options)
-
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
-    payload = {
-        "model": OPENROUTER_MODEL,
-        "messages": [
-            {"role": "system", "content": "You are a helpful interview question generator."},
-            {"role": "user", "content": prompt_text}
-        ],
-        "temperature": 0.3,
-        "max_tokens": 600
-    }
-
-    resp = requests.post(OPENROUTER_URL, json=payload, headers=headers, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
+BATCH_PROMPTS = {
+    "mcq": (
+        "Generate {count} distinct multiple-choice questions for skill '{skill}' "
+        "with difficulty '{difficulty}'. Each question has {options} answer options "
+        "labeled A, B, C, D. Return a JSON array ONLY, one object per question, with keys: "
+        "prompt, options (list), answer (single letter)."
+    ),
+    "coding": (
+        "Generate {count} distinct coding questions for skill '{skill}' "
+        "with difficulty '{difficulty}'. Each solution reads stdin and writes stdout. "
+        "Return a JSON array ONLY, one object per question, with keys: prompt, input_spec, "
+        "output_spec, examples (list of {{input, output}}), hidden_tests (list of {{input, output}})."
+    ),
+    "audio": (
+        "Generate {count} distinct interview questions for skill '{skill}' "
+        "with difficulty '{difficulty}'. Each question should be short and clear. "
+        "Return a JSON array ONLY, one object per question, with keys: "
+        "prompt_text, expected_keywords (list), rubric (short)."
+    ),
+    "video": (
+        "Generate {count} distinct interview questions for skill '{skill}' "
+        "with difficulty '{difficulty}'. Each question should be short and clear. "
+        "Return a JSON array ONLY, one object per question, with keys: "
+        "prompt_text, expected_keywords (list), rubric (short), suggested_time_seconds."
+    ),
+}
 
-    try:
-        content = data["choices"][0]["message"]["content"]
-        parsed = json.loads(content)
-    except Exception:
-        return {"question": "Bad LLM response", "options": [], "correct_answer": None}
 
-    # NORMALIZE OUTPUT HERE
+def normalize_question(qtype: str, parsed: dict):
+    """Shape a raw LLM question object into the per-type content dict."""
     if qtype == "mcq":
         return {
             "question": parsed.get("prompt"),
@@ -65,7 +69,8 @@ def generate_question(skill: str, difficulty: str, qtype: str, options: int = 4)
             "question": parsed.get("prompt"),
             "input_spec": parsed.get("input_spec"),
             "output_spec": parsed.get("output_spec"),
-            "examples": parsed.get("examples", [])
+            "examples": parsed.get("examples", []),
+            "hidden_tests": parsed.get("hidden_tests", [])
         }
 
     if qtype == "audio":
@@ -78,6 +83,7 @@ def generate_question(skill: str, difficulty: str, qtype: str, options: int = 4)
     if qtype == "video":
         return {
             "question": parsed.get("prompt_text"),
+            "expected_keywords": parsed.get("expected_keywords", []),
             "rubric": parsed.get("rubric"),
             "suggested_time_seconds": parsed.get("suggested_time_seconds", 60)
         }
@@ -85,17 +91,87 @@ def generate_question(skill: str, difficulty: str, qtype: str, options: int = 4)
     return parsed
 
 
+def has_question(content):
+    """True when a normalized question carries non-empty question text."""
+    return isinstance(content, dict) and bool(str(content.get("question") or "").strip())
+
+
+def generate_question(skill: str, difficulty: str, qtype: str, options: int = 4):
+    prompt_text = PROMPTS[qtype].format(skill=skill, difficulty=difficulty, options=options)
+
+    payload = {
+        "model": OPENROUTER_MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful interview question generator."},
+            {"role": "user", "content": prompt_text}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 600
+    }
+
+    data = client.chat(payload)
+
+    try:
+        content = data["choices"][0]["message"]["content"]
+        parsed = json.loads(content)
+    except Exception:
+        return {"question": "Bad LLM response", "options": [], "correct_answer": None}
+
+    return normalize_question(qtype, parsed)
+
+
+def generate_question_batch(skill: str, difficulty: str, qtype: str, count: int, options: int = 4):
+    """
+    Generate `count` questions of one (skill, difficulty, qtype) in a single
+    completion. Returns a list of normalized content dicts, which may be
+    shorter than `count` if the model under-delivers.
+    """
+    if count == 1:
+        # generate_question answers a parse failure with a placeholder; callers
+        # of the batch API (and the question bank) must never see one
+        question = generate_question(skill, difficulty, qtype, options)
+        if not has_question(question) or question.get("question") == "Bad LLM response":
+            raise ValueError("Bad LLM response")
+        return [question]
+
+    prompt_text = BATCH_PROMPTS[qtype].format(
+        skill=skill, difficulty=difficulty, options=options, count=count
+    )
+
+    payload = {
+        "model": OPENROUTER_MODEL,
+        "messages": [
+            {"role": "system", "content": "You are a helpful interview question generator."},
+            {"role": "user", "content": prompt_text}
+        ],
+        "temperature": 0.3,
+        "max_tokens": 600 * count
+    }
+
+    data = client.chat(payload)
+
+    try:
+        content = data["choices"][0]["message"]["content"]
+        parsed = json.loads(content)
+    except Exception:
+        raise ValueError("Bad LLM response")
+
+    # Some models wrap the array in an object, e.g. {"questions": [...]}
+    if isinstance(parsed, dict):
+        parsed = next((v for v in parsed.values() if isinstance(v, list)), [parsed])
+    if not isinstance(parsed, list):
+        raise ValueError("Bad LLM response")
+
+    questions = (normalize_question(qtype, item) for item in parsed[:count] if isinstance(item, dict))
+    return [q for q in questions if has_question(q)]
+
+
 def evaluate_answer(question_type: str, question_text: str, correct_answer: str, candidate_answer: str):
     """
     Evaluate MCQ or Coding question answers using LLM (OpenRouter).
     Returns a structured JSON with evaluation result.
     """
 
-    headers = {
-        "Authorization": f"Bearer {OPENROUTER_API_KEY}",
-        "Content-Type": "application/json"
-    }
-
     if question_type == "mcq":
         eval_prompt = (
             f"You are an evaluator for multiple-choice questions.\n"
@@ -129,9 +205,7 @@ def evaluate_answer(question_type: str, question_text: str, correct_answer: str,
         "max_tokens": 400
     }
 
-    resp = requests.post(OPENROUTER_URL, json=payload, headers=headers, timeout=60)
-    resp.raise_for_status()
-    data = resp.json()
+    data = client.chat(payload)
 
     try:
         content = data["choices"][0]["message"]["content"]
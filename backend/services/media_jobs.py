@@ -0,0 +1,491 @@
+"""
+Background post-processing of uploaded recordings.
+
+Each upload queues one media_jobs row per blob, in the upload's own
+transaction. MEDIA_WORKERS threads claim jobs with FOR UPDATE SKIP LOCKED
+and run the MEDIA_PROCESSORS pipeline over the file:
+
+  probe      duration, container, codecs, dimensions (ffprobe, or ffmpeg alone)
+  thumbnail  poster JPEG for videos (ffmpeg)
+  waveform   peak summary as JSON (ffmpeg)
+  transcode  H.264/AAC MP4 or AAC M4A with faststart, opt-in (ffmpeg)
+
+Processors whose tool isn't installed are skipped and listed under
+"skipped", so the pipeline degrades to whatever is available. Derived
+files are stored as blobs, and their URLs are recorded in
+recording_blobs.media and test_attempts.<kind>_media. A failing job is
+retried with exponential backoff up to MEDIA_MAX_ATTEMPTS.
+"""
+import re
+import os
+import sys
+import json
+import time
+import uuid
+import array
+import shutil
+import tempfile
+import threading
+import subprocess
+from config import (
+    db_connection,
+    UPLOAD_BUFFER_BYTES,
+    MEDIA_WORKERS,
+    MEDIA_PROCESSORS,
+    MEDIA_POLL_SECONDS,
+    MEDIA_STALE_SECONDS,
+    MEDIA_MAX_ATTEMPTS,
+    MEDIA_RETRY_SECONDS,
+    MEDIA_TOOL_TIMEOUT,
+    MEDIA_WAVEFORM_POINTS,
+    FFMPEG_BIN,
+    FFPROBE_BIN,
+)
+from services import storage
+
+MEDIA_COLUMNS = {"audio": "audio_media", "video": "video_media"}
+
+_wakeup = threading.Event()
+_stop = threading.Event()
+_workers = []
+_lock = threading.Lock()
+_stats = {"done": 0, "retried": 0, "failed": 0, "total_ms": 0.0, "max_ms": 0.0, "skipped": {}}
+
+
+def _run(cmd):
+    """Run a media tool; raises RuntimeError with the tail of stderr on failure."""
+    proc = subprocess.run(cmd, capture_output=True, timeout=MEDIA_TOOL_TIMEOUT)
+    if proc.returncode != 0:
+        tail = proc.stderr.decode("utf-8", "replace").strip()[-500:]
+        raise RuntimeError(f"{os.path.basename(cmd[0])} exited with {proc.returncode}: {tail}")
+    return proc
+
+
+def _have(tool):
+    return shutil.which(tool) is not None
+
+
+# ==============================================
+# Processors
+# ==============================================
+class Context:
+    """What a processor works on: the source file, earlier results, and artifact storage."""
+
+    def __init__(self, digest, kind, path, workdir):
+        self.digest = digest
+        self.kind = kind
+        self.path = path
+        self.workdir = workdir
+        self.results = {}
+        self.artifacts = []
+
+    def has_stream(self, codec_type):
+        """True/False from the probe results, or None when nothing was probed."""
+        streams = (self.results.get("probe") or {}).get("streams")
+        if streams is None:
+            return None
+        return any(s.get("type") == codec_type for s in streams)
+
+    def save_artifact(self, path, content_type):
+        """Store a derived file as a blob and return its URL."""
+        store = storage.get_store()
+        blob = store.put_file(path, content_type)
+        self.artifacts.append(blob)
+        return store.url(blob.digest)
+
+
+class Processor:
+    """
+    One pipeline step. run() returns a dict merged into the recording's
+    media results; raising fails the job so it is retried.
+    """
+    name = None
+    kinds = ("audio", "video")
+
+    def tools(self):
+        return ()
+
+    def available(self):
+        return all(_have(t) for t in self.tools())
+
+    def applies(self, ctx):
+        return ctx.kind in self.kinds
+
+    def run(self, ctx):
+        raise NotImplementedError
+
+
+_TIME_RE = re.compile(rb"time=(\d+):(\d+):(\d+(?:\.\d+)?)")
+_STREAM_RE = re.compile(rb"Stream #\d+:\d+[^:]*: (Video|Audio): (\w+)([^\n]*)")
+_SIZE_RE = re.compile(rb", (\d{2,5})x(\d{2,5})")
+
+
+def _demux_duration(path):
+    # MediaRecorder webm has no duration in its header; demuxing without
+    # decoding (-c copy) is fast and the last time= is the real length
+    proc = _run([FFMPEG_BIN, "-hide_banner", "-nostdin", "-i", path, "-map", "0", "-c", "copy", "-f", "null", "-"])
+    times = _TIME_RE.findall(proc.stderr)
+    if not times:
+        return None, proc.stderr
+    h, m, s = times[-1]
+    return round(int(h) * 3600 + int(m) * 60 + float(s), 3), proc.stderr
+
+
+class ProbeProcessor(Processor):
+    name = "probe"
+
+    def tools(self):
+        return (FFPROBE_BIN,) if _have(FFPROBE_BIN) else (FFMPEG_BIN,)
+
+    def run(self, ctx):
+        if not _have(FFPROBE_BIN):
+            return {"probe": self._ffmpeg_only(ctx.path)}
+
+        proc = _run([FFPROBE_BIN, "-v", "error", "-print_format", "json",
+                     "-show_format", "-show_streams", ctx.path])
+        data = json.loads(proc.stdout or b"{}")
+        fmt = data.get("format") or {}
+        streams = [
+            {
+                "type": s.get("codec_type"),
+                "codec": s.get("codec_name"),
+                "width": s.get("width"),
+                "height": s.get("height"),
+                "sample_rate": int(s["sample_rate"]) if s.get("sample_rate") else None,
+                "channels": s.get("channels"),
+            }
+            for s in data.get("streams") or []
+        ]
+        duration = float(fmt["duration"]) if fmt.get("duration") not in (None, "N/A") else None
+        if duration is None and _have(FFMPEG_BIN):
+            duration, _ = _demux_duration(ctx.path)
+        return {"probe": {
+            "duration": duration,
+            "format": fmt.get("format_name"),
+            "bit_rate": int(fmt["bit_rate"]) if fmt.get("bit_rate") not in (None, "N/A") else None,
+            "streams": streams,
+        }}
+
+    def _ffmpeg_only(self, path):
+        duration, stderr = _demux_duration(path)
+        streams = []
+        # Only the input section; ffmpeg lists the output's streams after it
+        for codec_type, codec, rest in _STREAM_RE.findall(stderr.split(b"\nOutput #")[0]):
+            size = _SIZE_RE.search(rest) if codec_type == b"Video" else None
+            streams.append({
+                "type": codec_type.decode().lower(),
+                "codec": codec.decode(),
+                "width": int(size.group(1)) if size else None,
+                "height": int(size.group(2)) if size else None,
+            })
+        return {"duration": duration, "streams": streams}
+
+
+class ThumbnailProcessor(Processor):
+    name = "thumbnail"
+    kinds = ("video",)
+
+    def tools(self):
+        return (FFMPEG_BIN,)
+
+    def run(self, ctx):
+        if ctx.has_stream("video") is False:
+            return {}
+        out = os.path.join(ctx.workdir, "poster.jpg")
+        # The thumbnail filter picks a representative frame, not a black first one
+        _run([FFMPEG_BIN, "-v", "error", "-nostdin", "-y", "-i", ctx.path,
+              "-vf", "thumbnail,scale='min(640,iw)':-2", "-frames:v", "1", "-q:v", "4", out])
+        return {"poster_url": ctx.save_artifact(out, "image/jpeg")}
+
+
+class WaveformProcessor(Processor):
+    name = "waveform"
+    # Peaks are taken over 100 ms windows of 8 kHz mono, then merged down
+    # to MEDIA_WAVEFORM_POINTS
+    sample_rate = 8000
+    window = 800
+
+    def tools(self):
+        return (FFMPEG_BIN,)
+
+    def run(self, ctx):
+        if ctx.has_stream("audio") is False:
+            return {}
+        proc = subprocess.Popen(
+            [FFMPEG_BIN, "-v", "error", "-nostdin", "-i", ctx.path, "-vn", "-ac", "1",
+             "-ar", str(self.sample_rate), "-f", "s16le", "-"],
+            stdout=subprocess.PIPE, stderr=subprocess.PIPE,
+        )
+        timer = threading.Timer(MEDIA_TOOL_TIMEOUT, proc.kill)
+        timer.start()
+        try:
+            peaks = self._peaks(proc.stdout)
+            stderr = proc.stderr.read()
+            returncode = proc.wait()
+        finally:
+            timer.cancel()
+        if returncode != 0:
+            raise RuntimeError(f"ffmpeg exited with {returncode}: {stderr.decode('utf-8', 'replace')[-500:]}")
+
+        step = max(1, -(-len(peaks) // MEDIA_WAVEFORM_POINTS))
+        points = [round(max(peaks[i:i + step]), 3) for i in range(0, len(peaks), step)]
+        out = os.path.join(ctx.workdir, "waveform.json")
+        with open(out, "w") as f:
+            json.dump({"seconds_per_point": step * self.window / self.sample_rate, "peaks": points}, f)
+        return {"waveform_url": ctx.save_artifact(out, "application/json"), "waveform_points": len(points)}
+
+    def _peaks(self, stdout):
+        peaks = []
+        pending = b""
+        frame = self.window * 2
+        for buf in iter(lambda: stdout.read(frame * 64), b""):
+            buf = pending + buf
+            usable = len(buf) - len(buf) % frame
+            samples = array.array("h", buf[:usable])
+            if sys.byteorder == "big":
+                samples.byteswap()
+            for i in range(0, len(samples), self.window):
+                w = samples[i:i + self.window]
+                peaks.append(max(max(w), -min(w)) / 32768)
+            pending = buf[usable:]
+        if len(pending) >= 2:
+            w = array.array("h", pending[:len(pending) - len(pending) % 2])
+            if sys.byteorder == "big":
+                w.byteswap()
+            peaks.append(max(max(w), -min(w)) / 32768)
+        return peaks
+
+
+class TranscodeProcessor(Processor):
+    name = "transcode"
+
+    def tools(self):
+        return (FFMPEG_BIN,)
+
+    def run(self, ctx):
+        if ctx.kind == "video":
+            out, content_type = os.path.join(ctx.workdir, "stream.mp4"), "video/mp4"
+            codec = ["-c:v", "libx264", "-preset", "veryfast", "-crf", "28",
+                     "-vf", "scale=-2:'trunc(min(720,ih)/2)*2'", "-pix_fmt", "yuv420p",
+                     "-c:a", "aac", "-b:a", "96k"]
+        else:
+            out, content_type = os.path.join(ctx.workdir, "stream.m4a"), "audio/mp4"
+            codec = ["-vn", "-c:a", "aac", "-b:a", "64k"]
+        # faststart puts the index up front so players can seek before the download ends
+        _run([FFMPEG_BIN, "-v", "error", "-nostdin", "-y", "-i", ctx.path, *codec, "-movflags", "+faststart", out])
+        return {"transcoded_url": ctx.save_artifact(out, content_type), "transcoded_content_type": content_type}
+
+
+PROCESSORS = {p.name: p for p in (ProbeProcessor(), ThumbnailProcessor(), WaveformProcessor(), TranscodeProcessor())}
+
+
+def register(processor):
+    """Add or replace a processor; enable it by listing its name in MEDIA_PROCESSORS."""
+    PROCESSORS[processor.name] = processor
+
+
+def pipeline():
+    names = [n.strip() for n in MEDIA_PROCESSORS.split(",") if n.strip()]
+    return [PROCESSORS[n] for n in names if n in PROCESSORS]
+
+
+def process(digest, kind):
+    """Run the pipeline over one blob. Returns (media results, artifact Blobs)."""
+    store = storage.get_store()
+    with tempfile.TemporaryDirectory(prefix="media-") as workdir:
+        path = store.path(digest)
+        if path is None:
+            # Remote store: the tools need a seekable local copy
+            path = os.path.join(workdir, "source")
+            src = store.open(digest)
+            try:
+                with open(path, "wb") as out:
+                    shutil.copyfileobj(src, out, UPLOAD_BUFFER_BYTES)
+            finally:
+                src.close()
+
+        ctx = Context(digest, kind, path, workdir)
+        media = {"processed": [], "skipped": {}}
+        for processor in pipeline():
+            if not processor.applies(ctx):
+                continue
+            if not processor.available():
+                media["skipped"][processor.name] = f"{', '.join(processor.tools())} not installed"
+                continue
+            ctx.results.update(processor.run(ctx))
+            media["processed"].append(processor.name)
+        media.update(ctx.results)
+        return media, ctx.artifacts
+
+
+# ==============================================
+# Queue
+# ==============================================
+def enqueue(cur, blob, kind, candidate_id, question_set_id):
+    """
+    Queue post-processing for an uploaded blob inside the caller's
+    transaction. If the same bytes were processed before, the results are
+    copied onto the attempt right away instead.
+    """
+    if MEDIA_WORKERS <= 0:
+        return
+    cur.execute("""
+        INSERT INTO media_jobs (digest, kind) VALUES (%s, %s)
+        ON CONFLICT (digest) DO NOTHING
+    """, (blob.digest, kind))
+    cur.execute(f"""
+        UPDATE test_attempts t SET {MEDIA_COLUMNS[kind]} = b.media
+        FROM recording_blobs b
+        WHERE b.digest = %s AND b.media IS NOT NULL
+          AND t.candidate_id = %s AND t.question_set_id = %s
+    """, (blob.digest, uuid.UUID(str(candidate_id)), uuid.UUID(str(question_set_id))))
+
+
+def notify_workers():
+    """Wake an idle local worker after a job has been committed."""
+    _wakeup.set()
+
+
+def _claim(conn):
+    """
+    Claim the next due job, or a running one whose worker went quiet for
+    MEDIA_STALE_SECONDS. Stale jobs that already used up their attempts
+    are failed instead of being retried forever.
+    """
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE media_jobs
+            SET status = 'failed', finished_at = NOW(),
+                error = COALESCE(error, 'Worker stopped responding')
+            WHERE status = 'running'
+              AND claimed_at < NOW() - make_interval(secs => %s)
+              AND attempts >= %s
+        """, (MEDIA_STALE_SECONDS, MEDIA_MAX_ATTEMPTS))
+        cur.execute("""
+            UPDATE media_jobs
+            SET status = 'running', claimed_at = NOW(), attempts = attempts + 1
+            WHERE digest = (
+                SELECT digest FROM media_jobs
+                WHERE (status = 'queued' AND run_after <= NOW())
+                   OR (status = 'running' AND claimed_at < NOW() - make_interval(secs => %s)
+                       AND attempts < %s)
+                ORDER BY run_after
+                LIMIT 1
+                FOR UPDATE SKIP LOCKED
+            )
+            RETURNING digest, kind, attempts
+        """, (MEDIA_STALE_SECONDS, MEDIA_MAX_ATTEMPTS))
+        row = cur.fetchone()
+    conn.commit()
+    return row
+
+
+def _finish(conn, job, media, artifacts):
+    """
+    Store a job's results if this claim still owns it. Returns False when
+    the job was re-claimed after going stale; the newer attempt writes then.
+    """
+    digest, kind, attempts = job
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE media_jobs SET status = 'done', finished_at = NOW(), error = NULL
+            WHERE digest = %s AND status = 'running' AND attempts = %s
+        """, (digest, attempts))
+        if cur.rowcount == 0:
+            conn.rollback()
+            print(f"Media job {digest} was re-claimed; dropping attempt {attempts}")
+            return False
+        for blob in artifacts:
+            storage.record_blob(cur, blob)
+        cur.execute("UPDATE recording_blobs SET media = %s WHERE digest = %s", (json.dumps(media), digest))
+        # Every attempt whose recording is this blob (identical uploads share one)
+        cur.execute(f"""
+            UPDATE test_attempts t SET {MEDIA_COLUMNS[kind]} = %s
+            FROM recordings r
+            WHERE r.digest = %s AND r.kind = %s
+              AND t.candidate_id = r.candidate_id AND t.question_set_id = r.question_set_id
+        """, (json.dumps(media), digest, kind))
+    conn.commit()
+    return True
+
+
+def _fail(conn, job, error):
+    digest, _, attempts = job
+    failed = attempts >= MEDIA_MAX_ATTEMPTS
+    with conn.cursor() as cur:
+        cur.execute("""
+            UPDATE media_jobs
+            SET status = %s, error = %s, run_after = NOW() + make_interval(secs => %s)
+            WHERE digest = %s AND status = 'running' AND attempts = %s
+        """, ("failed" if failed else "queued", str(error)[:2000],
+              MEDIA_RETRY_SECONDS * 2 ** (attempts - 1), digest, attempts))
+    conn.commit()
+    with _lock:
+        _stats["failed" if failed else "retried"] += 1
+
+
+def _run_job(job):
+    digest, kind, _ = job
+    started = time.perf_counter()
+    try:
+        media, artifacts = process(digest, kind)
+    except Exception as e:
+        print("🔥 media job error:", digest, e)
+        with db_connection() as conn:
+            _fail(conn, job, e)
+        return
+    with db_connection() as conn:
+        if not _finish(conn, job, media, artifacts):
+            return
+
+    elapsed_ms = (time.perf_counter() - started) * 1000
+    with _lock:
+        _stats["done"] += 1
+        _stats["total_ms"] += elapsed_ms
+        _stats["max_ms"] = round(max(_stats["max_ms"], elapsed_ms), 2)
+        for name in media["skipped"]:
+            _stats["skipped"][name] = _stats["skipped"].get(name, 0) + 1
+
+
+def _worker_loop():
+    while not _stop.is_set():
+        try:
+            # The connection is only held to claim and to record results;
+            # processing can take minutes and runs without one
+            with db_connection() as conn:
+                job = _claim(conn)
+            if job is None:
+                _wakeup.wait(MEDIA_POLL_SECONDS)
+                _wakeup.clear()
+                continue
+            _run_job(job)
+        except Exception as e:
+            print("🔥 media worker error:", e)
+            _stop.wait(MEDIA_POLL_SECONDS)
+
+
+def start_workers(n=MEDIA_WORKERS):
+    """Start the background media workers once per process."""
+    if _workers or n <= 0:
+        return
+    for i in range(n):
+        t = threading.Thread(target=_worker_loop, name=f"media-worker-{i}", daemon=True)
+        t.start()
+        _workers.append(t)
+
+
+def stop_workers(timeout=None):
+    _stop.set()
+    _wakeup.set()
+    for t in _workers:
+        t.join(timeout)
+
+
+def stats():
+    with _lock:
+        out = dict(_stats, skipped=dict(_stats["skipped"]))
+    out["avg_ms"] = round(out["total_ms"] / out["done"], 2) if out["done"] else 0.0
+    out["total_ms"] = round(out["total_ms"], 2)
+    out["workers"] = len(_workers)
+    out["processors"] = {p.name: p.available() for p in pipeline()}
+    return out
@@ -0,0 +1,140 @@
+import time
+import random
+import threading
+import email.utils
+import requests
+from requests.adapters import HTTPAdapter
+from config import (
+    OPENROUTER_API_KEY,
+    OPENROUTER_URL,
+    OPENROUTER_POOL_SIZE,
+    OPENROUTER_MAX_RETRIES,
+    OPENROUTER_BACKOFF_BASE,
+    OPENROUTER_BACKOFF_MAX,
+    OPENROUTER_CONNECT_TIMEOUT,
+    OPENROUTER_READ_TIMEOUT,
+)
+
+RETRY_STATUSES = {429, 500, 502, 503, 504}
+
+
+def _retry_after_seconds(resp):
+    """Parse a Retry-After header given either as seconds or an HTTP date."""
+    value = resp.headers.get("Retry-After") if resp is not None else None
+    if not value:
+        return None
+    try:
+        return max(0.0, float(value))
+    except ValueError:
+        pass
+    try:
+        when = email.utils.parsedate_to_datetime(value)
+        return max(0.0, when.timestamp() - time.time())
+    except Exception:
+        return None
+
+
+class OpenRouterClient:
+    """
+    Keep-alive session for OpenRouter chat completions, shared by every
+    thread in the process. Retries 429/5xx and connection errors with
+    exponential backoff and full jitter, honouring Retry-After.
+    """
+
+    def __init__(self, url=OPENROUTER_URL, api_key=OPENROUTER_API_KEY,
+                 pool_size=OPENROUTER_POOL_SIZE, max_retries=OPENROUTER_MAX_RETRIES):
+        self.url = url
+        self.max_retries = max_retries
+        self.timeout = (OPENROUTER_CONNECT_TIMEOUT, OPENROUTER_READ_TIMEOUT)
+        self.pool_size = pool_size
+
+        self.session = requests.Session()
+        self.session.headers.update({
+            "Authorization": f"Bearer {api_key}",
+            "Content-Type": "application/json"
+        })
+        # pool_block makes callers wait for a free connection instead of
+        # opening throwaway ones past pool_size
+        self.adapter = HTTPAdapter(pool_connections=1, pool_maxsize=pool_size, pool_block=True)
+        self.session.mount("https://", self.adapter)
+        self.session.mount("http://", self.adapter)
+
+        self._lock = threading.Lock()
+        self._stats = {
+            "requests": 0,
+            "attempts": 0,
+            "retries": 0,
+            "failures": 0,
+            "retry_statuses": {},
+            "in_flight": 0,
+            "max_in_flight": 0,
+        }
+
+    def _count(self, key, n=1):
+        with self._lock:
+            self._stats[key] += n
+            if key == "in_flight":
+                self._stats["max_in_flight"] = max(self._stats["max_in_flight"], self._stats["in_flight"])
+
+    def _backoff(self, attempt, resp=None):
+        retry_after = _retry_after_seconds(resp)
+        if retry_after is not None:
+            return min(retry_after, OPENROUTER_BACKOFF_MAX)
+        cap = min(OPENROUTER_BACKOFF_MAX, OPENROUTER_BACKOFF_BASE * (2 ** attempt))
+        return random.uniform(0, cap)
+
+    def chat(self, payload):
+        """POST a chat-completions payload and return the decoded JSON body."""
+        self._count("requests")
+        self._count("in_flight")
+        try:
+            attempt = 0
+            while True:
+                self._count("attempts")
+                resp = None
+                try:
+                    resp = self.session.post(self.url, json=payload, timeout=self.timeout)
+                    if resp.status_code not in RETRY_STATUSES:
+                        resp.raise_for_status()
+                        return resp.json()
+                    error = requests.HTTPError(f"{resp.status_code} from OpenRouter", response=resp)
+                    with self._lock:
+                        statuses = self._stats["retry_statuses"]
+                        statuses[resp.status_code] = statuses.get(resp.status_code, 0) + 1
+                except (requests.ConnectionError, requests.Timeout) as e:
+                    error = e
+
+                if attempt >= self.max_retries:
+                    raise error
+
+                self._count("retries")
+                time.sleep(self._backoff(attempt, resp))
+                attempt += 1
+        except Exception:
+            self._count("failures")
+            raise
+        finally:
+            self._count("in_flight", -1)
+
+    def stats(self):
+        with self._lock:
+            out = dict(self._stats, retry_statuses=dict(self._stats["retry_statuses"]))
+
+        pools = []
+        for key in list(self.adapter.poolmanager.pools.keys()):
+            pool = self.adapter.poolmanager.pools.get(key)
+            if pool is None:
+                continue
+            pools.append({
+                "host": pool.host,
+                "connections_opened": pool.num_connections,
+                "requests": pool.num_requests,
+                "available": pool.pool.qsize() if pool.pool is not None else 0,
+            })
+
+        out["pool_size"] = self.pool_size
+        out["pools"] = pools
+        return out
+
+
+client = OpenRouterClient()
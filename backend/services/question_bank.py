@@ -0,0 +1,118 @@
+import json
+import uuid
+import threading
+from concurrent.futures import ThreadPoolExecutor
+from config import (
+    db_connection,
+    QUESTION_BANK_MIN_STOCK,
+    QUESTION_BANK_MAX_USES,
+    QUESTION_BANK_TTL_DAYS,
+    QUESTION_BANK_REFILL_WORKERS,
+    GENERATION_BATCH_SIZE,
+)
+from services.llm_client import generate_question_batch, has_question
+from utils.bulk import bulk_insert
+
+_refill_pool = ThreadPoolExecutor(max_workers=QUESTION_BANK_REFILL_WORKERS)
+_refilling = set()
+_refilling_lock = threading.Lock()
+
+# An entry is servable while it is younger than the TTL and below the use cap
+_FRESH_SQL = """
+    skill = %s AND difficulty = %s AND qtype = %s AND mcq_options = %s
+    AND usage_count < %s
+    AND created_at > NOW() - make_interval(days => %s)
+"""
+
+
+def take(skill, difficulty, qtype, options, count):
+    """
+    Serve up to `count` questions for a key, least-used first, and bump
+    their usage counters. Returns a list of content dicts (possibly empty).
+    """
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"""
+                WITH picked AS (
+                    SELECT id FROM question_bank
+                    WHERE {_FRESH_SQL}
+                    ORDER BY usage_count, random()
+                    LIMIT %s
+                    FOR UPDATE SKIP LOCKED
+                )
+                UPDATE question_bank qb
+                SET usage_count = qb.usage_count + 1, last_used_at = NOW()
+                FROM picked
+                WHERE qb.id = picked.id
+                RETURNING qb.content
+            """, (skill, difficulty, qtype, options, QUESTION_BANK_MAX_USES, QUESTION_BANK_TTL_DAYS, count))
+            rows = cur.fetchall()
+            conn.commit()
+
+            return [r[0] if isinstance(r[0], dict) else json.loads(r[0]) for r in rows]
+
+
+def store(skill, difficulty, qtype, options, contents):
+    """Add generated questions to the bank, dropping any without question text. Returns the number stored."""
+    rows = [
+        (uuid.uuid4(), skill, difficulty, qtype, options, json.dumps(content))
+        for content in contents if has_question(content)
+    ]
+    if not rows:
+        return 0
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            bulk_insert(cur, "question_bank", ("id", "skill", "difficulty", "qtype", "mcq_options", "content"), rows)
+            conn.commit()
+    return len(rows)
+
+
+def evict_stale():
+    """Delete entries past their TTL or usage cap. Returns the number removed."""
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                DELETE FROM question_bank
+                WHERE usage_count >= %s
+                   OR created_at <= NOW() - make_interval(days => %s)
+            """, (QUESTION_BANK_MAX_USES, QUESTION_BANK_TTL_DAYS))
+            removed = cur.rowcount
+            conn.commit()
+            return removed
+
+
+def stock(skill, difficulty, qtype, options):
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute(f"SELECT COUNT(*) FROM question_bank WHERE {_FRESH_SQL}",
+                        (skill, difficulty, qtype, options, QUESTION_BANK_MAX_USES, QUESTION_BANK_TTL_DAYS))
+            return cur.fetchone()[0]
+
+
+def _refill(key):
+    skill, difficulty, qtype, options = key
+    try:
+        evict_stale()
+        missing = QUESTION_BANK_MIN_STOCK - stock(*key)
+        if missing > 0:
+            contents = generate_question_batch(
+                skill=skill, difficulty=difficulty, qtype=qtype,
+                count=min(missing, GENERATION_BATCH_SIZE), options=options,
+            )
+            stored = store(skill, difficulty, qtype, options, contents)
+            print(f"Question bank refilled {key} with {stored} questions")
+    except Exception as e:
+        print(f"Question bank refill failed for {key}:", e)
+    finally:
+        with _refilling_lock:
+            _refilling.discard(key)
+
+
+def schedule_refill(skill, difficulty, qtype, options):
+    """Top the key back up to QUESTION_BANK_MIN_STOCK on a background thread."""
+    key = (skill, difficulty, qtype, options)
+    with _refilling_lock:
+        if key in _refilling:
+            return
+        _refilling.add(key)
+    _refill_pool.submit(_refill, key)
@@ -0,0 +1,346 @@
+"""
+Content-addressed storage for recordings.
+
+Blobs are named by the sha256 of their bytes and sharded two levels deep
+by digest prefix (ab/cd/abcd...), so no directory grows past a few
+thousand entries and uploading identical bytes again stores nothing new.
+LocalStore keeps them under UPLOAD_DIR/blobs, S3Store in any
+S3-compatible bucket (boto3 is only needed for that one). The
+recordings table indexes which attempt question each blob belongs to.
+"""
+import os
+import json
+import uuid
+import hashlib
+import tempfile
+import mimetypes
+import threading
+from collections import OrderedDict, namedtuple
+from utils.bulk import bulk_insert
+from config import (
+    db_connection,
+    UPLOAD_DIR,
+    UPLOAD_BUFFER_BYTES,
+    STORAGE_BACKEND,
+    S3_BUCKET,
+    S3_PREFIX,
+    S3_ENDPOINT_URL,
+    S3_REGION,
+)
+
+try:
+    import boto3
+    from botocore.config import Config as BotoConfig
+    from botocore.exceptions import ClientError
+except ImportError:  # pragma: no cover - depends on the deployment
+    boto3 = BotoConfig = ClientError = None
+
+# created is False when the bytes were already stored
+Blob = namedtuple("Blob", "digest size content_type created")
+
+_HEX = set("0123456789abcdef")
+
+# digest -> content type; blobs never change, so entries never go stale
+_types = OrderedDict()
+_types_lock = threading.Lock()
+_TYPES_CACHE_SIZE = 4096
+
+
+def shard_key(digest):
+    """ab/cd/abcd... for a sha256 hex digest."""
+    if len(digest) != 64 or not set(digest) <= _HEX:
+        raise ValueError("Invalid blob digest")
+    return f"{digest[:2]}/{digest[2:4]}/{digest}"
+
+
+def guess_content_type(filename, default="application/octet-stream"):
+    return mimetypes.guess_type(filename or "")[0] or default
+
+
+def _copy_hashing(src, dst):
+    # Streams in UPLOAD_BUFFER_BYTES pieces so a recording is never held in memory
+    digest = hashlib.sha256()
+    size = 0
+    for buf in iter(lambda: src.read(UPLOAD_BUFFER_BYTES), b""):
+        digest.update(buf)
+        dst.write(buf)
+        size += len(buf)
+    return digest.hexdigest(), size
+
+
+def _hash_file(path):
+    digest = hashlib.sha256()
+    with open(path, "rb") as f:
+        for buf in iter(lambda: f.read(UPLOAD_BUFFER_BYTES * 16), b""):
+            digest.update(buf)
+    return digest.hexdigest()
+
+
+def _verify(digest, expected):
+    if expected and digest != expected:
+        raise ValueError("Upload checksum mismatch")
+
+
+class BlobStore:
+    """
+    Interface shared by the storage backends. Digests are sha256 hex;
+    `expected` is an optional client checksum checked before anything is
+    stored.
+    """
+    name = None
+
+    def put_stream(self, stream, content_type, expected=None):
+        """Store everything read from `stream`. Returns a Blob."""
+        raise NotImplementedError
+
+    def put_file(self, path, content_type, expected=None):
+        """Store the file at `path`, leaving it in place. Returns a Blob."""
+        raise NotImplementedError
+
+    def exists(self, digest):
+        raise NotImplementedError
+
+    def open(self, digest):
+        """Readable binary file object for the blob."""
+        raise NotImplementedError
+
+    def delete(self, digest):
+        raise NotImplementedError
+
+    def path(self, digest):
+        """Local filesystem path of the blob, or None if it isn't on local disk."""
+        return None
+
+    def url(self, digest):
+        return f"/{UPLOAD_DIR}/blobs/{shard_key(digest)}"
+
+    def presigned_url(self, digest, expires):
+        """Time-limited direct download URL, or None if the store can't hand one out."""
+        return None
+
+
+class LocalStore(BlobStore):
+    name = "local"
+
+    def __init__(self, root):
+        self.root = root
+        self.tmp = os.path.join(root, ".tmp")
+        os.makedirs(self.tmp, exist_ok=True)
+
+    def path(self, digest):
+        return os.path.join(self.root, *shard_key(digest).split("/"))
+
+    def _publish(self, src, digest):
+        # A hard link makes the blob appear atomically and fails if it already
+        # exists; src is always a private temp file under self.tmp
+        dest = self.path(digest)
+        os.makedirs(os.path.dirname(dest), exist_ok=True)
+        try:
+            os.link(src, dest)
+            return True
+        except FileExistsError:
+            return False
+
+    def put_stream(self, stream, content_type, expected=None):
+        fd, tmp = tempfile.mkstemp(dir=self.tmp)
+        try:
+            with os.fdopen(fd, "wb") as out:
+                digest, size = _copy_hashing(stream, out)
+                out.flush()
+                os.fsync(out.fileno())
+            _verify(digest, expected)
+            os.chmod(tmp, 0o644)
+            return Blob(digest, size, content_type, self._publish(tmp, digest))
+        finally:
+            os.unlink(tmp)
+
+    def put_file(self, path, content_type, expected=None):
+        # The blob gets its own inode: linking `path` itself would let later
+        # writes to it (a chunk PUT on an upload whose complete() failed to
+        # commit) silently change a published, content-addressed blob
+        digest = _hash_file(path)
+        _verify(digest, expected)
+        if self.exists(digest):
+            return Blob(digest, os.path.getsize(path), content_type, False)
+        with open(path, "rb") as f:
+            # Re-hashed while copying, so a file changed meanwhile is rejected
+            return self.put_stream(f, content_type, expected=digest)
+
+    def exists(self, digest):
+        return os.path.exists(self.path(digest))
+
+    def open(self, digest):
+        return open(self.path(digest), "rb")
+
+    def delete(self, digest):
+        try:
+            os.remove(self.path(digest))
+        except FileNotFoundError:
+            pass
+
+
+class S3Store(BlobStore):
+    name = "s3"
+
+    def __init__(self, bucket, prefix="", endpoint_url=None, region=None, client=None):
+        if client is None:
+            if boto3 is None:
+                raise RuntimeError("STORAGE_BACKEND=s3 needs boto3 installed")
+            options = {"s3": {"addressing_style": "path"}} if endpoint_url else {}
+            # Newer botocore sends streaming trailer checksums many
+            # S3-compatible servers reject; only send them when S3 requires it
+            if "request_checksum_calculation" in BotoConfig.OPTION_DEFAULTS:
+                options["request_checksum_calculation"] = "when_required"
+                options["response_checksum_validation"] = "when_required"
+            client = boto3.client("s3", endpoint_url=endpoint_url, region_name=region,
+                                  config=BotoConfig(**options))
+        self.client = client
+        self.bucket = bucket
+        self.prefix = prefix
+
+    def key(self, digest):
+        return f"{self.prefix}{shard_key(digest)}"
+
+    def exists(self, digest):
+        try:
+            self.client.head_object(Bucket=self.bucket, Key=self.key(digest))
+            return True
+        except ClientError as e:
+            if e.response.get("ResponseMetadata", {}).get("HTTPStatusCode") == 404:
+                return False
+            raise
+
+    def put_stream(self, stream, content_type, expected=None):
+        # The key depends on the digest, so spool to local disk while hashing first
+        with tempfile.TemporaryFile() as spool:
+            digest, size = _copy_hashing(stream, spool)
+            _verify(digest, expected)
+            if self.exists(digest):
+                return Blob(digest, size, content_type, False)
+            spool.seek(0)
+            self.client.upload_fileobj(spool, self.bucket, self.key(digest),
+                                       ExtraArgs={"ContentType": content_type})
+        return Blob(digest, size, content_type, True)
+
+    def put_file(self, path, content_type, expected=None):
+        digest = _hash_file(path)
+        _verify(digest, expected)
+        size = os.path.getsize(path)
+        if self.exists(digest):
+            return Blob(digest, size, content_type, False)
+        self.client.upload_file(path, self.bucket, self.key(digest),
+                                ExtraArgs={"ContentType": content_type})
+        return Blob(digest, size, content_type, True)
+
+    def open(self, digest):
+        return self.client.get_object(Bucket=self.bucket, Key=self.key(digest))["Body"]
+
+    def delete(self, digest):
+        self.client.delete_object(Bucket=self.bucket, Key=self.key(digest))
+
+    def presigned_url(self, digest, expires):
+        return self.client.generate_presigned_url(
+            "get_object", Params={"Bucket": self.bucket, "Key": self.key(digest)}, ExpiresIn=expires
+        )
+
+
+_store = None
+_store_lock = threading.Lock()
+
+
+def get_store():
+    """The process-wide store selected by STORAGE_BACKEND."""
+    global _store
+    with _store_lock:
+        if _store is None:
+            if STORAGE_BACKEND == "local":
+                _store = LocalStore(os.path.join(UPLOAD_DIR, "blobs"))
+            elif STORAGE_BACKEND == "s3":
+                if not S3_BUCKET:
+                    raise RuntimeError("STORAGE_BACKEND=s3 needs S3_BUCKET")
+                _store = S3Store(S3_BUCKET, S3_PREFIX, S3_ENDPOINT_URL, S3_REGION)
+            else:
+                raise ValueError(f"Unknown STORAGE_BACKEND: {STORAGE_BACKEND}")
+        return _store
+
+
+# ==============================================
+# Metadata index
+# ==============================================
+def record_blob(cur, blob):
+    """Add the blob to recording_blobs (a no-op if it is already there)."""
+    cur.execute("""
+        INSERT INTO recording_blobs (digest, size, content_type, backend)
+        VALUES (%s, %s, %s, %s)
+        ON CONFLICT (digest) DO NOTHING
+    """, (blob.digest, blob.size, blob.content_type, get_store().name))
+
+
+def index(cur, blob, candidate_id, question_set_id, kind, qa_data=None, filename=None):
+    """
+    Record the blob and point each question of the attempt's QA entries at
+    it (question '' when there are none). A re-upload for the same question
+    replaces the mapping; the old blob stays until nothing references it.
+    """
+    candidate_id = uuid.UUID(str(candidate_id))
+    question_set_id = uuid.UUID(str(question_set_id))
+    record_blob(cur, blob)
+
+    entries = qa_data if isinstance(qa_data, list) else [qa_data]
+    questions = {str(e.get("question") or "") for e in entries if isinstance(e, dict)} or {""}
+    bulk_insert(
+        cur,
+        "recordings",
+        ("candidate_id", "question_set_id", "question", "kind", "digest", "filename"),
+        ((candidate_id, question_set_id, q, kind, blob.digest, filename) for q in sorted(questions)),
+        on_conflict="""
+            ON CONFLICT (candidate_id, question_set_id, question, kind)
+            DO UPDATE SET digest = EXCLUDED.digest, filename = EXCLUDED.filename, created_at = NOW()
+        """,
+    )
+
+
+def find(cur, candidate_id, question_set_id, question=None):
+    """An attempt's recordings (optionally for one question), with their URLs."""
+    sql = """
+        SELECT r.question, r.kind, r.digest, r.filename, b.size, b.content_type, b.media, r.created_at
+        FROM recordings r JOIN recording_blobs b ON b.digest = r.digest
+        WHERE r.candidate_id = %s AND r.question_set_id = %s
+    """
+    args = [uuid.UUID(str(candidate_id)), uuid.UUID(str(question_set_id))]
+    if question is not None:
+        sql += " AND r.question = %s"
+        args.append(question)
+    cur.execute(sql + " ORDER BY r.created_at, r.question", args)
+    store = get_store()
+    return [
+        {
+            "question": question, "kind": kind, "digest": digest, "filename": filename,
+            "size": size, "content_type": content_type, "url": store.url(digest),
+            "media": media if not isinstance(media, str) else json.loads(media),
+            "created_at": created_at.isoformat() if created_at else None,
+        }
+        for question, kind, digest, filename, size, content_type, media, created_at in cur.fetchall()
+    ]
+
+
+def content_type(digest, default="application/octet-stream"):
+    """Content type recorded for a blob, cached in memory after the first lookup."""
+    with _types_lock:
+        if digest in _types:
+            _types.move_to_end(digest)
+            return _types[digest]
+    try:
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("SELECT content_type FROM recording_blobs WHERE digest = %s", (digest,))
+            row = cur.fetchone()
+    except Exception as e:
+        print("🔥 blob content type lookup error:", e)
+        return default
+    if row is None:
+        return default
+    with _types_lock:
+        _types[digest] = row[0]
+        if len(_types) > _TYPES_CACHE_SIZE:
+            _types.popitem(last=False)
+    return row[0]
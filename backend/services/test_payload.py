@@ -0,0 +1,288 @@
+import json
+import time
+import uuid
+import hashlib
+import threading
+from collections import OrderedDict
+from config import (
+    db_connection,
+    TEST_PAYLOAD_CACHE_SIZE,
+    TEST_PAYLOAD_PREWARM_SECONDS,
+    TEST_PAYLOAD_PREWARM_LIMIT,
+    TEST_PAYLOAD_REVALIDATE_SECONDS,
+)
+
+_memory = OrderedDict()
+_lock = threading.Lock()
+_stats = {
+    "memory_hits": 0, "db_hits": 0, "builds": 0, "coalesced": 0, "prewarmed": 0, "db_errors": 0,
+    "revalidations": 0, "stale": 0,
+}
+
+# question_set_id -> Event set once the in-flight load finishes
+_inflight = {}
+
+_prewarm_stop = threading.Event()
+_prewarm_thread = None
+
+
+def candidate_question(qid, entry):
+    """Shape one stored question entry the way /test/start serves it."""
+    qid_str = str(qid)
+    entry = entry if isinstance(entry, dict) else json.loads(entry)
+    inner = entry.get("content") or {}
+    return {
+        "id": qid_str,
+        "question_id": qid_str,
+        "type": entry.get("type"),
+        "skill": entry.get("skill"),
+        "difficulty": entry.get("difficulty"),
+        "time_limit": entry.get("time_limit"),
+        "positive_marking": entry.get("positive_marking"),
+        "negative_marking": entry.get("negative_marking"),
+        "question": inner.get("question"),
+        "options": inner.get("options"),
+        "correct_answer": inner.get("correct_answer"),
+        "prompt_text": inner.get("prompt_text"),
+        "media_url": inner.get("media_url"),
+        "rubric": inner.get("rubric"),
+        "suggested_time_seconds": inner.get("suggested_time_seconds"),
+    }
+
+
+def serialize(question_set_id, rows):
+    """
+    Build the /test/start body from (id, entry) rows.
+    Returns (body, etag) where body is the JSON text served as-is.
+    """
+    body = json.dumps({
+        "question_set_id": str(question_set_id),
+        "questions": [candidate_question(qid, entry) for qid, entry in rows],
+    }, separators=(",", ":"))
+    etag = hashlib.sha256(body.encode("utf-8")).hexdigest()[:32]
+    return body, etag
+
+
+def store(cur, question_set_id, rows):
+    """Serialize and save the payload for a set within the caller's transaction."""
+    body, etag = serialize(question_set_id, rows)
+    cur.execute("""
+        INSERT INTO test_payloads (question_set_id, body, etag)
+        VALUES (%s, %s, %s)
+        ON CONFLICT (question_set_id) DO UPDATE SET
+            body = EXCLUDED.body,
+            etag = EXCLUDED.etag,
+            created_at = NOW()
+    """, (uuid.UUID(str(question_set_id)), body, etag))
+    return body, etag
+
+
+def rebuild(cur, question_set_id):
+    """
+    Re-serialize a set's payload from its questions after they change, in
+    the caller's transaction. The new ETag reaches other workers' caches on
+    their next revalidation. Returns (body, etag), or None for an empty set.
+    """
+    question_set_id = uuid.UUID(str(question_set_id))
+    with _lock:
+        _memory.pop(str(question_set_id), None)
+    cur.execute("SELECT id, content FROM questions WHERE question_set_id = %s", (question_set_id,))
+    rows = cur.fetchall()
+    if not rows:
+        cur.execute("DELETE FROM test_payloads WHERE question_set_id = %s", (question_set_id,))
+        return None
+    return store(cur, question_set_id, rows)
+
+
+def _count(key, n=1):
+    with _lock:
+        _stats[key] += n
+
+
+def _remember(key, body, etag):
+    with _lock:
+        _memory[key] = (body, etag, time.monotonic())
+        _memory.move_to_end(key)
+        while len(_memory) > TEST_PAYLOAD_CACHE_SIZE:
+            _memory.popitem(last=False)
+
+
+def _load(question_set_id):
+    """
+    Read the stored payload, building and storing it from `questions` if
+    missing. Returns (body, etag, found); found is False for an empty set.
+    """
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("SELECT body, etag FROM test_payloads WHERE question_set_id = %s", (question_set_id,))
+            row = cur.fetchone()
+            if row:
+                _count("db_hits")
+                return row[0], row[1], True
+
+            # Sets finalized before payloads were stored, or saved through
+            # /questions/save, are built once here and stored for next time
+            cur.execute("SELECT id, content FROM questions WHERE question_set_id = %s", (question_set_id,))
+            rows = cur.fetchall()
+            _count("builds")
+            if not rows:
+                return serialize(question_set_id, []) + (False,)
+            body, etag = store(cur, question_set_id, rows)
+        conn.commit()
+        return body, etag, True
+
+
+def _revalidate(question_set_id, etag):
+    """True if the stored payload still has `etag`; otherwise drops the cached copy."""
+    try:
+        with db_connection() as conn:
+            with conn.cursor() as cur:
+                cur.execute("SELECT etag FROM test_payloads WHERE question_set_id = %s", (question_set_id,))
+                row = cur.fetchone()
+    except Exception as e:
+        # Keep serving the cached copy while the database is unreachable
+        print("🔥 test payload revalidation error:", e)
+        _count("db_errors")
+        return True
+    _count("revalidations")
+    if row and row[0] == etag:
+        return True
+    _count("stale")
+    with _lock:
+        cached = _memory.get(str(question_set_id))
+        if cached is not None and cached[1] == etag:
+            del _memory[str(question_set_id)]
+    return False
+
+
+def get(question_set_id):
+    """
+    Return (body, etag) for a question set from the in-process LRU, the
+    stored payload, or a fresh build. Cached copies older than
+    TEST_PAYLOAD_REVALIDATE_SECONDS are checked against the stored ETag.
+    Concurrent misses for the same set wait on a single load instead of
+    each querying the database.
+    """
+    question_set_id = uuid.UUID(str(question_set_id))
+    key = str(question_set_id)
+
+    while True:
+        with _lock:
+            hit = _memory.get(key)
+            if hit is not None:
+                _memory.move_to_end(key)
+                body, etag, checked = hit
+                now = time.monotonic()
+                if now - checked < TEST_PAYLOAD_REVALIDATE_SECONDS:
+                    _stats["memory_hits"] += 1
+                    return body, etag
+                # One caller re-checks; the rest keep serving the cached copy
+                _memory[key] = (body, etag, now)
+            else:
+                waiter = _inflight.get(key)
+                if waiter is None:
+                    done = _inflight[key] = threading.Event()
+                    break
+                _stats["coalesced"] += 1
+        if hit is not None:
+            if _revalidate(question_set_id, etag):
+                _count("memory_hits")
+                return body, etag
+            continue
+        waiter.wait()
+        # Loop back: the leader either cached the payload or failed, in
+        # which case one of the waiters becomes the next leader
+
+    try:
+        body, etag, found = _load(question_set_id)
+        # Unknown or empty sets aren't cached; questions may still be saved
+        if found:
+            _remember(key, body, etag)
+        return body, etag
+    except Exception:
+        _count("db_errors")
+        raise
+    finally:
+        with _lock:
+            _inflight.pop(key, None)
+        done.set()
+
+
+def prewarm():
+    """
+    Load payloads for sets whose test window is still open, soonest expiry
+    first, so a cohort starting together is served from memory. Only ETags
+    are read for the whole window; bodies are fetched for sets that are new
+    or whose stored payload changed. Sets without a stored payload are left
+    to get(), which builds them on first use.
+    Returns the number of payloads added or replaced.
+    """
+    with db_connection() as conn:
+        with conn.cursor() as cur:
+            cur.execute("""
+                SELECT qs.id, tp.etag
+                FROM question_set qs
+                JOIN test_payloads tp ON tp.question_set_id = qs.id
+                WHERE qs.expiry_time > NOW()
+                ORDER BY qs.expiry_time
+                LIMIT %s
+            """, (min(TEST_PAYLOAD_PREWARM_LIMIT, TEST_PAYLOAD_CACHE_SIZE),))
+            rows = cur.fetchall()
+
+            changed = []
+            now = time.monotonic()
+            with _lock:
+                for set_id, etag in rows:
+                    key = str(set_id)
+                    cached = _memory.get(key)
+                    if cached is not None and cached[1] == etag:
+                        # Just checked against the stored ETag
+                        _memory[key] = (cached[0], etag, now)
+                    else:
+                        changed.append(set_id)
+
+            if changed:
+                cur.execute("""
+                    SELECT question_set_id, body, etag FROM test_payloads
+                    WHERE question_set_id = ANY(%s)
+                """, (changed,))
+                fetched = cur.fetchall()
+            else:
+                fetched = []
+
+    for set_id, body, etag in fetched:
+        _remember(str(set_id), body, etag)
+    _count("prewarmed", len(fetched))
+    return len(fetched)
+
+
+def _prewarm_loop():
+    while not _prewarm_stop.is_set():
+        try:
+            prewarm()
+        except Exception as e:
+            print("🔥 test payload prewarm error:", e)
+        _prewarm_stop.wait(TEST_PAYLOAD_PREWARM_SECONDS)
+
+
+def start_prewarm():
+    """Refresh the in-process cache with open test windows in the background."""
+    global _prewarm_thread
+    if _prewarm_thread or TEST_PAYLOAD_PREWARM_SECONDS <= 0:
+        return
+    _prewarm_thread = threading.Thread(target=_prewarm_loop, name="test-payload-prewarm", daemon=True)
+    _prewarm_thread.start()
+
+
+def stop_prewarm(timeout=None):
+    _prewarm_stop.set()
+    if _prewarm_thread:
+        _prewarm_thread.join(timeout)
+
+
+def stats():
+    with _lock:
+        out = dict(_stats, memory_entries=len(_memory), memory_capacity=TEST_PAYLOAD_CACHE_SIZE)
+    lookups = out["memory_hits"] + out["db_hits"] + out["builds"]
+    out["memory_hit_rate"] = round(out["memory_hits"] / lookups, 4) if lookups else 0.0
+    return out
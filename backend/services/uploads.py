@@ -0,0 +1,291 @@
+import os
+import json
+import uuid
+import fcntl
+import base64
+import hashlib
+import binascii
+import threading
+import time
+from werkzeug.utils import secure_filename
+from config import (
+    db_connection,
+    UPLOAD_DIR,
+    UPLOAD_CHUNK_BYTES,
+    UPLOAD_MAX_CHUNK_BYTES,
+    UPLOAD_BUFFER_BYTES,
+    UPLOAD_MAX_BYTES,
+    UPLOAD_SESSION_TTL_HOURS,
+)
+from services import storage, media_jobs
+from services.attempts import append_qa
+
+KINDS = {"audio": "audio_url", "video": "video_url"}
+PARTIAL_DIR = os.path.join(UPLOAD_DIR, ".partial")
+
+# Abandoned uploads are swept at most this often per process
+_PURGE_EVERY_SECONDS = 3600
+_last_purge = 0.0
+_purge_lock = threading.Lock()
+
+
+class UploadConflict(Exception):
+    """The request doesn't fit the upload's current state; `received` says where it stands."""
+
+    def __init__(self, message, received=None):
+        super().__init__(message)
+        self.received = received
+
+
+def _part_path(upload_id):
+    return os.path.join(PARTIAL_DIR, f"{upload_id}.part")
+
+
+def parse_checksum(header):
+    """
+    Parse "sha256 <digest>" with the digest in hex or base64.
+    Returns the hex digest, or None when no checksum was sent.
+    """
+    if not header:
+        return None
+    algo, _, value = header.strip().partition(" ")
+    if algo.lower() != "sha256" or not value:
+        raise ValueError("Upload-Checksum must be 'sha256 <hex or base64 digest>'")
+    value = value.strip()
+    if len(value) == 64:
+        try:
+            bytes.fromhex(value)
+            return value.lower()
+        except ValueError:
+            pass
+    try:
+        digest = base64.b64decode(value, validate=True)
+    except binascii.Error:
+        raise ValueError("Upload-Checksum digest is neither hex nor base64")
+    if len(digest) != 32:
+        raise ValueError("Upload-Checksum digest has the wrong length for sha256")
+    return digest.hex()
+
+
+def _received(upload_id):
+    try:
+        return os.path.getsize(_part_path(upload_id))
+    except FileNotFoundError:
+        return None
+
+
+def _describe(row):
+    upload_id, kind, candidate_id, question_set_id, filename, total_size, status, url = row
+    received = total_size if status == "complete" else _received(upload_id)
+    return {
+        "upload_id": str(upload_id),
+        "kind": kind,
+        "candidate_id": str(candidate_id),
+        "question_set_id": str(question_set_id),
+        "filename": filename,
+        "size": total_size,
+        "received": received or 0,
+        "status": status,
+        "url": url,
+        "chunk_size": UPLOAD_CHUNK_BYTES,
+    }
+
+
+def get(upload_id):
+    """Return the upload's state, or None if it doesn't exist."""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            SELECT id, kind, candidate_id, question_set_id, filename, total_size, status, url
+            FROM upload_sessions WHERE id = %s
+        """, (uuid.UUID(str(upload_id)),))
+        row = cur.fetchone()
+    return _describe(row) if row else None
+
+
+def create(kind, candidate_id, question_set_id, filename, size=None, qa_data=None):
+    """Open a resumable upload and its empty partial file."""
+    if kind not in KINDS:
+        raise ValueError(f"kind must be one of {sorted(KINDS)}")
+    candidate_id = uuid.UUID(str(candidate_id))
+    question_set_id = uuid.UUID(str(question_set_id))
+    if size is not None:
+        size = int(size)
+        if size < 0 or size > UPLOAD_MAX_BYTES:
+            raise ValueError(f"size must be between 0 and {UPLOAD_MAX_BYTES} bytes")
+
+    _maybe_purge()
+    upload_id = uuid.uuid4()
+    filename = secure_filename(filename or "") or "recording.webm"
+
+    os.makedirs(PARTIAL_DIR, exist_ok=True)
+    open(_part_path(upload_id), "xb").close()
+
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            INSERT INTO upload_sessions (
+                id, kind, candidate_id, question_set_id, filename, total_size, qa_data
+            ) VALUES (%s, %s, %s, %s, %s, %s, %s)
+        """, (upload_id, kind, candidate_id, question_set_id, filename, size,
+              json.dumps(qa_data if qa_data is not None else [])))
+        conn.commit()
+
+    return {
+        "upload_id": str(upload_id),
+        "kind": kind,
+        "size": size,
+        "received": 0,
+        "status": "open",
+        "chunk_size": UPLOAD_CHUNK_BYTES,
+    }
+
+
+def _locked(f, received=None):
+    # Non-blocking so a duplicate in-flight PUT fails fast instead of parking a worker
+    try:
+        fcntl.flock(f.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+    except BlockingIOError:
+        raise UploadConflict("Another request is writing this upload", received)
+
+
+def write_chunk(upload_id, offset, stream, length, checksum=None):
+    """
+    Write `length` bytes from `stream` at `offset`, reading UPLOAD_BUFFER_BYTES
+    at a time. Bytes the upload already holds (a retried chunk) are checked
+    against the checksum but not rewritten, so PUTs are idempotent. A chunk
+    that is cut short or fails its checksum is rolled back.
+    Returns the number of bytes received so far.
+    """
+    info = get(upload_id)
+    if info is None:
+        raise LookupError("Upload not found")
+    if info["status"] != "open":
+        raise UploadConflict("Upload is already complete", info["received"])
+    if length is None or length < 0:
+        raise ValueError("Content-Length is required")
+    if length > UPLOAD_MAX_CHUNK_BYTES:
+        raise ValueError(f"Chunks are limited to {UPLOAD_MAX_CHUNK_BYTES} bytes")
+    size = info["size"]
+    limit = size if size is not None else UPLOAD_MAX_BYTES
+    if offset < 0 or offset + length > limit:
+        raise ValueError(f"Chunk at offset {offset} with {length} bytes exceeds the upload size {limit}")
+
+    try:
+        f = open(_part_path(upload_id), "r+b")
+    except FileNotFoundError:
+        raise LookupError("Upload data not found")
+    with f:
+        _locked(f, info["received"])
+        received = os.fstat(f.fileno()).st_size
+        if offset > received:
+            raise UploadConflict(f"Chunk offset {offset} is past the {received} bytes received", received)
+
+        skip = received - offset
+        digest = hashlib.sha256()
+        remaining = length
+        f.seek(received)
+        try:
+            while remaining:
+                buf = stream.read(min(UPLOAD_BUFFER_BYTES, remaining))
+                if not buf:
+                    raise ValueError(f"Chunk body ended {remaining} bytes short of Content-Length")
+                remaining -= len(buf)
+                digest.update(buf)
+                if skip >= len(buf):
+                    skip -= len(buf)
+                    continue
+                f.write(buf[skip:] if skip else buf)
+                skip = 0
+            if checksum and digest.hexdigest() != checksum:
+                raise ValueError("Chunk checksum mismatch")
+            f.flush()
+            os.fsync(f.fileno())
+        except Exception:
+            f.truncate(received)
+            raise
+        return max(received, offset + length)
+
+
+def complete(upload_id, checksum=None):
+    """
+    Move the finished upload into blob storage and record it on the attempt
+    (media URL, QA entries, recordings index). Safe to call again after
+    success or a crash: the partial file is only removed once that is
+    committed, and storing the same bytes twice is a no-op.
+    """
+    info = get(upload_id)
+    if info is None:
+        raise LookupError("Upload not found")
+    if info["status"] == "complete":
+        return info
+
+    part = _part_path(upload_id)
+    store = storage.get_store()
+    content_type = storage.guess_content_type(info["filename"], f"{info['kind']}/webm")
+    try:
+        f = open(part, "rb")
+    except FileNotFoundError:
+        # A concurrent complete may have just finished
+        info = get(upload_id)
+        if info["status"] == "complete":
+            return info
+        raise LookupError("Upload data not found")
+    with f:
+        _locked(f, info["received"])
+        received = os.fstat(f.fileno()).st_size
+        if info["size"] is not None and received != info["size"]:
+            raise UploadConflict(f"Upload incomplete: {received} of {info['size']} bytes", received)
+        blob = store.put_file(part, content_type, expected=checksum)
+
+        url = store.url(blob.digest)
+        with db_connection() as conn, conn.cursor() as cur:
+            cur.execute("""
+                UPDATE upload_sessions
+                SET status = 'complete', url = %s, total_size = %s, completed_at = NOW()
+                WHERE id = %s AND status = 'open'
+                RETURNING qa_data
+            """, (url, blob.size, uuid.UUID(str(upload_id))))
+            row = cur.fetchone()
+            # Only the request that flips the status records the attempt
+            if row is not None:
+                qa_data = row[0] if not isinstance(row[0], str) else json.loads(row[0])
+                append_qa(cur, info["candidate_id"], info["question_set_id"], info["kind"], qa_data,
+                          media_column=KINDS[info["kind"]], media_url=url)
+                storage.index(cur, blob, info["candidate_id"], info["question_set_id"],
+                              info["kind"], qa_data, info["filename"])
+                media_jobs.enqueue(cur, blob, info["kind"], info["candidate_id"], info["question_set_id"])
+            conn.commit()
+        os.remove(part)
+        media_jobs.notify_workers()
+
+    info.update(status="complete", url=url, size=blob.size, received=blob.size, digest=blob.digest)
+    return info
+
+
+def purge_stale():
+    """Delete partial files of uploads left open past UPLOAD_SESSION_TTL_HOURS."""
+    with db_connection() as conn, conn.cursor() as cur:
+        cur.execute("""
+            UPDATE upload_sessions SET status = 'expired'
+            WHERE status = 'open' AND created_at < NOW() - make_interval(hours => %s)
+            RETURNING id
+        """, (UPLOAD_SESSION_TTL_HOURS,))
+        expired = [r[0] for r in cur.fetchall()]
+        conn.commit()
+    for upload_id in expired:
+        try:
+            os.remove(_part_path(upload_id))
+        except FileNotFoundError:
+            pass
+    return len(expired)
+
+
+def _maybe_purge():
+    global _last_purge
+    with _purge_lock:
+        if time.monotonic() - _last_purge < _PURGE_EVERY_SECONDS:
+            return
+        _last_purge = time.monotonic()
+    try:
+        purge_stale()
+    except Exception as e:
+        print("🔥 upload purge error:", e)
@@ -0,0 +1,155 @@
+import time
+import uuid
+import atexit
+import threading
+from utils.bulk import bulk_insert
+from config import (
+    db_connection,
+    VIOLATIONS_WRITE_BEHIND,
+    VIOLATIONS_FLUSH_SECONDS,
+    VIOLATIONS_FLUSH_SIZE,
+)
+
+# (candidate_id, question_set_id) -> latest (tab_switches, inactivities, face_not_visible)
+_pending = {}
+_lock = threading.Lock()
+_flush_lock = threading.Lock()
+_wakeup = threading.Event()
+_stop = threading.Event()
+_flusher = None
+
+_stats = {
+    "reports": 0,
+    "coalesced": 0,
+    "flushes": 0,
+    "rows_flushed": 0,
+    "flush_errors": 0,
+    "last_batch_size": 0,
+    "max_batch_size": 0,
+    "last_flush_ms": 0.0,
+    "max_flush_ms": 0.0,
+    "total_flush_ms": 0.0,
+}
+
+# Counters only grow during an attempt, so GREATEST keeps a late flush
+# (e.g. from another worker process) from moving them backwards
+_ON_CONFLICT = """
+    ON CONFLICT (candidate_id, question_set_id)
+    DO UPDATE SET
+        tab_switches = GREATEST(COALESCE(test_attempts.tab_switches, 0), EXCLUDED.tab_switches),
+        inactivities = GREATEST(COALESCE(test_attempts.inactivities, 0), EXCLUDED.inactivities),
+        face_not_visible = GREATEST(COALESCE(test_attempts.face_not_visible, 0), EXCLUDED.face_not_visible)
+"""
+
+
+def upsert(cur, rows):
+    """Write (candidate_id, question_set_id, tab, inactivity, face) rows in one multi-row upsert."""
+    return bulk_insert(
+        cur,
+        "test_attempts",
+        ("candidate_id", "question_set_id", "tab_switches", "inactivities", "face_not_visible"),
+        rows,
+        on_conflict=_ON_CONFLICT,
+    )
+
+
+def record(candidate_id, question_set_id, tab_switches=0, inactivities=0, face_not_visible=0):
+    """
+    Accept one proctoring report. With write-behind on, only the latest
+    counters per attempt are kept until the next flush; otherwise they are
+    written immediately. Raises ValueError on malformed ids or counters.
+    """
+    key = (uuid.UUID(str(candidate_id)), uuid.UUID(str(question_set_id)))
+    counters = (int(tab_switches or 0), int(inactivities or 0), int(face_not_visible or 0))
+
+    if not VIOLATIONS_WRITE_BEHIND or _flusher is None or _stop.is_set():
+        with db_connection() as conn, conn.cursor() as cur:
+            upsert(cur, [key + counters])
+            conn.commit()
+        return
+
+    with _lock:
+        _stats["reports"] += 1
+        if key in _pending:
+            _stats["coalesced"] += 1
+        _pending[key] = counters
+        full = len(_pending) >= VIOLATIONS_FLUSH_SIZE
+    if full:
+        _wakeup.set()
+
+
+def flush():
+    """Write everything buffered so far. Returns the number of rows written."""
+    with _flush_lock:
+        with _lock:
+            if not _pending:
+                return 0
+            batch = dict(_pending)
+            _pending.clear()
+
+        started = time.perf_counter()
+        try:
+            with db_connection() as conn, conn.cursor() as cur:
+                upsert(cur, [key + counters for key, counters in batch.items()])
+                conn.commit()
+        except Exception:
+            # Put the batch back without clobbering newer reports
+            with _lock:
+                _stats["flush_errors"] += 1
+                for key, counters in batch.items():
+                    _pending.setdefault(key, counters)
+            raise
+
+        elapsed_ms = (time.perf_counter() - started) * 1000
+        with _lock:
+            _stats["flushes"] += 1
+            _stats["rows_flushed"] += len(batch)
+            _stats["last_batch_size"] = len(batch)
+            _stats["max_batch_size"] = max(_stats["max_batch_size"], len(batch))
+            _stats["last_flush_ms"] = round(elapsed_ms, 2)
+            _stats["max_flush_ms"] = round(max(_stats["max_flush_ms"], elapsed_ms), 2)
+            _stats["total_flush_ms"] += elapsed_ms
+        return len(batch)
+
+
+def _flush_loop():
+    while not _stop.is_set():
+        _wakeup.wait(VIOLATIONS_FLUSH_SECONDS)
+        _wakeup.clear()
+        try:
+            flush()
+        except Exception as e:
+            print("🔥 violations flush error:", e)
+
+
+def start_flusher():
+    """Start the background flusher once per process (no-op when write-behind is off)."""
+    global _flusher
+    if _flusher or not VIOLATIONS_WRITE_BEHIND:
+        return
+    _flusher = threading.Thread(target=_flush_loop, name="violations-flusher", daemon=True)
+    _flusher.start()
+    atexit.register(stop_flusher)
+
+
+def stop_flusher(timeout=10):
+    """Stop the flusher and write out whatever is still buffered."""
+    _stop.set()
+    _wakeup.set()
+    if _flusher:
+        _flusher.join(timeout)
+    try:
+        flush()
+    except Exception as e:
+        print("🔥 violations final flush failed:", e)
+
+
+def stats():
+    with _lock:
+        out = dict(_stats, pending=len(_pending), flush_size=VIOLATIONS_FLUSH_SIZE,
+                   flush_seconds=VIOLATIONS_FLUSH_SECONDS)
+    flushes = out["flushes"]
+    out["avg_batch_size"] = round(out["rows_flushed"] / flushes, 2) if flushes else 0.0
+    out["avg_flush_ms"] = round(out["total_flush_ms"] / flushes, 2) if flushes else 0.0
+    out["total_flush_ms"] = round(out["total_flush_ms"], 2)
+    return out
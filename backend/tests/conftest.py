@@ -0,0 +1,7 @@
+import os
+import sys
+
+# config.py refuses to import without OpenRouter settings; the fake ones
+# are enough for unit tests, which never reach the LLM or Postgres
+os.environ.setdefault("OPENROUTER_FAKE", "true")
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
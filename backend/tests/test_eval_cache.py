@@ -0,0 +1,21 @@
+from services.eval_cache import cache_key
+
+
+def _key(qtype, answer):
+    return cache_key(qtype, "Q", "A", answer, model="m")
+
+
+def test_text_answers_ignore_whitespace():
+    assert _key("audio", "a  b\n c") == _key("audio", "a b c")
+    assert _key("mcq", " Paris ") == _key("mcq", "paris")
+
+
+def test_code_keeps_indentation_and_line_breaks():
+    flat = "if x:\n    y()\nz()"
+    nested = "if x:\n    y()\n    z()"
+    assert _key("coding", flat) != _key("coding", nested)
+    assert _key("coding", "a = 1\nb = 2") != _key("coding", "a = 1 b = 2")
+
+
+def test_code_folds_line_endings_and_trailing_blanks():
+    assert _key("coding", "a = 1\r\nb = 2\r\n\n") == _key("coding", "a = 1\nb = 2")
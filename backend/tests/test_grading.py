@@ -0,0 +1,55 @@
+from services.grading import _choice_index, grade_mcq
+
+
+def _question(options, correct, negative=0.25):
+    return {"content": {"options": options, "correct_answer": correct}, "negative_marking": negative}
+
+
+def test_option_text_resolves_to_its_index():
+    assert _choice_index("Paris", ["London", "Paris", "Rome"]) == 1
+    assert _choice_index("  paris ", ["London", "Paris", "Rome"]) == 1
+
+
+def test_letter_is_a_label_only_when_no_option_matches():
+    assert _choice_index("C", ["x", "y", "z", "w"]) == 2
+    assert _choice_index("B", ["A", "C", "B", "D"]) == 2
+    assert _choice_index("E", ["x", "y", "z", "w"]) is None
+
+
+def test_digits_are_never_indexes():
+    assert _choice_index("3", ["1", "2", "3", "4"]) == 2
+    assert _choice_index("1", ["x", "y"]) is None
+    assert _choice_index(1, ["x", "y"]) is None
+
+
+def test_blank_answers():
+    assert _choice_index(None, ["x"]) is None
+    assert _choice_index("  ", ["x"]) is None
+    assert _choice_index(True, ["True", "False"]) is None
+
+
+def test_numeric_option_text_is_graded_correct():
+    result = grade_mcq({"candidate_answer": "3"}, _question(["1", "2", "3", "4"], "C"))
+    assert result["is_correct"] is True
+    assert result["score"] == 1.0
+
+
+def test_letter_option_text_is_graded_by_text():
+    question = _question(["B", "A", "D", "C"], "A")
+    assert grade_mcq({"candidate_answer": "A"}, question)["is_correct"] is True
+    assert grade_mcq({"candidate_answer": "B"}, question)["is_correct"] is False
+
+
+def test_wrong_answer_applies_negative_marking():
+    result = grade_mcq({"candidate_answer": "2"}, _question(["1", "2", "3", "4"], "C"))
+    assert result == {"score": -0.25, "is_correct": False, "feedback": "Incorrect", "correct_answer": "C"}
+
+
+def test_unstored_question_compares_text_with_client_answer():
+    response = {"candidate_answer": "42", "correct_answer": "42"}
+    assert grade_mcq(response, None)["is_correct"] is True
+
+
+def test_not_answered_and_no_key():
+    assert grade_mcq({"candidate_answer": ""}, _question(["x"], "A"))["feedback"] == "Not answered"
+    assert grade_mcq({"candidate_answer": "x"}, _question(["x"], None))["feedback"] == "No correct answer on record"
@@ -0,0 +1,90 @@
+import pytest
+
+from services.keywords import Matcher, alternatives, score_batch, stem, tokens
+
+
+def _score(keywords, text):
+    return score_batch([(keywords, text)])[0]
+
+
+@pytest.mark.parametrize("words", [
+    ("deployment", "deployments", "deployed", "deploying"),
+    ("test", "tests", "tested", "testing"),
+    ("database", "databases"),
+    ("query", "queries"),
+    ("process", "processes"),
+    ("class", "classes"),
+    ("run", "running"),
+])
+def test_word_forms_share_a_stem(words):
+    assert len({stem(w) for w in words}) == 1
+
+
+@pytest.mark.parametrize("word", ["status", "analysis", "class", "basis"])
+def test_singulars_ending_in_s_are_kept(word):
+    assert stem(word) == word
+
+
+@pytest.mark.parametrize("plural, singular", [
+    ("APIs", "API"), ("apis", "api"), ("GPUs", "GPU"), ("gpus", "gpu"), ("URLs", "URL"), ("KPIs", "KPI"),
+])
+def test_acronym_plurals_fold_to_the_singular(plural, singular):
+    assert tokens(plural) == tokens(singular)
+
+
+def test_acronym_plural_matches_keyword():
+    assert _score(["REST API"], "we built rest apis")["is_correct"] is True
+    assert _score(["REST API"], "We built REST APIs")["score"] == 10.0
+
+
+def test_matcher_finds_overlapping_token_patterns():
+    matcher = Matcher([("he",), ("she",), ("his",), ("hers",), ("a", "b", "c"), ("b", "c")])
+    assert matcher.scan("u s h e r s".split()) == set()
+    assert matcher.scan("x a b c".split()) == {4, 5}
+    assert matcher.scan("a b x b c".split()) == {5}
+    assert matcher.scan("she hers".split()) == {1, 3}
+    # A failed long match still reports the shorter patterns it contains
+    assert Matcher([("a", "b", "c", "d"), ("b", "c"), ("c",)]).scan("a b c x".split()) == {1, 2}
+
+
+def test_related_words_are_not_synonyms():
+    result = _score(["latency", "throughput", "caching"], "it was fast")
+    assert result["score"] == 0.0 and result["is_correct"] is False
+    assert _score(["bug"], "there was an issue")["score"] == 0.0
+    assert _score(["API"], "a clean interface")["score"] == 0.0
+
+
+def test_true_synonyms_and_abbreviations_match():
+    result = _score(["Kubernetes", "database", "trade-off"], "k8s in front of the db; the tradeoff was cost")
+    assert result["keywords"]["missing"] == []
+
+
+def test_one_phrase_counts_for_one_keyword():
+    # "db" could satisfy either keyword, but only once
+    result = _score(["database", "datastore"], "we used a db")
+    assert result["score"] == 5.0
+    # Exact mentions win, and a second phrase covers the other keyword
+    assert _score(["cache", "caching"], "a cache and memoization")["score"] == 10.0
+
+
+def test_alternatives_include_the_group():
+    assert alternatives("Kubernetes") == {("kubernet",), ("k8s",)}
+    assert alternatives("") == set()
+
+
+def test_score_fields_and_edge_cases():
+    result = _score(["design", "testing", "monitoring"], "I designed it and wrote tests")
+    assert result == {
+        "score": 6.7, "is_correct": True,
+        "feedback": "Mentioned 2 of 3 expected keywords; missing: monitoring",
+        "keywords": {"matched": ["design", "testing"], "missing": ["monitoring"]},
+        "preliminary": True,
+    }
+    assert _score([], "anything")["feedback"] == "No expected keywords on record"
+    empty = _score(["design"], "  ")
+    assert empty == {"score": None, "is_correct": False, "feedback": "Not evaluated", "pending": True}
+
+
+def test_batch_keeps_items_separate():
+    results = score_batch([(["cache"], "no caching here?"), (["cache"], "nothing"), (["db"], "cache")])
+    assert [r["score"] for r in results] == [10.0, 0.0, 0.0]
@@ -0,0 +1,104 @@
+import hashlib
+
+import pytest
+from flask import Flask
+
+from routes import media
+from services import storage
+
+BODY = bytes(range(256)) * 8
+
+
+@pytest.fixture
+def client(tmp_path, monkeypatch):
+    monkeypatch.setattr(media, "UPLOAD_DIR", str(tmp_path))
+    monkeypatch.setattr(media, "MEDIA_OFFLOAD", "")
+    (tmp_path / "legacy.webm").write_bytes(BODY)
+    app = Flask(__name__)
+    app.register_blueprint(media.media_bp)
+    return app.test_client()
+
+
+@pytest.fixture
+def blob(tmp_path, monkeypatch):
+    store = storage.LocalStore(str(tmp_path / "blobs"))
+    monkeypatch.setattr(storage, "get_store", lambda: store)
+    monkeypatch.setattr(storage, "content_type", lambda digest: "video/webm")
+    digest = hashlib.sha256(BODY).hexdigest()
+    with open(tmp_path / "body", "wb") as f:
+        f.write(BODY)
+    store.put_file(str(tmp_path / "body"), "video/webm")
+    return f"/recordings/blobs/{storage.shard_key(digest)}"
+
+
+def _get(client, path="/recordings/legacy.webm", **headers):
+    return client.get(path, headers=headers)
+
+
+def test_full_body_advertises_ranges(client):
+    response = _get(client)
+    assert response.status_code == 200
+    assert response.data == BODY
+    assert response.headers["Accept-Ranges"] == "bytes"
+    assert response.content_length == len(BODY)
+
+
+@pytest.mark.parametrize("header, start, stop", [
+    ("bytes=0-99", 0, 100),
+    ("bytes=100-", 100, len(BODY)),
+    ("bytes=-100", len(BODY) - 100, len(BODY)),
+    ("bytes=2000-999999", 2000, len(BODY)),
+])
+def test_single_ranges(client, header, start, stop):
+    response = _get(client, Range=header)
+    assert response.status_code == 206
+    assert response.data == BODY[start:stop]
+    assert response.headers["Content-Range"] == f"bytes {start}-{stop - 1}/{len(BODY)}"
+    assert response.content_length == stop - start
+
+
+def test_unsatisfiable_range(client):
+    response = _get(client, Range=f"bytes={len(BODY)}-")
+    assert response.status_code == 416
+    assert response.headers["Content-Range"] == f"bytes */{len(BODY)}"
+
+
+def test_multi_range_falls_back_to_full_body(client):
+    response = _get(client, Range="bytes=0-9,20-29")
+    assert response.status_code == 200
+    assert response.data == BODY
+
+
+def test_etag_revalidation_and_stale_if_range(client):
+    etag = _get(client).headers["ETag"]
+    assert _get(client, **{"If-None-Match": etag}).status_code == 304
+    # If-Range with a different validator: the whole (changed) file is sent
+    response = _get(client, Range="bytes=0-9", **{"If-Range": '"other"'})
+    assert response.status_code == 200
+    assert response.data == BODY
+
+
+def test_head_sends_headers_only(client):
+    response = client.head("/recordings/legacy.webm", headers={"Range": "bytes=0-9"})
+    assert response.status_code == 206
+    assert response.content_length == 10
+    assert response.data == b""
+
+
+@pytest.mark.parametrize("path", [
+    "/recordings/missing.webm",
+    "/recordings/.partial/x.part",
+    "/recordings/blobs/ab/cd/not-a-digest",
+    "/recordings/blobs/00/00/" + hashlib.sha256(BODY).hexdigest(),
+])
+def test_unknown_or_hidden_paths_are_404(client, blob, path):
+    assert _get(client, path).status_code == 404
+
+
+def test_blob_is_immutable_and_ranged(client, blob):
+    response = _get(client, blob, Range="bytes=-10")
+    assert response.status_code == 206
+    assert response.data == BODY[-10:]
+    assert response.headers["ETag"] == f'"{hashlib.sha256(BODY).hexdigest()}"'
+    assert "immutable" in response.headers["Cache-Control"]
+    assert response.mimetype == "video/webm"
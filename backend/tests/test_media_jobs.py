@@ -0,0 +1,123 @@
+import io
+import sys
+import array
+
+import pytest
+
+from services import media_jobs
+from services.media_jobs import Context, ProbeProcessor, WaveformProcessor
+
+FFMPEG_STDERR = b"""Input #0, matroska,webm, from 'source':
+  Duration: N/A, start: 0.000000, bitrate: N/A
+  Stream #0:0(eng): Video: vp8, yuv420p(progressive), 1280x720, SAR 1:1 DAR 16:9, 30 fps
+  Stream #0:1(eng): Audio: opus, 48000 Hz, mono, fltp (default)
+Output #0, null, to 'pipe:':
+  Stream #0:0(eng): Video: vp8, yuv420p(progressive), 1280x720
+  Stream #0:1(eng): Audio: opus, 48000 Hz, mono
+frame=  10 fps=0.0 q=-1.0 size=N/A time=00:00:01.50 bitrate=N/A speed= 300x
+frame=  95 fps=0.0 q=-1.0 Lsize=N/A time=00:01:02.25 bitrate=N/A speed= 310x
+"""
+
+
+def _pcm(samples):
+    data = array.array("h", samples)
+    if sys.byteorder == "big":
+        data.byteswap()
+    return io.BytesIO(data.tobytes())
+
+
+def test_ffmpeg_only_probe_reads_input_streams_and_last_time(monkeypatch):
+    monkeypatch.setattr(media_jobs, "_run", lambda cmd: type("P", (), {"stderr": FFMPEG_STDERR})())
+    probe = ProbeProcessor()._ffmpeg_only("source")
+    assert probe["duration"] == 62.25
+    assert probe["streams"] == [
+        {"type": "video", "codec": "vp8", "width": 1280, "height": 720},
+        {"type": "audio", "codec": "opus", "width": None, "height": None},
+    ]
+
+
+def test_waveform_peaks_per_window():
+    processor = WaveformProcessor()
+    window = processor.window
+    samples = [0] * window + [16384] * window + [-32768] + [0] * (window - 1) + [8192] * 10
+    peaks = processor._peaks(_pcm(samples))
+    assert peaks == [0.0, 0.5, 1.0, 0.25]
+
+
+def test_waveform_of_silence_or_nothing():
+    processor = WaveformProcessor()
+    assert processor._peaks(io.BytesIO(b"")) == []
+    assert processor._peaks(_pcm([0] * processor.window * 3)) == [0.0, 0.0, 0.0]
+
+
+def test_has_stream_uses_probe_results():
+    ctx = Context("d", "video", "p", "w")
+    assert ctx.has_stream("video") is None
+    ctx.results["probe"] = {"streams": [{"type": "audio"}]}
+    assert ctx.has_stream("audio") is True
+    assert ctx.has_stream("video") is False
+
+
+@pytest.mark.parametrize("setting, names", [
+    ("probe,thumbnail,waveform", ["probe", "thumbnail", "waveform"]),
+    (" waveform , unknown,,probe", ["waveform", "probe"]),
+    ("", []),
+])
+def test_pipeline_follows_media_processors(monkeypatch, setting, names):
+    monkeypatch.setattr(media_jobs, "MEDIA_PROCESSORS", setting)
+    assert [p.name for p in media_jobs.pipeline()] == names
+
+
+def test_processors_apply_by_kind():
+    thumbnail = media_jobs.PROCESSORS["thumbnail"]
+    assert thumbnail.applies(Context("d", "video", "p", "w"))
+    assert not thumbnail.applies(Context("d", "audio", "p", "w"))
+
+
+class _Cursor:
+    def __init__(self, rowcount):
+        self.rowcount = rowcount
+        self.sql = []
+
+    def __enter__(self):
+        return self
+
+    def __exit__(self, *exc):
+        return False
+
+    def execute(self, sql, args=None):
+        self.sql.append(" ".join(sql.split()))
+
+
+class _Conn:
+    def __init__(self, rowcount):
+        self.cur = _Cursor(rowcount)
+        self.committed = self.rolled_back = False
+
+    def cursor(self):
+        return self.cur
+
+    def commit(self):
+        self.committed = True
+
+    def rollback(self):
+        self.rolled_back = True
+
+
+def test_finish_writes_nothing_for_a_reclaimed_job(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(media_jobs.storage, "record_blob", lambda cur, blob: recorded.append(blob))
+    conn = _Conn(rowcount=0)
+    assert media_jobs._finish(conn, ("d1", "audio", 1), {"skipped": []}, ["artifact"]) is False
+    assert conn.rolled_back and not conn.committed
+    assert recorded == [] and len(conn.cur.sql) == 1
+    assert "attempts = %s" in conn.cur.sql[0]
+
+
+def test_finish_stores_results_for_the_current_claim(monkeypatch):
+    recorded = []
+    monkeypatch.setattr(media_jobs.storage, "record_blob", lambda cur, blob: recorded.append(blob))
+    conn = _Conn(rowcount=1)
+    assert media_jobs._finish(conn, ("d1", "audio", 2), {"skipped": []}, ["artifact"]) is True
+    assert conn.committed and recorded == ["artifact"]
+    assert any("audio_media" in sql for sql in conn.cur.sql)
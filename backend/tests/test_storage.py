@@ -0,0 +1,63 @@
+import io
+import os
+import hashlib
+
+import pytest
+
+from services.storage import LocalStore, shard_key
+
+
+@pytest.fixture
+def store(tmp_path):
+    return LocalStore(str(tmp_path / "blobs"))
+
+
+def _sha(data):
+    return hashlib.sha256(data).hexdigest()
+
+
+def test_shard_key_layout_and_validation():
+    digest = _sha(b"x")
+    assert shard_key(digest) == f"{digest[:2]}/{digest[2:4]}/{digest}"
+    for bad in ("abc", "g" * 64, digest.upper()):
+        with pytest.raises(ValueError):
+            shard_key(bad)
+
+
+def test_identical_bytes_are_stored_once(store):
+    first = store.put_stream(io.BytesIO(b"recording"), "audio/webm")
+    second = store.put_stream(io.BytesIO(b"recording"), "audio/webm")
+    assert first.digest == second.digest == _sha(b"recording")
+    assert (first.created, second.created) == (True, False)
+    with store.open(first.digest) as f:
+        assert f.read() == b"recording"
+    assert os.listdir(store.tmp) == []
+
+
+def test_checksum_mismatch_stores_nothing(store):
+    with pytest.raises(ValueError):
+        store.put_stream(io.BytesIO(b"recording"), "audio/webm", expected=_sha(b"other"))
+    assert not store.exists(_sha(b"recording"))
+
+
+def test_put_file_dedupes_against_put_stream(store, tmp_path):
+    part = tmp_path / "upload.part"
+    part.write_bytes(b"same bytes")
+    store.put_stream(io.BytesIO(b"same bytes"), "video/webm")
+    blob = store.put_file(str(part), "video/webm", expected=_sha(b"same bytes"))
+    assert blob.created is False
+    assert part.exists()
+
+
+def test_published_blob_does_not_share_the_source_file(store, tmp_path):
+    part = tmp_path / "upload.part"
+    part.write_bytes(b"chunk one")
+    blob = store.put_file(str(part), "video/webm")
+    assert blob.created is True
+    assert os.stat(store.path(blob.digest)).st_ino != os.stat(part).st_ino
+
+    # A later write to the still-open upload must not reach the blob
+    with open(part, "ab") as f:
+        f.write(b" and more")
+    with store.open(blob.digest) as f:
+        assert f.read() == b"chunk one"
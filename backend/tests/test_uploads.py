@@ -0,0 +1,96 @@
+import io
+import base64
+import hashlib
+
+import pytest
+
+from services import uploads
+from services.uploads import UploadConflict, parse_checksum, write_chunk
+
+UPLOAD_ID = "5b0f3c3e-7d6b-4a53-9a55-3f0b1f0c2a11"
+DATA = bytes(range(256)) * 4
+
+
+@pytest.fixture
+def upload(tmp_path, monkeypatch):
+    """An open upload of len(DATA) bytes with its partial file under tmp_path."""
+    state = {"status": "open", "size": len(DATA)}
+    monkeypatch.setattr(uploads, "PARTIAL_DIR", str(tmp_path))
+    monkeypatch.setattr(uploads, "get", lambda upload_id: {
+        "status": state["status"], "size": state["size"],
+        "received": uploads._received(upload_id) or 0,
+    })
+    open(uploads._part_path(UPLOAD_ID), "xb").close()
+    return state
+
+
+def _put(offset, data, checksum=None, length=None):
+    length = len(data) if length is None else length
+    return write_chunk(UPLOAD_ID, offset, io.BytesIO(data), length, checksum)
+
+
+def _part():
+    with open(uploads._part_path(UPLOAD_ID), "rb") as f:
+        return f.read()
+
+
+def test_chunks_append_in_order(upload):
+    assert _put(0, DATA[:300]) == 300
+    assert _put(300, DATA[300:]) == len(DATA)
+    assert _part() == DATA
+
+
+def test_resent_chunk_is_idempotent(upload):
+    _put(0, DATA[:300])
+    # The client never saw the response and retries the same chunk
+    assert _put(0, DATA[:300]) == 300
+    # An overlapping resume only writes the new tail
+    assert _put(200, DATA[200:500]) == 500
+    assert _part() == DATA[:500]
+
+
+def test_gap_is_a_conflict_reporting_the_offset(upload):
+    _put(0, DATA[:100])
+    with pytest.raises(UploadConflict) as exc:
+        _put(200, DATA[200:300])
+    assert exc.value.received == 100
+    assert _part() == DATA[:100]
+
+
+def test_checksum_mismatch_rolls_back(upload):
+    _put(0, DATA[:100])
+    with pytest.raises(ValueError):
+        _put(100, DATA[100:200], checksum=hashlib.sha256(b"other").hexdigest())
+    assert _part() == DATA[:100]
+    assert _put(100, DATA[100:200], checksum=hashlib.sha256(DATA[100:200]).hexdigest()) == 200
+
+
+def test_short_body_rolls_back(upload):
+    with pytest.raises(ValueError):
+        _put(0, DATA[:50], length=100)
+    assert _part() == b""
+
+
+def test_chunk_past_declared_size_is_rejected(upload):
+    with pytest.raises(ValueError):
+        _put(len(DATA) - 10, DATA[:20])
+    assert _part() == b""
+
+
+def test_completed_upload_rejects_chunks(upload):
+    upload["status"] = "complete"
+    with pytest.raises(UploadConflict):
+        _put(0, DATA[:10])
+
+
+def test_parse_checksum_accepts_hex_and_base64():
+    digest = hashlib.sha256(b"abc").digest()
+    assert parse_checksum(None) is None
+    assert parse_checksum(f"sha256 {digest.hex().upper()}") == digest.hex()
+    assert parse_checksum(f"SHA256 {base64.b64encode(digest).decode()}") == digest.hex()
+
+
+@pytest.mark.parametrize("header", ["md5 abc", "sha256", "sha256 !!!", "sha256 " + base64.b64encode(b"short").decode()])
+def test_parse_checksum_rejects_malformed_headers(header):
+    with pytest.raises(ValueError):
+        parse_checksum(header)
@@ -0,0 +1,22 @@
+from psycopg2.extras import execute_values
+from config import BULK_INSERT_PAGE_SIZE
+
+
+def bulk_insert(cur, table, columns, rows, template=None, page_size=None, on_conflict=""):
+    """
+    Insert many rows with multi-row VALUES statements instead of one
+    INSERT per row. Up to `page_size` rows go in each round trip.
+    `on_conflict` is appended verbatim, e.g. an ON CONFLICT ... DO UPDATE
+    clause for upserts. Returns the number of rows sent.
+    """
+    rows = list(rows)
+    if not rows:
+        return 0
+    execute_values(
+        cur,
+        f"INSERT INTO {table} ({', '.join(columns)}) VALUES %s {on_conflict}",
+        rows,
+        template=template,
+        page_size=page_size or BULK_INSERT_PAGE_SIZE,
+    )
+    return len(rows)
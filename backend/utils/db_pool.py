@@ -0,0 +1,210 @@
+import time
+import threading
+from collections import deque
+from contextlib import contextmanager
+import psycopg2
+import psycopg2.extensions
+
+
+class PoolTimeout(Exception):
+    """Raised when no connection frees up within the checkout timeout."""
+
+
+class ConnectionPool:
+    """
+    Thread-safe psycopg2 connection pool with min/max sizing, blocking
+    checkout with a timeout, liveness checks on checkout and usage gauges.
+    """
+
+    def __init__(self, dsn, minconn=1, maxconn=10, timeout=10.0, check_after=30.0):
+        self.dsn = dsn
+        self.minconn = minconn
+        self.maxconn = maxconn
+        self.timeout = timeout
+        self.check_after = check_after
+
+        self._cond = threading.Condition()
+        self._idle = deque()          # (conn, returned_at)
+        self._size = 0                # open connections, idle + in use
+        self._in_use = 0
+        self._waiting = 0
+        self._stats = {
+            "checkouts": 0,
+            "timeouts": 0,
+            "discarded": 0,
+            "created": 0,
+            "wait_seconds_total": 0.0,
+            "wait_seconds_max": 0.0,
+        }
+        self._closed = False
+        self._prefilled = False
+
+    def _connect(self):
+        conn = psycopg2.connect(self.dsn)
+        with self._cond:
+            self._stats["created"] += 1
+        return conn
+
+    def _prefill(self):
+        # Lazily open minconn connections on first use so importing the app
+        # never needs a reachable database
+        with self._cond:
+            if self._prefilled:
+                return
+            self._prefilled = True
+            missing = max(0, self.minconn - self._size)
+            self._size += missing
+        for _ in range(missing):
+            try:
+                conn = self._connect()
+            except Exception:
+                with self._cond:
+                    self._size -= 1
+                    self._cond.notify()
+                raise
+            with self._cond:
+                self._idle.append((conn, time.monotonic()))
+                self._cond.notify()
+
+    def _alive(self, conn, returned_at):
+        if conn.closed:
+            return False
+        if time.monotonic() - returned_at < self.check_after:
+            return True
+        try:
+            with conn.cursor() as cur:
+                cur.execute("SELECT 1")
+            conn.rollback()
+            return True
+        except Exception:
+            return False
+
+    def _discard(self, conn):
+        try:
+            conn.close()
+        except Exception:
+            pass
+        with self._cond:
+            self._size -= 1
+            self._stats["discarded"] += 1
+            self._cond.notify()
+
+    def getconn(self, timeout=None):
+        if self._closed:
+            raise PoolTimeout("connection pool is closed")
+        self._prefill()
+        timeout = self.timeout if timeout is None else timeout
+        started = time.monotonic()
+        deadline = started + timeout
+
+        while True:
+            with self._cond:
+                if not self._idle and self._size >= self.maxconn:
+                    self._waiting += 1
+                    try:
+                        while not self._idle and self._size >= self.maxconn:
+                            remaining = deadline - time.monotonic()
+                            if remaining <= 0:
+                                self._stats["timeouts"] += 1
+                                raise PoolTimeout(
+                                    f"no database connection available within {timeout}s "
+                                    f"(pool max {self.maxconn})"
+                                )
+                            self._cond.wait(remaining)
+                    finally:
+                        self._waiting -= 1
+
+                if self._idle:
+                    conn, returned_at = self._idle.pop()
+                    fresh = False
+                else:
+                    conn, returned_at = None, None
+                    self._size += 1
+                    fresh = True
+                self._in_use += 1
+
+            if fresh:
+                try:
+                    conn = self._connect()
+                except Exception:
+                    with self._cond:
+                        self._size -= 1
+                        self._in_use -= 1
+                        self._cond.notify()
+                    raise
+            elif not self._alive(conn, returned_at):
+                with self._cond:
+                    self._in_use -= 1
+                self._discard(conn)
+                continue
+
+            waited = time.monotonic() - started
+            with self._cond:
+                self._stats["checkouts"] += 1
+                self._stats["wait_seconds_total"] += waited
+                self._stats["wait_seconds_max"] = max(self._stats["wait_seconds_max"], waited)
+            return conn
+
+    def putconn(self, conn):
+        """Return a connection, rolling back any open transaction first."""
+        with self._cond:
+            self._in_use -= 1
+
+        broken = conn.closed or self._closed
+        if not broken:
+            try:
+                status = conn.get_transaction_status()
+                if status == psycopg2.extensions.TRANSACTION_STATUS_UNKNOWN:
+                    broken = True
+                elif status != psycopg2.extensions.TRANSACTION_STATUS_IDLE:
+                    conn.rollback()
+            except Exception:
+                broken = True
+
+        if broken:
+            self._discard(conn)
+            return
+
+        with self._cond:
+            self._idle.append((conn, time.monotonic()))
+            self._cond.notify()
+
+    @contextmanager
+    def connection(self):
+        conn = self.getconn()
+        try:
+            yield conn
+        except Exception:
+            if not conn.closed:
+                try:
+                    conn.rollback()
+                except Exception:
+                    pass
+            raise
+        finally:
+            self.putconn(conn)
+
+    def closeall(self):
+        with self._cond:
+            self._closed = True
+            idle = list(self._idle)
+            self._idle.clear()
+        for conn, _ in idle:
+            self._discard(conn)
+
+    def stats(self):
+        with self._cond:
+            out = dict(self._stats)
+            out.update({
+                "size": self._size,
+                "in_use": self._in_use,
+                "idle": len(self._idle),
+                "waiting": self._waiting,
+                "min": self.minconn,
+                "max": self.maxconn,
+            })
+        checkouts = out["checkouts"]
+        out["wait_seconds_avg"] = round(out["wait_seconds_total"] / checkouts, 6) if checkouts else 0.0
+        out["wait_seconds_total"] = round(out["wait_seconds_total"], 6)
+        out["wait_seconds_max"] = round(out["wait_seconds_max"], 6)
+        return out
@@ -0,0 +1,144 @@
+"""
+Versioned schema migrations.
+
+Migrations are the numbered .sql files in backend/migrations, applied in
+order and recorded in schema_migrations. A file whose first line is
+"-- migrate: no-transaction" runs statement by statement in autocommit mode
+(needed for CREATE INDEX CONCURRENTLY); every other file runs in a single
+transaction together with its bookkeeping row.
+
+    python -m utils.migrate            # apply pending migrations
+    python -m utils.migrate status     # list applied / pending versions
+
+The app also applies pending migrations at start unless MIGRATE_ON_START=false.
+"""
+import os
+import re
+import sys
+import argparse
+
+sys.path.insert(0, os.path.dirname(os.path.dirname(os.path.abspath(__file__))))
+
+from config import get_db_connection  # noqa: E402
+
+MIGRATIONS_DIR = os.path.join(os.path.dirname(os.path.dirname(os.path.abspath(__file__))), "migrations")
+
+_FILE_RE = re.compile(r"^(\d{4})_(\w+)\.sql$")
+_NO_TRANSACTION = "-- migrate: no-transaction"
+# Serializes migration runs across processes starting at the same time
+_LOCK_KEY = 7_421_001
+
+
+def discover():
+    """Return [(version, name, path)] for every migration file, in order."""
+    found = []
+    for filename in os.listdir(MIGRATIONS_DIR):
+        match = _FILE_RE.match(filename)
+        if match:
+            found.append((int(match.group(1)), match.group(2), os.path.join(MIGRATIONS_DIR, filename)))
+    found.sort()
+    versions = [v for v, _, _ in found]
+    if len(versions) != len(set(versions)):
+        raise RuntimeError("Duplicate migration version in " + MIGRATIONS_DIR)
+    return found
+
+
+def _statements(sql):
+    # Migration files are ours: statements end with ";" at end of line
+    return [s.strip() for s in re.split(r";\s*$", sql, flags=re.MULTILINE) if s.strip()
+            and not all(line.strip().startswith("--") for line in s.strip().splitlines())]
+
+
+def _applied(cur):
+    cur.execute("""
+        CREATE TABLE IF NOT EXISTS schema_migrations (
+            version INTEGER PRIMARY KEY,
+            name TEXT NOT NULL,
+            applied_at TIMESTAMPTZ NOT NULL DEFAULT NOW()
+        )
+    """)
+    cur.execute("SELECT version FROM schema_migrations")
+    return {r[0] for r in cur.fetchall()}
+
+
+def _apply(conn, version, name, path):
+    with open(path) as f:
+        sql = f.read()
+
+    if sql.lstrip().startswith(_NO_TRANSACTION):
+        conn.autocommit = True
+        try:
+            with conn.cursor() as cur:
+                for statement in _statements(sql):
+                    cur.execute(statement)
+                cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+        finally:
+            conn.autocommit = False
+        return
+
+    with conn.cursor() as cur:
+        cur.execute(sql)
+        cur.execute("INSERT INTO schema_migrations (version, name) VALUES (%s, %s)", (version, name))
+    conn.commit()
+
+
+def migrate():
+    """Apply pending migrations. Returns the list of versions applied."""
+    conn = get_db_connection()
+    conn.autocommit = True
+    try:
+        with conn.cursor() as cur:
+            cur.execute("SELECT pg_advisory_lock(%s)", (_LOCK_KEY,))
+        try:
+            with conn.cursor() as cur:
+                applied = _applied(cur)
+            conn.autocommit = False
+
+            done = []
+            for version, name, path in discover():
+                if version in applied:
+                    continue
+                print(f"Applying migration {version:04d}_{name}...")
+                try:
+                    _apply(conn, version, name, path)
+                except Exception:
+                    conn.rollback()
+                    raise
+                done.append(version)
+            return done
+        finally:
+            conn.autocommit = True
+            with conn.cursor() as cur:
+                cur.execute("SELECT pg_advisory_unlock(%s)", (_LOCK_KEY,))
+    finally:
+        conn.close()
+
+
+def status():
+    """Return [(version, name, applied)] for every migration file."""
+    conn = get_db_connection()
+    try:
+        with conn.cursor() as cur:
+            applied = _applied(cur)
+        conn.commit()
+    finally:
+        conn.close()
+    return [(version, name, version in applied) for version, name, _ in discover()]
+
+
+def main():
+    parser = argparse.ArgumentParser(description=__doc__, formatter_class=argparse.RawDescriptionHelpFormatter)
+    parser.add_argument("command", nargs="?", default="up", choices=["up", "status"])
+    args = parser.parse_args()
+
+    if args.command == "status":
+        for version, name, applied in status():
+            print(f"{version:04d}_{name}  {'applied' if applied else 'pending'}")
+        return
+
+    done = migrate()
+    print(f"Applied {len(done)} migration(s)" if done else "Schema is up to date")
+
+
+if __name__ == "__main__":
+    main()
@@ -2,3 +2,18 @@ def validate_skill(skill):
     if "name" not in skill or "counts" not in skill:
         return False
     return True
+
+
+QUESTION_FIELDS = ("type", "skill", "difficulty", "content")
+
+
+def question_error(i, q):
+    """Return why question number i can't be stored, or None if it's valid."""
+    if not isinstance(q, dict):
+        return f"Question {i} must be an object, got {type(q).__name__}"
+    missing = [field for field in QUESTION_FIELDS if field not in q]
+    if missing:
+        return f"Question {i} missing required fields: {missing}"
+    if not isinstance(q["content"], dict):
+        return f"Question {i} content must be a dictionary, got {type(q['content'])}"
+    return None
@@ -0,0 +1,5 @@
+# WSGI entry point for production servers: gunicorn -c gunicorn.conf.py wsgi:app
+# Background tasks are started per worker by gunicorn.conf.py's post_fork hook.
+from app import create_app
+
+app = create_app(start_background=False)
@@ -30,6 +30,64 @@ class AssessmentAPI {
     }
   }
 
+  /**
+   * Generate test questions as a stream (NDJSON), reporting each question as it is ready
+   * @param {Object} payload - Skills configuration
+   * @param {Function} onEvent - Called with every stream event (start, question, progress, summary, error)
+   * @returns {Promise<Object>} Questions in payload order plus the final summary
+   */
+  static async generateTestStream(payload, onEvent = () => {}) {
+    try {
+      const response = await fetch(`${API_BASE_URL}/generate-test?stream=ndjson`, {
+        method: 'POST',
+        headers: {
+          'Content-Type': 'application/json',
+          'Accept': 'application/x-ndjson',
+        },
+        body: JSON.stringify(payload),
+      });
+
+      if (!response.ok) {
+        const error = await response.json();
+        throw new Error(error.message || error.error || 'Failed to generate test');
+      }
+
+      const reader = response.body.getReader();
+      const decoder = new TextDecoder();
+      const questions = [];
+      let summary = null;
+      let buffer = '';
+
+      const handleLine = (line) => {
+        if (!line.trim()) return;
+        const event = JSON.parse(line);
+        if (event.event === 'question') questions[event.index] = event.question;
+        if (event.event === 'summary') summary = event;
+        if (event.event === 'error') throw new Error(event.message || 'Failed to generate test');
+        onEvent(event);
+      };
+
+      while (true) {
+        const { done, value } = await reader.read();
+        if (done) break;
+        buffer += decoder.decode(value, { stream: true });
+        const lines = buffer.split('\n');
+        buffer = lines.pop();
+        lines.forEach(handleLine);
+      }
+      handleLine(buffer);
+
+      return {
+        status: summary?.status || 'error',
+        questions: questions.filter(Boolean),
+        summary,
+      };
+    } catch (error) {
+      console.error('Error generating test:', error);
+      throw error;
+    }
+  }
+
   /**
    * Finalize and save test to database
    * @param {Object} payload - Complete test data with questions
@@ -36,6 +36,29 @@ export const testApi = {
       console.error('Error submitting section:', error);
       throw error;
     }
+  },
+
+  // Fetch the status of a section queued for background evaluation
+  getEvaluation: async (jobId) => {
+    try {
+      const response = await fetch(`${BASE_URL}/test/evaluation/${jobId}`);
+      if (!response.ok) throw new Error('Failed to fetch evaluation status');
+      return await response.json();
+    } catch (error) {
+      console.error('Error fetching evaluation:', error);
+      throw error;
+    }
+  },
+
+  // Poll a queued evaluation until it is done or failed (or we give up)
+  waitForEvaluation: async (jobId, intervalMs = 2000, timeoutMs = 5 * 60 * 1000) => {
+    const deadline = Date.now() + timeoutMs;
+    for (;;) {
+      const job = await testApi.getEvaluation(jobId);
+      if (job.status === 'done' || job.status === 'failed') return job;
+      if (Date.now() > deadline) throw new Error('Evaluation is taking longer than expected');
+      await new Promise((resolve) => setTimeout(resolve, intervalMs));
+    }
   }
 };
 
@@ -27,6 +27,7 @@ function GenerateAssessment() {
 
   const [questions, setQuestions] = useState([]);
   const [loading, setLoading] = useState(false);
+  const [generationProgress, setGenerationProgress] = useState(null);
   const [error, setError] = useState(null);
 
   const handleNext = async () => {
@@ -65,7 +66,10 @@ function GenerateAssessment() {
       
       console.log('Generating questions with payload:', payload);
 
-      const response = await AssessmentAPI.generateTest(payload);
+      const response = await AssessmentAPI.generateTestStream(payload, (event) => {
+        if (event.event === 'start') setGenerationProgress({ completed: 0, total: event.total });
+        if (event.event === 'progress') setGenerationProgress({ completed: event.completed, total: event.total });
+      });
 
       if (response && response.status === 'success' && response.questions) {
         const transformedQuestions = AssessmentAPI.transformToFrontendQuestions(response.questions);
@@ -80,6 +84,7 @@ function GenerateAssessment() {
       setError(err.message || 'Failed to generate questions. Please try again.');
     } finally {
       setLoading(false);
+      setGenerationProgress(null);
     }
   };
 
@@ -190,7 +195,11 @@ function GenerateAssessment() {
           <div className="bg-white p-6 rounded-lg shadow-xl flex items-center space-x-3">
             <div className="animate-spin rounded-full h-8 w-8 border-b-2 border-blue-500"></div>
             <p className="text-gray-700 font-medium">
-              {currentStep === 1 ? 'Generating questions...' : 'Finalizing test...'}
+              {currentStep === 1
+                ? (generationProgress
+                    ? `Generating questions... ${generationProgress.completed}/${generationProgress.total}`
+                    : 'Generating questions...')
+                : 'Finalizing test...'}
             </p>
           </div>
         </div>
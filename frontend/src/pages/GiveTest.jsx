@@ -231,6 +231,23 @@ const GiveTest = ({ jdId }) => {
     toast.success('Test submitted successfully!');
   };
 
+  // Replace a queued section's placeholder with its evaluations once the job finishes
+  const pollEvaluation = async (sectionIdx, jobId) => {
+    let result;
+    try {
+      const job = await testApi.waitForEvaluation(jobId);
+      result = job.status === 'done'
+        ? { message: 'Section evaluated', evaluations: job.responses }
+        : { message: 'Evaluation failed. Your answers were saved and will be reviewed.' };
+    } catch (err) {
+      console.error('Evaluation polling error:', err);
+      result = { message: 'Your answers were saved; evaluation is still in progress.' };
+    }
+    setSubmissionResults(prev =>
+      prev.map((s, i) => (i === sectionIdx ? { ...s, result, pending: false } : s))
+    );
+  };
+
   // Submit all sections
   const handleSubmitAllSections = async () => {
     setSubmitting(true);
@@ -256,10 +273,15 @@ const GiveTest = ({ jdId }) => {
         console.log(`Submitting section ${section.name}`, submissionData);
 
         const result = await testApi.submitSection(submissionData);
-        results.push({ sectionName: section.name, result });
+        // 202: the section was queued for background evaluation
+        const pending = result.status === 'queued' && Boolean(result.job_id);
+        results.push({ sectionName: section.name, result, pending });
       }
 
       setSubmissionResults(results);
+      results.forEach((sectionResult, sectionIdx) => {
+        if (sectionResult.pending) pollEvaluation(sectionIdx, sectionResult.result.job_id);
+      });
       await handleSubmitTest();
     } catch (err) {
       console.error('Test submission error:', err);
@@ -375,7 +397,9 @@ const GiveTest = ({ jdId }) => {
             Test Completed Successfully!
           </h2>
           <p className="text-gray-600 mb-8 text-center">
-            All sections have been submitted and evaluated.
+            {submissionResults.some(s => s.pending)
+              ? 'All sections have been submitted. Some are still being evaluated.'
+              : 'All sections have been submitted and evaluated.'}
           </p>
 
           <div className="space-y-6">
@@ -384,7 +408,9 @@ const GiveTest = ({ jdId }) => {
                 <h3 className="text-xl font-bold text-gray-800 mb-4">
                   {sectionResult.sectionName} Section
                 </h3>
-                <p className="text-gray-600 mb-4">{sectionResult.result.message}</p>
+                <p className="text-gray-600 mb-4">
+                  {sectionResult.pending ? '⏳ Evaluating your answers…' : sectionResult.result.message}
+                </p>
 
                 {sectionResult.result.evaluations && sectionResult.result.evaluations.length > 0 && (
                   <div className="space-y-3">